@@ -463,6 +463,30 @@ class DefaultAccount(with_metaclass(TypeclassBase, AccountDB)):
         Kwargs:
             any (dict): All other keywords are passed on to the protocol.
 
+        """
+        kwargs = self._prepare_msg(text, from_obj, options, kwargs)
+        if kwargs is None:
+            return
+
+        # session relay
+        sessions = make_iter(session) if session else self.sessions.all()
+        for session in sessions:
+            session.data_out(**kwargs)
+
+    def _prepare_msg(self, text, from_obj, options, kwargs):
+        """
+        Run the message hooks and build the data to send for `msg`.
+
+        Args:
+            text (str or tuple): The message to send.
+            from_obj (Object, Account or list): Entities sending the message.
+            options (list): Protocol-specific options.
+            kwargs (dict): Other send-commands. This is updated in-place.
+
+        Returns:
+            kwargs (dict or None): The data to send to the sessions, or
+                None if `at_msg_receive` aborted the message.
+
         """
         if from_obj:
             # call hook
@@ -475,7 +499,7 @@ class DefaultAccount(with_metaclass(TypeclassBase, AccountDB)):
         try:
             if not self.at_msg_receive(text=text, **kwargs):
                 # abort message to this account
-                return
+                return None
         except Exception:
             # this may not be assigned.
             pass
@@ -490,11 +514,7 @@ class DefaultAccount(with_metaclass(TypeclassBase, AccountDB)):
                 except Exception:
                     text = repr(text)
             kwargs['text'] = text
-
-        # session relay
-        sessions = make_iter(session) if session else self.sessions.all()
-        for session in sessions:
-            session.data_out(**kwargs)
+        return kwargs
 
     def execute_cmd(self, raw_string, session=None, **kwargs):
         """
@@ -104,6 +104,18 @@ class AccountDB(TypedObject, AbstractUser):
     class Meta(object):
         verbose_name = 'Account'
 
+    @classmethod
+    def get_idmapper_pinned(cls):
+        """
+        Pin connected accounts in the idmapper cache.
+
+        Returns:
+            pinned (set): The pks of the pinned accounts.
+
+        """
+        return set(pk for pk, account in cls.__dbclass__.__instance_cache__.items()
+                   if account.db_is_connected)
+
     # cmdset_storage property
     # This seems very sensitive to caching, so leaving it be for now /Griatch
     #@property
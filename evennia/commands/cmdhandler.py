@@ -34,7 +34,6 @@ command line. The processing of a command works as follows:
 """
 
 from collections import defaultdict
-from weakref import WeakValueDictionary
 from traceback import format_exc
 from itertools import chain
 from copy import copy
@@ -45,7 +44,9 @@ from twisted.internet.defer import inlineCallbacks, returnValue
 from django.conf import settings
 from evennia.commands.command import InterruptCommand
 from evennia.comms.channelhandler import CHANNELHANDLER
+from evennia.objects.models import overrides_at_cmdset_get
 from evennia.utils import logger, utils
+from evennia.utils.dbserialize import flush_deferred_saves
 from evennia.utils.utils import string_suggestions, to_unicode
 
 from django.utils.translation import ugettext as _
@@ -54,7 +55,8 @@ _IN_GAME_ERRORS = settings.IN_GAME_ERRORS
 
 __all__ = ("cmdhandler", "InterruptCommand")
 _GA = object.__getattribute__
-_CMDSET_MERGE_CACHE = WeakValueDictionary()
+# caches cmdset mergers by the signatures of the merged cmdsets
+_CMDSET_MERGE_CACHE = utils.LRUCache(settings.CMDSET_MERGE_CACHE_SIZE)
 
 # tracks recursive calls by each caller
 # to avoid infinite loops (commands calling themselves)
@@ -137,6 +139,78 @@ _GET_INPUT = None
 
 # helper functions
 
+def get_merge_cache_stats():
+    """
+    Get statistics for the cmdset merge cache.
+
+    Returns:
+        stats (dict): A dict with keys `size`, `size_limit`, `hits`,
+            `misses`, `evictions` and `hit_ratio`.
+
+    """
+    return _CMDSET_MERGE_CACHE.stats()
+
+
+def _merge_cmdsets(cmdsets):
+    """
+    Merge cmdsets, re-using cached mergers whenever possible.
+
+    Args:
+        cmdsets (list): The cmdsets to merge. Same-priority cmdsets are
+            merged in list order.
+
+    Returns:
+        cmdset (CmdSet): The merged cmdset.
+
+    Notes:
+        We group and merge all same-prio cmdsets separately (this avoids
+        order-dependent clashes in certain cases, such as when
+        duplicates=True). The groups are then merged in order of priority,
+        beginning with the lowest-prio one.
+
+        Both the group mergers and each step of the priority-ordered merger
+        are cached, keyed on the merge signatures of the cmdsets involved.
+        This means that when moving to a new room, the merger of the
+        low-priority cmdsets (like those of the session, account and
+        character) are re-used and only the room-specific parts are merged
+        anew.
+
+    """
+    groups = {}
+    for cmdset in cmdsets:
+        groups.setdefault(cmdset.priority, []).append(cmdset)
+
+    mergekey = ("merge",)
+    sources = []
+    merged_from = []
+    cmdset = None
+    for prio in sorted(groups):
+        group = groups[prio]
+        sources.extend(group)
+        groupkey = ("group",) + tuple(cset.get_merge_signature() for cset in group)
+        mergekey = mergekey + (groupkey,)
+        cached = _CMDSET_MERGE_CACHE.get(mergekey)
+        if cached:
+            # the cache also holds the source cmdsets, to avoid
+            # their ids being reused while the merger is cached.
+            groupset, cmdset = cached[0], cached[1]
+        else:
+            cached = _CMDSET_MERGE_CACHE.get(groupkey)
+            if cached:
+                groupset = cached[1]
+            else:
+                groupset = group[0]
+                for merging_cmdset in group[1:]:
+                    groupset = groupset + merging_cmdset
+                _CMDSET_MERGE_CACHE.set(groupkey, (groupset, groupset, tuple(group)))
+            cmdset = groupset if cmdset is None else cmdset + groupset
+            _CMDSET_MERGE_CACHE.set(mergekey, (groupset, cmdset, tuple(sources)))
+        merged_from.append(groupset)
+    # store the full sets for diagnosis
+    cmdset.merged_from = merged_from
+    return cmdset
+
+
 def _msg_err(receiver, stringtuple):
     """
     Helper function for returning an error to the caller.
@@ -307,11 +381,16 @@ def get_and_merge_cmdsets(caller, session, account, obj, callertype, raw_string)
                     location = None
                 if location:
                     # Gather all cmdsets stored on objects in the room and
-                    # also in the caller's inventory and the location itself
-                    local_objlist = yield (location.contents_get(exclude=obj) +
-                                           obj.contents_get() + [location])
+                    # also in the caller's inventory and the location itself.
+                    # The contents caches track which objects carry cmdsets,
+                    # so we don't need to look at all the others.
+                    local_objlist = yield (location.contents_cache.get_cmdset_carriers(exclude=obj) +
+                                           obj.contents_cache.get_cmdset_carriers() + [location])
                     local_objlist = [o for o in local_objlist if not o._is_deleted]
                     for lobj in local_objlist:
+                        if not overrides_at_cmdset_get(lobj):
+                            # the default hook does nothing, no need to call it
+                            continue
                         try:
                             # call hook in case we need to do dynamic changing to cmdset
                             _GA(lobj, "at_cmdset_get")(caller=caller)
@@ -424,35 +503,7 @@ def get_and_merge_cmdsets(caller, session, account, obj, callertype, raw_string)
                if cmdset.key == "_CMDSET_ERROR"]
 
         if cmdsets:
-            # faster to do tuple on list than to build tuple directly
-            mergehash = tuple([id(cmdset) for cmdset in cmdsets])
-            if mergehash in _CMDSET_MERGE_CACHE:
-                # cached merge exist; use that
-                cmdset = _CMDSET_MERGE_CACHE[mergehash]
-            else:
-                # we group and merge all same-prio cmdsets separately (this avoids
-                # order-dependent clashes in certain cases, such as
-                # when duplicates=True)
-                tempmergers = {}
-                for cmdset in cmdsets:
-                    prio = cmdset.priority
-                    if prio in tempmergers:
-                        # merge same-prio cmdset together separately
-                        tempmergers[prio] = yield tempmergers[prio] + cmdset
-                    else:
-                        tempmergers[prio] = cmdset
-
-                # sort cmdsets after reverse priority (highest prio are merged in last)
-                cmdsets = yield sorted(tempmergers.values(), key=lambda x: x.priority)
-
-                # Merge all command sets into one, beginning with the lowest-prio one
-                cmdset = cmdsets[0]
-                for merging_cmdset in cmdsets[1:]:
-                    cmdset = yield cmdset + merging_cmdset
-                # store the full sets for diagnosis
-                cmdset.merged_from = cmdsets
-                # cache
-                _CMDSET_MERGE_CACHE[mergehash] = cmdset
+            cmdset = yield _merge_cmdsets(cmdsets)
         else:
             cmdset = None
         for cset in (cset for cset in local_obj_cmdsets if cset):
@@ -617,6 +668,8 @@ def cmdhandler(called_by, raw_string, _testing=False, callertype="session", sess
             raise ErrorReported(raw_string)
         finally:
             _COMMAND_NESTING[called_by] -= 1
+            # save Attributes changed in-place during the command
+            flush_deferred_saves()
 
     raw_string = to_unicode(raw_string, force_string=True)
 
@@ -703,7 +756,7 @@ def cmdhandler(called_by, raw_string, _testing=False, callertype="session", sess
                         # fallback to default error text
                         sysarg = _("Command '%s' is not available.") % raw_string
                         suggestions = string_suggestions(raw_string,
-                                                         cmdset.get_all_cmd_keys_and_aliases(caller),
+                                                         cmdset.get_suggestion_matcher(caller),
                                                          cutoff=0.7, maxnum=3)
                         if suggestions:
                             sysarg += _(" Maybe you meant %s?") % utils.list_to_string(suggestions, _('or'), addquote=True)
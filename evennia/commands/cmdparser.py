@@ -79,22 +79,13 @@ def cmdparser(raw_string, cmdset, caller, match_index=None):
         l_raw_string = raw_string.lower()
         matches = []
         try:
-            if include_prefixes:
-                # use the cmdname as-is
-                for cmd in cmdset:
-                    matches.extend([create_match(cmdname, raw_string, cmd, cmdname)
-                                    for cmdname in [cmd.key] + cmd.aliases
-                                    if cmdname and l_raw_string.startswith(cmdname.lower()) and
-                                    (not cmd.arg_regex or
-                                        cmd.arg_regex.match(l_raw_string[len(cmdname):]))])
-            else:
-                # strip prefixes set in settings
-                for cmd in cmdset:
-                    for raw_cmdname in [cmd.key] + cmd.aliases:
-                        cmdname = raw_cmdname.lstrip(_CMD_IGNORE_PREFIXES) if len(raw_cmdname) > 1 else raw_cmdname
-                        if cmdname and l_raw_string.startswith(cmdname.lower()) and \
-                                (not cmd.arg_regex or cmd.arg_regex.match(l_raw_string[len(cmdname):])):
-                            matches.append(create_match(cmdname, raw_string, cmd, raw_cmdname))
+            # the cmdset holds a prefix-trie of all its keys/aliases (with and
+            # without the prefixes set in settings), so we only need to walk the
+            # input string to find the candidates.
+            for cmdname, cmd, raw_cmdname in cmdset.get_cmdname_candidates(
+                    l_raw_string, strip_prefixes=not include_prefixes):
+                if not cmd.arg_regex or cmd.arg_regex.match(l_raw_string[len(cmdname):]):
+                    matches.append(create_match(cmdname, raw_string, cmd, raw_cmdname))
         except Exception:
             log_trace("cmdhandler error. raw_input:%s" % raw_string)
         return matches
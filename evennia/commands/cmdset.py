@@ -28,11 +28,17 @@ Set theory.
 """
 from future.utils import listvalues, with_metaclass
 
+from itertools import count
 from weakref import WeakKeyDictionary
+from django.conf import settings
 from django.utils.translation import ugettext as _
-from evennia.utils.utils import inherits_from, is_iter
+from evennia.utils.utils import inherits_from, is_iter, PartialMatcher
 __all__ = ("CmdSet",)
 
+_CMD_IGNORE_PREFIXES = settings.CMD_IGNORE_PREFIXES
+# unique content versions for cmdsets changed after creation
+_CMDSET_VERSIONS = count(1)
+
 
 class _CmdSetMeta(type):
     """
@@ -189,6 +195,17 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
         # initialize system
         self.at_cmdset_creation()
         self._contains_cache = WeakKeyDictionary()  # {}
+        # the content version is the same for all equivalent cmdsets created
+        # from the same class. It is changed if commands are added or
+        # removed after creation.
+        self._version = hash(frozenset(
+            (type(cmd), cmd.key, frozenset(cmd.aliases), cmd.locks,
+             getattr(cmd.arg_regex, "pattern", cmd.arg_regex))
+            for cmd in self.commands + self.system_commands))
+        # prefix-tries for the cmdparser, built on demand
+        self._match_tries = {}
+        # (commands, {names: PartialMatcher}) for command suggestions
+        self._matchers = (None, {})
 
     # Priority-sensitive merge operations for cmdsets
 
@@ -476,6 +493,7 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
             cmds = [self._instantiate(cmd)]
         commands = self.commands
         system_commands = self.system_commands
+        self._version = next(_CMDSET_VERSIONS)
         for cmd in cmds:
             # add all commands
             if not hasattr(cmd, 'obj'):
@@ -506,6 +524,7 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
 
         """
         cmd = self._instantiate(cmd)
+        self._version = next(_CMDSET_VERSIONS)
         if cmd.key.startswith("__"):
             try:
                 ic = self.system_commands.index(cmd)
@@ -587,6 +606,104 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
                 unique[cmd.key] = cmd
         self.commands = listvalues(unique)
 
+    def get_merge_signature(self):
+        """
+        Get a signature describing this cmdset for the purpose of merging.
+
+        Returns:
+            signature (tuple): A hashable tuple. Two cmdsets with the same
+                signature will give the same result when merged with other
+                cmdsets. This is used as a key when caching mergers.
+
+        Notes:
+            The signature consists of the cmdset's class path, key, the
+            object it is stored on, its merge options and a content version.
+            Equivalent cmdsets re-created from the same class (such as after
+            a `CmdSetHandler.update()`) get the same version, as long as
+            their commands have the same keys, aliases, locks and
+            arg_regex. Calling `add` or `remove` on a cmdset gives it a
+            new, unique version. Commands changed in other ways after
+            the cmdset was created are not tracked; re-`add` them to get
+            a new version.
+
+        """
+        return (self.path, self.key, id(self.cmdsetobj), self.priority,
+                self.mergetype, self.duplicates, self.no_exits, self.no_objs,
+                self.no_channels, tuple(sorted(self.key_mergetypes.items())),
+                self._version)
+
+    def _build_match_trie(self, strip_prefixes=False):
+        """
+        Build a lowercase prefix-trie over the keys and aliases of all
+        commands in this cmdset.
+
+        Args:
+            strip_prefixes (bool, optional): Strip the characters in
+                `settings.CMD_IGNORE_PREFIXES` from the start of each
+                key/alias before storing it.
+
+        Returns:
+            trie (dict): A nested dict `{char: {char: ...}}`. The key `None`
+                of a node holds a list of `(order, cmdname, cmd, raw_cmdname)`
+                for all commands whose (lowercase) name ends at that node.
+                The `order` is used to retain the iteration order of the cmdset.
+
+        """
+        trie = {}
+        for icmd, cmd in enumerate(self.commands):
+            for iname, raw_cmdname in enumerate([cmd.key] + cmd.aliases):
+                cmdname = raw_cmdname
+                if strip_prefixes and len(raw_cmdname) > 1:
+                    cmdname = raw_cmdname.lstrip(_CMD_IGNORE_PREFIXES)
+                if not cmdname:
+                    continue
+                node = trie
+                for char in cmdname.lower():
+                    node = node.setdefault(char, {})
+                node.setdefault(None, []).append(((icmd, iname), cmdname, cmd, raw_cmdname))
+        return trie
+
+    def get_cmdname_candidates(self, string, strip_prefixes=False):
+        """
+        Find all commands with a key or alias that the given string
+        starts with (case-insensitive).
+
+        Args:
+            string (str): The (usually raw) input string to match against.
+            strip_prefixes (bool, optional): Match against keys/aliases with
+                `settings.CMD_IGNORE_PREFIXES` stripped from their start.
+
+        Returns:
+            candidates (list): A list of `(cmdname, cmd, raw_cmdname)`, in the
+                order the commands and their key/aliases appear in the cmdset.
+                Here `cmdname` is the (possibly prefix-stripped) name that
+                matched and `raw_cmdname` the unmodified key or alias.
+
+        Notes:
+            The trie is built the first time it is needed and then stored
+            on the cmdset, so a merged cmdset (which is cached by the
+            cmdhandler) only needs to build it once. It is rebuilt if the
+            `commands` list of the cmdset is replaced (as happens in `add`,
+            `remove` and during merges). The lookup itself is proportional
+            to the length of `string`, not to the size of the cmdset.
+
+        """
+        cached = self._match_tries.get(strip_prefixes)
+        if cached is None or cached[0] is not self.commands:
+            cached = (self.commands, self._build_match_trie(strip_prefixes=strip_prefixes))
+            self._match_tries[strip_prefixes] = cached
+        node = cached[1]
+        candidates = []
+        for char in string.lower():
+            node = node.get(char)
+            if node is None:
+                break
+            if None in node:
+                candidates.extend(node[None])
+        if len(candidates) > 1:
+            candidates.sort(key=lambda tup: tup[0])
+        return [tup[1:] for tup in candidates]
+
     def get_all_cmd_keys_and_aliases(self, caller=None):
         """
         Collects keys/aliases from commands
@@ -609,6 +726,31 @@ class CmdSet(with_metaclass(_CmdSetMeta, object)):
             [names.extend(cmd._keyaliases) for cmd in self.commands]
         return names
 
+    def get_suggestion_matcher(self, caller=None):
+        """
+        Get a `PartialMatcher` for the command keys and aliases in this
+        cmdset, for use with `string_suggestions`.
+
+        Args:
+            caller (Object, optional): If set, only commands `caller` has
+                access to are included, as for `get_all_cmd_keys_and_aliases`.
+
+        Returns:
+            matcher (PartialMatcher): The matcher. It is stored on the
+                cmdset, and re-used as long as the commands and the
+                names available to the caller are the same.
+
+        """
+        names = tuple(self.get_all_cmd_keys_and_aliases(caller))
+        commands, matchers = self._matchers
+        if commands is not self.commands:
+            matchers = {}
+            self._matchers = (self.commands, matchers)
+        matcher = matchers.get(names)
+        if matcher is None:
+            matcher = matchers[names] = PartialMatcher(names)
+        return matcher
+
     def at_cmdset_creation(self):
         """
         Hook method - this should be overloaded in the inheriting
@@ -396,6 +396,15 @@ class CmdSetHandler(object):
             self.mergetype_stack.append(new_current.actual_mergetype)
         self.current = new_current
 
+        # let the location know if we have any cmdsets to offer. We don't
+        # initialize the location's contents cache just for this.
+        location = getattr(self.obj, "location", None)
+        if location:
+            contents_cache = location.__dict__.get("contents_cache")
+            if contents_cache:
+                contents_cache.update_cmdset_carrier(
+                    self.obj, any(cset.key != "_EMPTY_CMDSET" for cset in self.cmdset_stack))
+
     def add(self, cmdset, emit_to_obj=None, permanent=False, default_cmdset=False):
         """
         Add a cmdset to the handler, on top of the old ones, unless it
@@ -13,7 +13,7 @@ from evennia.commands.command import Command
 from evennia.help.models import HelpEntry
 from evennia.utils import create, evmore
 from evennia.utils.eveditor import EvEditor
-from evennia.utils.utils import string_suggestions, class_from_module
+from evennia.utils.utils import string_suggestions, class_from_module, PartialMatcher, LRUCache
 
 COMMAND_DEFAULT_CLASS = class_from_module(settings.COMMAND_DEFAULT_CLASS)
 HELP_MORE = settings.HELP_MORE
@@ -23,6 +23,9 @@ CMD_IGNORE_PREFIXES = settings.CMD_IGNORE_PREFIXES
 __all__ = ("CmdHelp", "CmdSetHelp")
 _DEFAULT_WIDTH = settings.CLIENT_DEFAULT_WIDTH
 _SEP = "|C" + "-" * _DEFAULT_WIDTH + "|n"
+# suggestion matchers, keyed on the help vocabulary they were made for.
+# Different callers see different vocabularies, depending on access.
+_SUGGESTION_MATCHERS = LRUCache(20)
 
 
 class CmdHelp(Command):
@@ -224,7 +227,12 @@ class CmdHelp(Command):
         if suggestion_maxnum > 0:
             vocabulary = [cmd.key for cmd in all_cmds if cmd] + [topic.key for topic in all_topics] + all_categories
             [vocabulary.extend(cmd.aliases) for cmd in all_cmds]
-            suggestions = [sugg for sugg in string_suggestions(query, set(vocabulary), cutoff=suggestion_cutoff,
+            vocabulary_key = frozenset(vocabulary)
+            matcher = _SUGGESTION_MATCHERS.get(vocabulary_key)
+            if matcher is None:
+                matcher = PartialMatcher(set(vocabulary))
+                _SUGGESTION_MATCHERS.set(vocabulary_key, matcher)
+            suggestions = [sugg for sugg in string_suggestions(query, matcher, cutoff=suggestion_cutoff,
                                                                maxnum=suggestion_maxnum)
                            if sugg != query]
             if not suggestions:
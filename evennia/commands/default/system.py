@@ -844,4 +844,11 @@ class CmdTickers(COMMAND_DEFAULT_CLASS):
                           sub[1] if sub[1] else sub[2],
                           sub[4] or "[Unset]",
                           "*" if sub[5] else "-")
-        self.caller.msg("|wActive tickers|n:\n" + unicode(table))
+        stats_table = EvTable("interval (s)", "subscribers", "slots", "duration (ms)", "lag (ms)")
+        for interval, stats in sorted(TICKER_HANDLER.stats().items()):
+            stats_table.add_row(interval, stats["subscriptions"], stats["slots"],
+                                "%.1f (max %.1f)" % (stats["duration"] * 1000,
+                                                     stats["max_duration"] * 1000),
+                                "%.1f (max %.1f)" % (stats["lag"] * 1000, stats["max_lag"] * 1000))
+        self.caller.msg("|wActive tickers|n:\n" + unicode(table) +
+                        "\n|wTicker load|n (per slot):\n" + unicode(stats_table))
@@ -261,6 +261,62 @@ class TestCmdSetMergers(TestCase):
         cmdset_f = d + b + c + a  # two last mergers duplicates=True
         self.assertEqual(len(cmdset_f.commands), 10)
 
+class _CmdLook(Command):
+    key = "look"
+    aliases = ["l", "@look"]
+
+
+class _CmdLock(Command):
+    key = "@lock"
+    aliases = ["lk"]
+
+
+class _CmdSetParse(CmdSet):
+    key = "Parse"
+
+    def at_cmdset_creation(self):
+        self.add(_CmdLook())
+        self.add(_CmdLock())
+
+
+class TestCmdParser(EvenniaTest):
+    "Test the prefix-trie matching of the cmdparser"
+
+    def setUp(self):
+        super(TestCmdParser, self).setUp()
+        self.cmdset = _CmdSetParse()
+
+    def test_candidates(self):
+        names = [tup[0] for tup in self.cmdset.get_cmdname_candidates("look here")]
+        self.assertEqual(sorted(names), ["l", "look"])
+        names = [tup[0] for tup in self.cmdset.get_cmdname_candidates("@LOCK box")]
+        self.assertEqual(names, ["@lock"])
+        names = [tup[0] for tup in self.cmdset.get_cmdname_candidates("lock box", strip_prefixes=True)]
+        self.assertEqual(sorted(names), ["l", "lock"])
+        self.assertEqual(self.cmdset.get_cmdname_candidates("xyz"), [])
+
+    def test_trie_rebuilt_on_change(self):
+        self.assertEqual(self.cmdset.get_cmdname_candidates("get"), [])
+        cmd = Command()
+        cmd.key = "get"
+        self.cmdset.add(cmd)
+        self.assertEqual([tup[0] for tup in self.cmdset.get_cmdname_candidates("get")], ["get"])
+        self.cmdset.remove(cmd)
+        self.assertEqual(self.cmdset.get_cmdname_candidates("get"), [])
+
+    def test_cmdparser(self):
+        from evennia.commands.cmdparser import cmdparser
+        matches = cmdparser("look here", self.cmdset, self.char1)
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0][:2], ("look", " here"))
+        self.assertEqual(matches[0][3:], (4, 1 - 5 / 9.0, "look"))
+        matches = cmdparser("+lock box", self.cmdset, self.char1)
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0][0], "lock")
+        self.assertEqual(matches[0][5], "@lock")
+        self.assertEqual(cmdparser("xyz", self.cmdset, self.char1), [])
+
+
 # test cmdhandler functions
 
 
@@ -376,3 +432,57 @@ class TestGetAndMergeCmdSets(TwistedTestCase, EvenniaTest):
             self.assertEqual(len(cmdset.commands), 9)
         deferred.addCallback(_callback)
         return deferred
+
+    def test_merge_cache_reuse(self):
+        a, b, c = self.cmdset_a, self.cmdset_b, self.cmdset_c
+        a.no_exits = True
+        a.no_channels = True
+        b.priority = 1
+        c.priority = 2
+        self.set_cmdsets(self.obj1, a, b, c)
+        merge1 = cmdhandler._merge_cmdsets([a, b, c])
+        # an equivalent, re-created cmdset gives the same merge
+        a2 = _CmdSetA()
+        a2.no_exits = True
+        a2.no_channels = True
+        self.assertEqual(a.get_merge_signature(), a2.get_merge_signature())
+        self.assertTrue(cmdhandler._merge_cmdsets([a2, b, c]) is merge1)
+        # the lower-prio part of the merger is re-used
+        d = self.cmdset_d
+        d.priority = 3
+        stats = cmdhandler.get_merge_cache_stats()
+        cmdhandler._merge_cmdsets([a, b, c, d])
+        self.assertEqual(cmdhandler.get_merge_cache_stats()["hits"], stats["hits"] + 3)
+        # changing a cmdset gives it a new signature
+        c.remove(c.get("a"))
+        merge2 = cmdhandler._merge_cmdsets([a, b, c])
+        self.assertFalse(merge2 is merge1)
+
+    def test_merge_signature_aliases(self):
+        def _aliased(aliases):
+            class _CmdSetAliased(CmdSet):
+                key = "Aliased"
+
+                def at_cmdset_creation(self):
+                    self.add(_CmdA("Aliased", aliases=aliases))
+            return _CmdSetAliased()
+        self.assertEqual(_aliased(["x"]).get_merge_signature(),
+                         _aliased(["x"]).get_merge_signature())
+        self.assertNotEqual(_aliased(["x"]).get_merge_signature(),
+                            _aliased(["y"]).get_merge_signature())
+
+    def test_cmdset_carriers(self):
+        carriers = self.room1.contents_cache.get_cmdset_carriers()
+        # the exit sets up its cmdset on the fly, characters have default cmdsets
+        self.assertTrue(self.exit in carriers)
+        self.assertTrue(self.char1 in carriers)
+        self.assertFalse(self.obj1 in carriers)
+        self.assertFalse(self.char1 in self.room1.contents_cache.get_cmdset_carriers(exclude=self.char1))
+        self.obj1.cmdset.add(_CmdSetA)
+        self.assertTrue(self.obj1 in self.room1.contents_cache.get_cmdset_carriers())
+        self.obj1.move_to(self.room2, quiet=True)
+        self.assertFalse(self.obj1 in self.room1.contents_cache.get_cmdset_carriers())
+        self.obj1.move_to(self.room1, quiet=True)
+        self.assertTrue(self.obj1 in self.room1.contents_cache.get_cmdset_carriers())
+        self.obj1.cmdset.remove(_CmdSetA)
+        self.assertFalse(self.obj1 in self.room1.contents_cache.get_cmdset_carriers())
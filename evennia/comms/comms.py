@@ -9,6 +9,22 @@ from evennia.utils import logger
 from evennia.utils.utils import make_iter
 from future.utils import with_metaclass
 _CHANNEL_HANDLER = None
+_SESSIONS = None
+_DEFAULT_MSG_FUNCS = None
+
+
+def _uses_default_msg(entity):
+    """
+    Check if an Account or Object sends messages with the default `msg`
+    method, so its message can be sent along with those of others.
+
+    """
+    global _DEFAULT_MSG_FUNCS
+    if _DEFAULT_MSG_FUNCS is None:
+        from evennia.accounts.accounts import DefaultAccount
+        from evennia.objects.objects import DefaultObject
+        _DEFAULT_MSG_FUNCS = (DefaultAccount.msg.__func__, DefaultObject.msg.__func__)
+    return getattr(entity.msg, "__func__", None) in _DEFAULT_MSG_FUNCS
 
 
 class DefaultChannel(with_metaclass(TypeclassBase, ChannelDB)):
@@ -19,6 +35,11 @@ class DefaultChannel(with_metaclass(TypeclassBase, ChannelDB)):
     """
     objects = ChannelManager()
 
+    # in-memory caches of muted and listening (non-muted) subscribers
+    _muted = None
+    _listeners = None
+    _listeners_subs = None
+
     def at_first_save(self):
         """
         Called by the typeclass system the very first time the channel
@@ -94,6 +115,28 @@ class DefaultChannel(with_metaclass(TypeclassBase, ChannelDB)):
     def mutelist(self):
         return self.db.mute_list or []
 
+    def _get_muted(self):
+        """
+        Get the muted subscribers as a set, cached in memory.
+
+        """
+        if self._muted is None:
+            self._muted = set(self.mutelist)
+        return self._muted
+
+    def _get_listeners(self):
+        """
+        Get the subscribers that are not muted. This is cached in memory
+        until the subscriptions change or someone is muted or unmuted.
+
+        """
+        subs = self.subscriptions.all()
+        if self._listeners is None or self._listeners_subs is not subs:
+            muted = self._get_muted()
+            self._listeners = [sub for sub in subs if sub not in muted]
+            self._listeners_subs = subs
+        return self._listeners
+
     @property
     def wholist(self):
         subs = self.subscriptions.all()
@@ -122,6 +165,7 @@ class DefaultChannel(with_metaclass(TypeclassBase, ChannelDB)):
         if subscriber not in mutelist:
             mutelist.append(subscriber)
             self.db.mute_list = mutelist
+            self._muted = self._listeners = None
             return True
         return False
 
@@ -140,6 +184,7 @@ class DefaultChannel(with_metaclass(TypeclassBase, ChannelDB)):
         if subscriber in mutelist:
             mutelist.remove(subscriber)
             self.db.mute_list = mutelist
+            self._muted = self._listeners = None
             return True
         return False
 
@@ -272,25 +317,41 @@ class DefaultChannel(with_metaclass(TypeclassBase, ChannelDB)):
             This is also where logging happens, if enabled.
 
         """
-        # get all accounts or objects connected to this channel and send to them
+        global _SESSIONS
+        if not _SESSIONS:
+            from evennia.server.sessionhandler import SESSIONS as _SESSIONS
+
+        # get all non-muted accounts or objects connected to this channel
         if online:
-            subs = self.subscriptions.online()
+            muted = self._get_muted()
+            subs = [entity for entity in self.subscriptions.online() if entity not in muted]
         else:
-            subs = self.subscriptions.all()
+            subs = self._get_listeners()
+
+        # entities with a default msg method have their sessions collected
+        # and are sent the message all at once
+        sessions = []
         for entity in subs:
-            # if the entity is muted, we don't send them a message
-            if entity in self.mutelist:
-                continue
+            # note our addition of the from_channel keyword here. This could be checked
+            # by a custom account.msg() to treat channel-receives differently.
+            options = {"from_channel": self.id}
             try:
-                # note our addition of the from_channel keyword here. This could be checked
-                # by a custom account.msg() to treat channel-receives differently.
-                entity.msg(msgobj.message, from_obj=msgobj.senders, options={"from_channel": self.id})
+                if _uses_default_msg(entity):
+                    if entity._prepare_msg(msgobj.message, msgobj.senders,
+                                           options, {}) is not None:
+                        sessions.extend(entity.sessions.all())
+                else:
+                    entity.msg(msgobj.message, from_obj=msgobj.senders, options=options)
             except AttributeError as e:
                 logger.log_trace("%s\nCannot send msg to '%s'." % (e, entity))
+        if sessions:
+            _SESSIONS.data_out_multi(sessions, text=msgobj.message,
+                                     options={"from_channel": self.id})
 
         if msgobj.keep_log:
             # log to file
-            logger.log_file(msgobj.message, self.attributes.get("log_file") or "channel_%s.log" % self.key)
+            logger.log_file_buffered(msgobj.message, self.attributes.get("log_file") or
+                                     "channel_%s.log" % self.key)
 
     def msg(self, msgobj, header=None, senders=None, sender_strings=None,
             keep_log=None, online=False, emit=False, external=False):
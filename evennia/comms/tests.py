@@ -0,0 +1,35 @@
+from mock import patch
+from evennia.utils import create
+from evennia.utils.test_resources import EvenniaTest
+
+
+class TestChannel(EvenniaTest):
+    def setUp(self):
+        super(TestChannel, self).setUp()
+        self.channel = create.create_channel("testchannel")
+        self.channel.connect(self.account)
+        self.channel.connect(self.account2)
+
+    def tearDown(self):
+        self.channel.delete()
+        super(TestChannel, self).tearDown()
+
+    def test_listeners(self):
+        self.assertEqual(set(self.channel._get_listeners()), set((self.account, self.account2)))
+        self.channel.mute(self.account2)
+        self.assertEqual(self.channel._get_listeners(), [self.account])
+        self.channel.unmute(self.account2)
+        self.channel.disconnect(self.account)
+        self.assertEqual(self.channel._get_listeners(), [self.account2])
+
+    @patch("evennia.utils.logger.log_file_buffered")
+    def test_distribute_message(self, mock_log):
+        self.channel.mute(self.account2)
+        with patch("evennia.server.sessionhandler.SESSIONS.data_out_multi") as mock_multi, \
+                patch.object(self.account2, "msg") as mock_msg:
+            self.channel.msg("Hello!", keep_log=True)
+        args, kwargs = mock_multi.call_args
+        self.assertEqual(args[0], self.account.sessions.all())
+        self.assertIn("Hello!", kwargs["text"])
+        self.assertFalse(mock_msg.called)
+        self.assertTrue(mock_log.called)
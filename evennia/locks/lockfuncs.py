@@ -419,6 +419,10 @@ def locattr(accessing_obj, accessed_obj, *args, **kwargs):
     return False
 
 
+# depends on the location's Attributes
+locattr.cacheable = False
+
+
 def objlocattr(accessing_obj, accessed_obj, *args, **kwargs):
     """
     Usage:
@@ -440,6 +444,10 @@ def objlocattr(accessing_obj, accessed_obj, *args, **kwargs):
     return False
 
 
+# depends on the location's Attributes
+objlocattr.cacheable = False
+
+
 def attr_eq(accessing_obj, accessed_obj, *args, **kwargs):
     """
     Usage:
@@ -538,6 +546,10 @@ def inside(accessing_obj, accessed_obj, *args, **kwargs):
     return accessing_obj.location == accessed_obj
 
 
+# depends on the location
+inside.cacheable = False
+
+
 def holds(accessing_obj, accessed_obj, *args, **kwargs):
     """
     Usage:
@@ -592,6 +604,10 @@ def holds(accessing_obj, accessed_obj, *args, **kwargs):
     return False
 
 
+# depends on the contents
+holds.cacheable = False
+
+
 def superuser(*args, **kwargs):
     """
     Only accepts an accesing_obj that is superuser (e.g. user #1)
@@ -614,6 +630,10 @@ def has_account(accessing_obj, accessed_obj, *args, **kwargs):
     return hasattr(accessing_obj, "has_account") and accessing_obj.has_account
 
 
+# depends on the account connecting/disconnecting
+has_account.cacheable = False
+
+
 def serversetting(accessing_obj, accessed_obj, *args, **kwargs):
     """
     Only returns true if the Evennia settings exists, alternatively has
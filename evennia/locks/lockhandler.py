@@ -38,6 +38,16 @@ Example:
 Lock functions should most often be pretty general and ideally possible to
 re-use and combine in various ways to build clever locks.
 
+If `settings.LOCK_RESULT_CACHE` is active, lock results are memoized until
+the permissions, Tags, Attributes or locks of the involved objects change.
+A lock function whose result depends on anything else (like the contents
+or location of an object, or the current time) must be marked so its
+result is never memoized:
+
+   def is_daytime(accessing_obj, accessed_obj, *args, **kwargs):
+       ...
+   is_daytime.cacheable = False
+
 
 
 Lock definition ("Lock string")
@@ -107,6 +117,7 @@ from __future__ import print_function
 from builtins import object
 
 import re
+import weakref
 from django.conf import settings
 from evennia.utils import logger, utils
 from django.utils.translation import ugettext as _
@@ -114,6 +125,8 @@ from django.utils.translation import ugettext as _
 __all__ = ("LockHandler", "LockException")
 
 WARNING_LOG = settings.LOCKWARNING_LOG_FILE
+_LOCK_RESULT_CACHE = settings.LOCK_RESULT_CACHE
+_LOCK_RESULT_CACHE_MAXSIZE = settings.LOCK_RESULT_CACHE_SIZE
 _LOCK_HANDLER = None
 
 
@@ -137,6 +150,10 @@ class LockException(Exception):
 
 _LOCKFUNCS = {}
 
+# compiled lock definitions, shared by all lockhandlers. This maps
+# each raw 'access_type:definition' string to its compiled form.
+_COMPILED_LOCKS = utils.LimitedSizeOrderedDict(size_limit=settings.LOCK_COMPILE_CACHE_SIZE)
+
 
 def _cache_lockfuncs():
     """
@@ -146,6 +163,8 @@ def _cache_lockfuncs():
     _LOCKFUNCS = {}
     for modulepath in settings.LOCK_FUNC_MODULES:
         _LOCKFUNCS.update(utils.callables_from_module(modulepath))
+    # compiled locks refer to the old lockfuncs
+    _COMPILED_LOCKS.clear()
 
 #
 # pre-compiled regular expressions
@@ -157,6 +176,125 @@ _RE_SEPS = re.compile(r"(?<=[ )])AND(?=\s)|(?<=[ )])OR(?=\s)|(?<=[ )])NOT(?=\s)"
 _RE_OK = re.compile(r"%s|and|or|not")
 
 
+#
+# Lock compilation
+#
+# A lock definition is compiled into a tree of nested closures, all
+# with the call signature (accessing_obj, accessed_obj). The 'and'
+# and 'or' nodes short-circuit, so lockfuncs are only called when
+# their result actually matters.
+#
+
+def _compile_func(func, args, kwargs):
+    "Leaf node - call a lockfunc with its pre-parsed args/kwargs"
+    def _lock_func(accessing_obj, accessed_obj):
+        return bool(func(accessing_obj, accessed_obj, *args, **kwargs))
+    return _lock_func
+
+
+def _compile_not(node):
+    "Negate the result of a node"
+    def _lock_not(accessing_obj, accessed_obj):
+        return not node(accessing_obj, accessed_obj)
+    return _lock_not
+
+
+def _compile_and(nodes):
+    "All nodes must pass. Stops at the first failing node"
+    def _lock_and(accessing_obj, accessed_obj):
+        for node in nodes:
+            if not node(accessing_obj, accessed_obj):
+                return False
+        return True
+    return _lock_and
+
+
+def _compile_or(nodes):
+    "One node must pass. Stops at the first passing node"
+    def _lock_or(accessing_obj, accessed_obj):
+        for node in nodes:
+            if node(accessing_obj, accessed_obj):
+                return True
+        return False
+    return _lock_or
+
+
+def _compile_lock(tokens, lock_funcs):
+    """
+    Compile a lock definition into a callable.
+
+    Args:
+        tokens (list): The operators and lockfunc-placeholders of the
+            lock definition, like `["%s", "and", "not", "%s"]`.
+        lock_funcs (list): One `(func, args, kwargs)` for every
+            placeholder in `tokens`, in the same order.
+
+    Returns:
+        lockfunc (callable): A callable `lockfunc(accessing_obj, accessed_obj)`
+            returning `True` or `False`.
+
+    Raises:
+        LockException: If the tokens are not a valid combination of
+            lockfuncs and operators.
+
+    Notes:
+        The operators have the same precedence as in Python, that is `not`
+        binds tighter than `and`, which binds tighter than `or`.
+
+    """
+    tokens = list(reversed(tokens))
+    funcs = list(reversed(lock_funcs))
+
+    def _parse_not():
+        if not tokens:
+            raise LockException("Lock: unexpected end of lock definition.")
+        token = tokens.pop()
+        if token == "not":
+            return _compile_not(_parse_not())
+        elif token == "%s" and funcs:
+            return _compile_func(*funcs.pop())
+        raise LockException("Lock: unexpected '%s' in lock definition." % token)
+
+    def _parse_and():
+        nodes = [_parse_not()]
+        while tokens and tokens[-1] == "and":
+            tokens.pop()
+            nodes.append(_parse_not())
+        return nodes[0] if len(nodes) == 1 else _compile_and(nodes)
+
+    def _parse_or():
+        nodes = [_parse_and()]
+        while tokens and tokens[-1] == "or":
+            tokens.pop()
+            nodes.append(_parse_and())
+        return nodes[0] if len(nodes) == 1 else _compile_or(nodes)
+
+    lockfunc = _parse_or()
+    if tokens or funcs:
+        raise LockException("Lock: superfluous elements in lock definition.")
+    # lockfuncs can mark themselves as depending on state we can't track
+    lockfunc.cacheable = all(getattr(tup[0], "cacheable", True) for tup in lock_funcs)
+    return lockfunc
+
+
+def bump_lock_version(obj):
+    """
+    Mark that something affecting lock checks (like permissions, tags,
+    Attributes or locks) changed on an object. This invalidates all
+    memoized lock results where the object was either the accessing
+    or the accessed object.
+
+    Args:
+        obj (TypedObject): The object that changed.
+
+    Notes:
+        This does nothing unless `settings.LOCK_RESULT_CACHE` is set.
+
+    """
+    if _LOCK_RESULT_CACHE:
+        obj.locks.bump_version()
+
+
 #
 #
 # Lock handler
@@ -183,6 +321,9 @@ class LockHandler(object):
             _cache_lockfuncs()
         self.obj = obj
         self.locks = {}
+        # used by the lock-result cache, if active
+        self.version = 0
+        self._result_cache = {}
         try:
             self.reset()
         except LockException as err:
@@ -216,43 +357,48 @@ class LockHandler(object):
         for raw_lockstring in storage_lockstring.split(';'):
             if not raw_lockstring:
                 continue
-            lock_funcs = []
-            try:
-                access_type, rhs = (part.strip() for part in raw_lockstring.split(':', 1))
-            except ValueError:
-                logger.log_trace()
-                return locks
-
-            # parse the lock functions and separators
-            funclist = _RE_FUNCS.findall(rhs)
-            evalstring = rhs
-            for pattern in ('AND', 'OR', 'NOT'):
-                evalstring = re.sub(r"\b%s\b" % pattern, pattern.lower(), evalstring)
-            nfuncs = len(funclist)
-            for funcstring in funclist:
-                funcname, rest = (part.strip().strip(')') for part in funcstring.split('(', 1))
-                func = _LOCKFUNCS.get(funcname, None)
-                if not callable(func):
-                    elist.append(_("Lock: lock-function '%s' is not available.") % funcstring)
+            compiled = _COMPILED_LOCKS.get(raw_lockstring)
+            if compiled:
+                access_type, lockfunc, lock_funcs = compiled
+            else:
+                lock_funcs = []
+                try:
+                    access_type, rhs = (part.strip() for part in raw_lockstring.split(':', 1))
+                except ValueError:
+                    logger.log_trace()
+                    return locks
+
+                # parse the lock functions and separators
+                funclist = _RE_FUNCS.findall(rhs)
+                evalstring = rhs
+                for pattern in ('AND', 'OR', 'NOT'):
+                    evalstring = re.sub(r"\b%s\b" % pattern, pattern.lower(), evalstring)
+                nfuncs = len(funclist)
+                for funcstring in funclist:
+                    funcname, rest = (part.strip().strip(')') for part in funcstring.split('(', 1))
+                    func = _LOCKFUNCS.get(funcname, None)
+                    if not callable(func):
+                        elist.append(_("Lock: lock-function '%s' is not available.") % funcstring)
+                        continue
+                    args = list(arg.strip() for arg in rest.split(',') if arg and '=' not in arg)
+                    kwargs = dict([arg.split('=', 1) for arg in rest.split(',') if arg and '=' in arg])
+                    lock_funcs.append((func, args, kwargs))
+                    evalstring = evalstring.replace(funcstring, '%s')
+                if len(lock_funcs) < nfuncs:
                     continue
-                args = list(arg.strip() for arg in rest.split(',') if arg and '=' not in arg)
-                kwargs = dict([arg.split('=', 1) for arg in rest.split(',') if arg and '=' in arg])
-                lock_funcs.append((func, args, kwargs))
-                evalstring = evalstring.replace(funcstring, '%s')
-            if len(lock_funcs) < nfuncs:
-                continue
-            try:
-                # purge the eval string of any superfluous items, then test it
-                evalstring = " ".join(_RE_OK.findall(evalstring))
-                eval(evalstring % tuple(True for func in funclist), {}, {})
-            except Exception:
-                elist.append(_("Lock: definition '%s' has syntax errors.") % raw_lockstring)
-                continue
+                try:
+                    # purge the eval string of any superfluous items, then compile it
+                    lockfunc = _compile_lock(_RE_OK.findall(evalstring), lock_funcs)
+                except LockException:
+                    elist.append(_("Lock: definition '%s' has syntax errors.") % raw_lockstring)
+                    continue
+                lock_funcs = tuple(lock_funcs)
+                _COMPILED_LOCKS[raw_lockstring] = (access_type, lockfunc, lock_funcs)
             if access_type in locks:
                 duplicates += 1
                 wlist.append(_("LockHandler on %(obj)s: access type '%(access_type)s' changed from '%(source)s' to '%(goal)s' " %
                                {"obj": self.obj, "access_type": access_type, "source": locks[access_type][2], "goal": raw_lockstring}))
-            locks[access_type] = (evalstring, tuple(lock_funcs), raw_lockstring)
+            locks[access_type] = (lockfunc, lock_funcs, raw_lockstring)
         if wlist and WARNING_LOG:
             # a warning text was set, it's not an error, so only report
             logger.log_file("\n".join(wlist), WARNING_LOG)
@@ -267,6 +413,7 @@ class LockHandler(object):
         Store data
         """
         self.locks = self._parse_lockstring(storage_lockstring)
+        self.bump_version()
 
     def _save_locks(self):
         """
@@ -290,6 +437,16 @@ class LockHandler(object):
         """
         self.lock_bypass = hasattr(obj, "is_superuser") and obj.is_superuser
 
+    def bump_version(self):
+        """
+        Increase the version of this handler's object. This invalidates all
+        memoized lock results involving the object. It should be called
+        whenever something changed that lock functions may depend on.
+
+        """
+        self.version += 1
+        self._result_cache = {}
+
     def add(self, lockstring, validate_only=False):
         """
         Add a new lockstring to handler.
@@ -436,6 +593,7 @@ class LockHandler(object):
         if access_type in self.locks:
             del self.locks[access_type]
             self._save_locks()
+            self.bump_version()
             return True
         return False
     delete = remove  # alias for historical reasons
@@ -448,6 +606,7 @@ class LockHandler(object):
         self.locks = {}
         self.lock_storage = ""
         self._save_locks()
+        self.bump_version()
 
     def reset(self):
         """
@@ -499,18 +658,24 @@ class LockHandler(object):
 
             Parsing the lockstring, we (during cache) extract the valid
             lock functions and store their function objects in the right
-            order along with their args/kwargs. These are now executed in
-            sequence, creating a list of True/False values. This is put
-            into the evalstring, which is a string of AND/OR/NOT entries
-            separated by placeholders where each function result should
-            go. We just put those results in and evaluate the string to
-            get a final, combined True/False value for the lockstring.
+            order along with their args/kwargs. The AND/OR/NOT entries
+            combining them are then compiled into a nested set of callables
+            that call the lock functions and combine their results. The
+            compiled form is shared between all objects using the same
+            lock definition. Evaluation short-circuits, so a lock function
+            is only called if its result could change the outcome.
 
             The important bit with this solution is that the full
             lockstring is never blindly evaluated, and thus there (should
             be) no way to sneak in malign code in it. Only "safe" lock
             functions (as defined by your settings) are executed.
 
+            If `settings.LOCK_RESULT_CACHE` is set, the result is memoized
+            per accessing object and access type until the version of this
+            object, the accessing object or its account is bumped. Locks
+            using lock functions marked with `cacheable = False` are
+            never memoized.
+
         """
         try:
             # check if the lock should be bypassed (e.g. superuser status)
@@ -529,20 +694,54 @@ class LockHandler(object):
 
         # no superuser or bypass -> normal lock operation
         if access_type in self.locks:
-            # we have a lock, test it.
-            evalstring, func_tup, raw_string = self.locks[access_type]
-            # execute all lock funcs in the correct order, producing a tuple of True/False results.
-            true_false = tuple(bool(
-                tup[0](accessing_obj, self.obj, *tup[1], **tup[2])) for tup in func_tup)
-            # the True/False tuple goes into evalstring, which combines them
-            # with AND/OR/NOT in order to get the final result.
-            return eval(evalstring % true_false)
+            # we have a lock, test it by calling its compiled form
+            lockfunc = self.locks[access_type][0]
+            if _LOCK_RESULT_CACHE and lockfunc.cacheable:
+                return self._check_cached(accessing_obj, access_type, lockfunc)
+            return lockfunc(accessing_obj, self.obj)
         else:
             return default
 
+    def _check_cached(self, accessing_obj, access_type, lockfunc):
+        """
+        Helper method for checking a lock using the lock-result cache.
+
+        Args:
+            accessing_obj (object): The object seeking access.
+            access_type (str): The type of access wanted.
+            lockfunc (callable): The compiled lock for `access_type`.
+
+        Returns:
+            result (bool): The (possibly memoized) result of the lock.
+
+        """
+        try:
+            accessing_version = accessing_obj.locks.version
+        except AttributeError:
+            # not a typeclassed entity (like a Session); we can't track it
+            return lockfunc(accessing_obj, self.obj)
+        account = getattr(accessing_obj, "account", None)
+        versions = (self.version, accessing_version,
+                    account.locks.version if account else None, id(account))
+        cachekey = (id(accessing_obj), access_type)
+        cached = self._result_cache.get(cachekey)
+        if cached and cached[0]() is accessing_obj and cached[1] == versions:
+            return cached[2]
+        result = lockfunc(accessing_obj, self.obj)
+        try:
+            ref = weakref.ref(accessing_obj)
+        except TypeError:
+            return result
+        if len(self._result_cache) >= _LOCK_RESULT_CACHE_MAXSIZE:
+            self._result_cache = {}
+        # we store a weak reference to the accessing_obj to make sure the id
+        # was not re-used, without keeping the accessing_obj alive
+        self._result_cache[cachekey] = (ref, versions, result)
+        return result
+
     def _eval_access_type(self, accessing_obj, locks, access_type):
         """
-        Helper method for evaluating the access type using eval().
+        Helper method for evaluating the access type.
 
         Args:
             accessing_obj (object): Object seeking access.
@@ -550,10 +749,7 @@ class LockHandler(object):
             access_type (str): An access-type key to evaluate.
 
         """
-        evalstring, func_tup, raw_string = locks[access_type]
-        true_false = tuple(tup[0](accessing_obj, self.obj, *tup[1], **tup[2])
-                           for tup in func_tup)
-        return eval(evalstring % true_false)
+        return locks[access_type][0](accessing_obj, self.obj)
 
     def check_lockstring(self, accessing_obj, lockstring, no_superuser_bypass=False,
                          default=False, access_type=None):
@@ -7,6 +7,7 @@ the stability and integrity of the codebase during updates.
 This module tests the lock functionality of Evennia.
 
 """
+import weakref
 from evennia.utils.test_resources import EvenniaTest
 
 try:
@@ -38,6 +39,101 @@ class TestLockCheck(EvenniaTest):
         self.assertEquals(False, self.obj1.locks.check(self.obj2, 'get'))
         self.assertEquals(True, self.obj1.locks.check(self.obj2, 'not_exist', default=True))
 
+    def test_operators(self):
+        self.obj1.locks.add("a:true() or false() and false();b:not false() and not not true();"
+                            "c:false() or not true();d:NOT false() AND true()")
+        self.assertEquals(True, self.obj1.locks.check(self.obj2, 'a'))
+        self.assertEquals(True, self.obj1.locks.check(self.obj2, 'b'))
+        self.assertEquals(False, self.obj1.locks.check(self.obj2, 'c'))
+        self.assertEquals(True, self.obj1.locks.check(self.obj2, 'd'))
+
+    def test_short_circuit(self):
+        from evennia.locks import lockhandler
+        calls = []
+
+        def _tracked(accessing_obj, accessed_obj, *args, **kwargs):
+            calls.append(args)
+            return True
+        lockhandler._LOCKFUNCS["tracked"] = _tracked
+        try:
+            self.obj1.locks.add("sc1:true() or tracked(1);sc2:false() and tracked(2);sc3:tracked(3) or true()")
+            self.obj1.locks.check(self.obj2, "sc1")
+            self.obj1.locks.check(self.obj2, "sc2")
+            self.obj1.locks.check(self.obj2, "sc3")
+            self.assertEqual(calls, [("3",)])
+        finally:
+            del lockhandler._LOCKFUNCS["tracked"]
+
+    def test_compiled_cache(self):
+        from evennia.locks import lockhandler
+        self.obj1.locks.add("edit:perm(Admin)")
+        self.obj2.locks.add("edit:perm(Admin)")
+        self.assertTrue(self.obj1.locks.locks["edit"][0] is self.obj2.locks.locks["edit"][0])
+        self.assertTrue("edit:perm(Admin)" in lockhandler._COMPILED_LOCKS)
+
+    def test_syntax_error(self):
+        from evennia.locks.lockhandler import LockException
+        self.assertRaises(LockException, self.obj1.locks.add, "foo:true() false()")
+        self.assertRaises(LockException, self.obj1.locks.add, "foo:true() and")
+        self.assertRaises(LockException, self.obj1.locks.add, "foo:not")
+
+class TestLockResultCache(EvenniaTest):
+    def setUp(self):
+        from evennia.locks import lockhandler
+        super(TestLockResultCache, self).setUp()
+        self.lockhandler = lockhandler
+        self.calls = []
+
+        def _tracked(accessing_obj, accessed_obj, *args, **kwargs):
+            self.calls.append(args)
+            return bool(accessing_obj.tags.get("pass"))
+        lockhandler._LOCKFUNCS["tracked"] = _tracked
+        lockhandler._COMPILED_LOCKS.clear()
+        self.old_cache_setting = lockhandler._LOCK_RESULT_CACHE
+        lockhandler._LOCK_RESULT_CACHE = True
+
+    def tearDown(self):
+        self.lockhandler._LOCK_RESULT_CACHE = self.old_cache_setting
+        del self.lockhandler._LOCKFUNCS["tracked"]
+        self.lockhandler._COMPILED_LOCKS.clear()
+        super(TestLockResultCache, self).tearDown()
+
+    def test_memoized(self):
+        self.obj1.locks.add("use:tracked()")
+        self.assertEquals(False, self.obj1.locks.check(self.obj2, "use"))
+        self.assertEquals(False, self.obj1.locks.check(self.obj2, "use"))
+        self.assertEqual(len(self.calls), 1)
+
+    def test_weak_reference(self):
+        self.obj1.locks.add("use:tracked()")
+        self.obj1.locks.check(self.obj2, "use")
+        ref = list(self.obj1.locks._result_cache.values())[0][0]
+        # the cache must not keep the accessing object alive
+        self.assertIsInstance(ref, weakref.ref)
+        self.assertIs(ref(), self.obj2)
+
+    def test_invalidation(self):
+        self.obj1.locks.add("use:tracked()")
+        self.assertEquals(False, self.obj1.locks.check(self.obj2, "use"))
+        # change on the accessing object
+        self.obj2.tags.add("pass")
+        self.assertEquals(True, self.obj1.locks.check(self.obj2, "use"))
+        # change on the accessed object
+        self.obj1.attributes.add("foo", "bar")
+        self.assertEquals(True, self.obj1.locks.check(self.obj2, "use"))
+        self.assertEqual(len(self.calls), 3)
+        # change of the lock itself
+        self.obj1.locks.add("use:false()")
+        self.assertEquals(False, self.obj1.locks.check(self.obj2, "use"))
+
+    def test_not_cacheable(self):
+        self.lockhandler._LOCKFUNCS["tracked"].cacheable = False
+        self.obj1.locks.add("use:true() and tracked()")
+        self.obj1.locks.check(self.obj2, "use")
+        self.obj1.locks.check(self.obj2, "use")
+        self.assertEqual(len(self.calls), 2)
+
+
 class TestLockfuncs(EvenniaTest):
     def setUp(self):
         super(TestLockfuncs, self).setUp()
@@ -2,6 +2,7 @@
 Custom manager for Objects.
 """
 import re
+from bisect import bisect_left, insort
 from itertools import chain
 from django.db.models import Q
 from django.conf import settings
@@ -15,12 +16,166 @@ _GA = object.__getattribute__
 
 # delayed import
 _ATTR = None
+_AliasHandler = None
 
 _MULTIMATCH_REGEX = re.compile(settings.SEARCH_MULTIMATCH_REGEX, re.I + re.U)
+_SEARCH_INDEX_ENABLED = settings.OBJECT_SEARCH_INDEX
 
 # Try to use a custom way to parse id-tagged multimatches.
 
 
+class ObjectSearchIndex(object):
+    """
+    In-memory index of the lower-case keys and aliases of all objects,
+    used by global key/alias searches. It maps each full name, and each
+    word in it, to the ids of the objects having it.
+
+    The index is built from the database the first time it's used and
+    then kept up to date as keys are saved and aliases change. It only
+    narrows down which objects may match; matches are always fetched
+    by id, so an object deleted since indexing is just not found.
+
+    """
+
+    def __init__(self):
+        self.built = False
+        self._names = {}
+        self._words = {}
+        # all indexed words, sorted, for prefix lookups
+        self._sorted_words = []
+        # {objid: (key, (alias, ...))} of what is indexed for each object
+        self._entries = {}
+
+    def build(self):
+        """
+        (Re)build the index from the database.
+
+        """
+        from evennia.objects.models import ObjectDB
+        self.built = False
+        self._names, self._words, self._sorted_words, self._entries = {}, {}, [], {}
+        entries = {}
+        for objid, key in ObjectDB.objects.values_list("id", "db_key"):
+            entries[objid] = (key, [])
+        for objid, alias in ObjectDB.db_tags.through.objects.filter(
+                tag__db_tagtype="alias", tag__db_model="objectdb").values_list(
+                    "objectdb_id", "tag__db_key"):
+            if objid in entries:
+                entries[objid][1].append(alias)
+        for objid, (key, aliases) in entries.items():
+            self._add(objid, key, aliases)
+        self._sorted_words = sorted(self._words)
+        self.built = True
+
+    def _add(self, objid, key, aliases):
+        """
+        Index the key and aliases of an object.
+
+        """
+        key = (key or "").lower()
+        aliases = tuple(alias.lower() for alias in aliases if alias)
+        self._entries[objid] = (key, aliases)
+        for name in set((key, ) + aliases):
+            if not name:
+                continue
+            self._names.setdefault(name, set()).add(objid)
+            for word in name.split():
+                if word not in self._words:
+                    self._words[word] = set()
+                    if self.built:
+                        insort(self._sorted_words, word)
+                self._words[word].add(objid)
+
+    def remove(self, objid):
+        """
+        Remove an object from the index.
+
+        Args:
+            objid (int): Id of the object to remove.
+
+        """
+        key, aliases = self._entries.pop(objid, ("", ()))
+        for name in set((key, ) + aliases):
+            if name not in self._names:
+                continue
+            self._names[name].discard(objid)
+            if not self._names[name]:
+                del self._names[name]
+            for word in name.split():
+                ids = self._words.get(word)
+                if ids is not None:
+                    ids.discard(objid)
+                    if not ids:
+                        del self._words[word]
+                        del self._sorted_words[bisect_left(self._sorted_words, word)]
+
+    def update(self, obj, key_only=False):
+        """
+        Re-index the key and aliases of an object. Does nothing until
+        the index is built.
+
+        Args:
+            obj (Object): The object to re-index.
+            key_only (bool, optional): Only the key changed; keep the
+                indexed aliases rather than reading them again.
+
+        """
+        if not self.built or not obj.pk:
+            return
+        objid = obj.pk
+        if key_only:
+            aliases = self._entries.get(objid, ("", ()))[1]
+        else:
+            aliases = obj.aliases.all()
+        self.remove(objid)
+        self._add(objid, obj.db_key, aliases)
+
+    def exact(self, ostring):
+        """
+        Get the ids of objects having a key or alias.
+
+        Args:
+            ostring (str): The key or alias, in any case.
+
+        Returns:
+            ids (set): Ids of the matching objects.
+
+        """
+        if not self.built:
+            self.build()
+        return set(self._names.get(ostring.strip().lower(), ()))
+
+    def prefix(self, ostring):
+        """
+        Get the ids of objects that may fuzzy-match a search string.
+
+        Args:
+            ostring (str): The search string. Objects having a word in their
+                key or an alias starting with its first word are returned.
+
+        Returns:
+            ids (set): Ids of the possibly matching objects.
+
+        """
+        if not self.built:
+            self.build()
+        words = ostring.lower().split()
+        if not words:
+            return set()
+        first = words[0]
+        ids = set()
+        sorted_words = self._sorted_words
+        for ind in xrange(bisect_left(sorted_words, first), len(sorted_words)):
+            word = sorted_words[ind]
+            if not word.startswith(first):
+                break
+            ids.update(self._words[word])
+        return ids
+
+
+SEARCH_INDEX = ObjectSearchIndex()
+
+
 class ObjectDBManager(TypedObjectManager):
     """
     This ObjectManager implements methods for searching
@@ -247,6 +402,13 @@ class ObjectDBManager(TypedObjectManager):
 
         Returns:
             matches (list): A list of matches of length 0, 1 or more.
+
+        Notes:
+            Matching among candidates is done in memory, without querying
+            the database. Global searches use `SEARCH_INDEX` to find which
+            objects may match (unless `settings.OBJECT_SEARCH_INDEX` is
+            False) and then only fetch those, by id.
+
         """
         if not isinstance(ostring, basestring):
             if hasattr(ostring, "key"):
@@ -258,44 +420,90 @@ class ObjectDBManager(TypedObjectManager):
             # Exit early.
             return []
 
-        # build query objects
-        candidates_id = [_GA(obj, "id") for obj in make_iter(candidates) if obj]
-        cand_restriction = candidates is not None and Q(pk__in=candidates_id) or Q()
-        type_restriction = typeclasses and Q(db_typeclass_path__in=make_iter(typeclasses)) or Q()
-        if exact:
-            # exact match - do direct search
-            return self.filter(cand_restriction & type_restriction & (Q(db_key__iexact=ostring) |
-                                                                      Q(db_tags__db_key__iexact=ostring) & Q(db_tags__db_tagtype__iexact="alias"))).distinct()
-        elif candidates:
-            # fuzzy with candidates
-            search_candidates = self.filter(cand_restriction & type_restriction)
-        else:
+        global _AliasHandler
+        if not _AliasHandler:
+            from evennia.typeclasses.tags import AliasHandler as _AliasHandler
+
+        if candidates is None and _SEARCH_INDEX_ENABLED:
+            # global search - find the possible matches from the index
+            ids = SEARCH_INDEX.exact(ostring) if exact else SEARCH_INDEX.prefix(ostring)
+            if not ids:
+                return []
+            candidates = self._get_by_ids(ids)
+        elif candidates is None:
+            # build query objects
+            type_restriction = typeclasses and Q(db_typeclass_path__in=make_iter(typeclasses)) or Q()
+            if exact:
+                # exact match - do direct search
+                return list(self.filter(type_restriction & (
+                    Q(db_key__iexact=ostring) | Q(db_tags__db_key__iexact=ostring) &
+                    Q(db_tags__db_tagtype__iexact="alias"))).distinct().order_by("id"))
             # fuzzy without supplied candidates - we select our own candidates
-            search_candidates = self.filter(type_restriction & (Q(db_key__istartswith=ostring) |
-                                                                Q(db_tags__db_key__istartswith=ostring))).distinct()
-        # fuzzy matching
-        key_strings = search_candidates.values_list("db_key", flat=True).order_by("id")
+            candidates = self.filter(type_restriction & (Q(db_key__istartswith=ostring) |
+                                                         Q(db_tags__db_key__istartswith=ostring))
+                                     ).distinct().order_by("id")
+
+        # match among candidates, in memory
+        candidates = sorted(set(obj for obj in make_iter(candidates) if obj),
+                            key=lambda obj: _GA(obj, "id"))
+        if typeclasses:
+            typeclasses = make_iter(typeclasses)
+            candidates = [obj for obj in candidates
+                          if _GA(obj, "db_typeclass_path") in typeclasses]
+        if not candidates:
+            return []
+        _AliasHandler.prefetch(candidates)
+        lostring = ostring.strip().lower()
 
+        if exact:
+            return [obj for obj in candidates
+                    if _GA(obj, "db_key").lower() == lostring or lostring in obj.aliases.all()]
+
+        # fuzzy matching
+        key_strings = [_GA(obj, "db_key") for obj in candidates]
         index_matches = string_partial_matching(key_strings, ostring, ret_index=True)
         if index_matches:
             # a match by key
-            return [obj for ind, obj in enumerate(search_candidates) if ind in index_matches]
+            return [candidates[ind] for ind in index_matches]
         else:
             # match by alias rather than by key
-            search_candidates = search_candidates.filter(db_tags__db_tagtype__iexact="alias",
-                                                         db_tags__db_key__icontains=ostring)
             alias_strings = []
             alias_candidates = []
-            # TODO create the alias_strings and alias_candidates lists more efficiently?
-            for candidate in search_candidates:
-                for alias in candidate.aliases.all():
-                    alias_strings.append(alias)
-                    alias_candidates.append(candidate)
+            for candidate in candidates:
+                aliases = candidate.aliases.all()
+                if any(lostring in alias for alias in aliases):
+                    for alias in aliases:
+                        alias_strings.append(alias)
+                        alias_candidates.append(candidate)
             index_matches = string_partial_matching(alias_strings, ostring, ret_index=True)
             if index_matches:
                 return [alias_candidates[ind] for ind in index_matches]
             return []
 
+    def _get_by_ids(self, ids):
+        """
+        Get objects by id, taking them from the idmapper cache when
+        possible so that only the rest are queried for.
+
+        Args:
+            ids (iterable): Object ids.
+
+        Returns:
+            objects (list): The objects found.
+
+        """
+        objs = []
+        missing = []
+        for objid in ids:
+            obj = self.model.get_cached_instance(objid)
+            if obj is None:
+                missing.append(objid)
+            else:
+                objs.append(obj)
+        if missing:
+            objs.extend(self.filter(id__in=missing))
+        return objs
+
     # main search methods and helper functions
 
     def search_object(self, searchdata,
@@ -21,10 +21,61 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.core.validators import validate_comma_separated_integer_list
 
 from evennia.typeclasses.models import TypedObject
-from evennia.objects.manager import ObjectDBManager
+from evennia.typeclasses.attributes import AttributeHandler
+from evennia.typeclasses.tags import TagHandler
+from evennia.objects.manager import ObjectDBManager, SEARCH_INDEX
 from evennia.utils import logger
 from evennia.utils.utils import (make_iter, dbref, lazy_property)
 
+# delayed import
+_DEFAULT_AT_CMDSET_GET = None
+# cache of which typeclasses override at_cmdset_get
+_AT_CMDSET_GET_OVERRIDDEN = {}
+
+
+def overrides_at_cmdset_get(obj):
+    """
+    Check if the typeclass of an object overrides the default (empty)
+    `at_cmdset_get` hook.
+
+    Args:
+        obj (Object): The object to check.
+
+    Returns:
+        overrides (bool): If the hook is overridden and needs to be called.
+
+    """
+    global _DEFAULT_AT_CMDSET_GET
+    cls = obj.__class__
+    try:
+        return _AT_CMDSET_GET_OVERRIDDEN[cls]
+    except KeyError:
+        if not _DEFAULT_AT_CMDSET_GET:
+            from evennia.objects.objects import DefaultObject
+            _DEFAULT_AT_CMDSET_GET = DefaultObject.__dict__["at_cmdset_get"]
+        hook = next((klass.__dict__["at_cmdset_get"] for klass in cls.__mro__
+                     if "at_cmdset_get" in klass.__dict__), None)
+        overrides = hook is not None and hook is not _DEFAULT_AT_CMDSET_GET
+        _AT_CMDSET_GET_OVERRIDDEN[cls] = overrides
+        return overrides
+
+
+def _carries_cmdsets(obj):
+    """
+    Check if an object may offer cmdsets to those around it; that is
+    it either has non-empty cmdsets or may set them up on the fly
+    in its `at_cmdset_get` hook.
+
+    Args:
+        obj (Object): The object to check.
+
+    Returns:
+        carries (bool): If the object may have cmdsets to offer.
+
+    """
+    return (overrides_at_cmdset_get(obj) or
+            any(cset.key != "_EMPTY_CMDSET" for cset in obj.cmdset.cmdset_stack))
+
 
 class ContentsHandler(object):
     """
@@ -45,6 +96,9 @@ class ContentsHandler(object):
         """
         self.obj = obj
         self._pkcache = {}
+        # the subset of the contents carrying cmdsets. This is
+        # built on demand.
+        self._cmdset_pkcache = None
         self._idcache = obj.__class__.__instance_cache__
         self.init()
 
@@ -54,6 +108,7 @@ class ContentsHandler(object):
 
         """
         self._pkcache.update(dict((obj.pk, None) for obj in ObjectDB.objects.filter(db_location=self.obj) if obj.pk))
+        self._cmdset_pkcache = None
 
     def get(self, exclude=None):
         """
@@ -71,17 +126,70 @@ class ContentsHandler(object):
         else:
             pks = self._pkcache
         try:
-            return [self._idcache[pk] for pk in pks]
+            objs = [self._idcache[pk] for pk in pks]
         except KeyError:
             # this can happen if the idmapper cache was cleared for an object
             # in the contents cache. If so we need to re-initialize and try again.
             self.init()
             try:
-                return [self._idcache[pk] for pk in pks]
+                objs = [self._idcache[pk] for pk in pks]
             except KeyError:
                 # this means an actual failure of caching. Return real database match.
                 logger.log_err("contents cache failed for %s." % self.obj.key)
-                return list(ObjectDB.objects.filter(db_location=self.obj))
+                objs = list(ObjectDB.objects.filter(db_location=self.obj))
+        # the contents are likely to be looked at and searched together, so
+        # load their Attributes and Tags in bulk. Objects loaded before are
+        # skipped, so this only queries the first time.
+        AttributeHandler.prefetch(objs)
+        TagHandler.prefetch(objs)
+        return objs
+
+    def get_cmdset_carriers(self, exclude=None):
+        """
+        Return the subset of the contents that may offer cmdsets to
+        others; that is those having non-empty cmdsets or setting them
+        up on the fly with their `at_cmdset_get` hook.
+
+        Args:
+            exclude (Object or list of Object): object(s) to ignore
+
+        Returns:
+            objects (list): The cmdset-carrying Objects inside this location.
+
+        Notes:
+            This is used by the cmdhandler, so that it need not check all
+            the contents of a location for cmdsets on every command.
+
+        """
+        if self._cmdset_pkcache is None:
+            self._cmdset_pkcache = dict((obj.pk, None) for obj in self.get() if _carries_cmdsets(obj))
+        if exclude:
+            exclude_pks = [excl.pk for excl in make_iter(exclude)]
+            pks = [pk for pk in self._cmdset_pkcache if pk not in exclude_pks]
+        else:
+            pks = self._cmdset_pkcache
+        try:
+            return [self._idcache[pk] for pk in pks]
+        except KeyError:
+            # the idmapper cache was cleared; fall back to the full contents
+            self.init()
+            return [obj for obj in self.get(exclude=exclude) if _carries_cmdsets(obj)]
+
+    def update_cmdset_carrier(self, obj, has_cmdsets):
+        """
+        Update if an object in this location carries cmdsets. This is
+        called by the object's cmdsethandler whenever its cmdsets change.
+
+        Args:
+            obj (Object): An object inside this location.
+            has_cmdsets (bool): If `obj` currently has any non-empty cmdsets.
+
+        """
+        if self._cmdset_pkcache is not None and obj.pk in self._pkcache:
+            if has_cmdsets or overrides_at_cmdset_get(obj):
+                self._cmdset_pkcache[obj.pk] = None
+            else:
+                self._cmdset_pkcache.pop(obj.pk, None)
 
     def add(self, obj):
         """
@@ -92,6 +200,8 @@ class ContentsHandler(object):
 
         """
         self._pkcache[obj.pk] = None
+        if self._cmdset_pkcache is not None and _carries_cmdsets(obj):
+            self._cmdset_pkcache[obj.pk] = None
 
     def remove(self, obj):
         """
@@ -102,6 +212,8 @@ class ContentsHandler(object):
 
         """
         self._pkcache.pop(obj.pk, None)
+        if self._cmdset_pkcache is not None:
+            self._cmdset_pkcache.pop(obj.pk, None)
 
     def clear(self):
         """
@@ -207,6 +319,26 @@ class ObjectDB(TypedObject):
     def contents_cache(self):
         return ContentsHandler(self)
 
+    @classmethod
+    def get_idmapper_pinned(cls):
+        """
+        Pin puppeted objects, the locations holding them and the
+        contents of both in the idmapper cache.
+
+        Returns:
+            pinned (set): The pks of the pinned objects.
+
+        """
+        cache = cls.__dbclass__.__instance_cache__
+        pinned = set()
+        for pk, obj in cache.items():
+            if obj.db_sessid:
+                pinned.add(pk)
+                if obj.db_location_id:
+                    pinned.add(obj.db_location_id)
+        pinned.update([pk for pk, obj in cache.items() if obj.db_location_id in pinned])
+        return pinned
+
     # cmdset_storage property handling
     def __cmdset_storage_get(self):
         """getter"""
@@ -313,7 +445,29 @@ class ObjectDB(TypedObject):
                 # Since we cannot know at this point was old_location was, we
                 # trigger a full-on contents_cache update here.
                 logger.log_warn("db_location direct save triggered contents_cache.init() for all objects!")
-                [o.contents_cache.init() for o in self.__dbclass__.get_all_cached_instances()]
+                for obj in self.__dbclass__.get_all_cached_instances():
+                    # objects without a contents cache yet will load it when needed
+                    contents_cache = obj.__dict__.get("contents_cache")
+                    if contents_cache is not None:
+                        contents_cache.init()
+
+    def at_db_key_postsave(self, new):
+        """
+        This is called automatically after the key field was saved. It
+        updates the key in the search index.
+
+        Args:
+            new (bool): Set if this object has not yet been saved before.
+
+        """
+        SEARCH_INDEX.update(self, key_only=True)
+
+    def _update_search_index(self):
+        """
+        Called by the AliasHandler when aliases were changed.
+
+        """
+        SEARCH_INDEX.update(self)
 
     class Meta(object):
         """Define Django meta options"""
@@ -14,8 +14,9 @@ from collections import defaultdict
 from django.conf import settings
 
 from evennia.typeclasses.models import TypeclassBase
-from evennia.typeclasses.attributes import NickHandler
-from evennia.objects.manager import ObjectManager
+from evennia.typeclasses.attributes import AttributeHandler, NickHandler
+from evennia.typeclasses.tags import TagHandler
+from evennia.objects.manager import ObjectManager, SEARCH_INDEX
 from evennia.objects.models import ObjectDB
 from evennia.scripts.scripthandler import ScriptHandler
 from evennia.commands import cmdset, command
@@ -555,6 +556,30 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
             `at_msg_receive` will be called on this Object.
             All extra kwargs will be passed on to the protocol.
 
+        """
+        kwargs = self._prepare_msg(text, from_obj, options, kwargs)
+        if kwargs is None:
+            return
+
+        # relay to session(s)
+        sessions = make_iter(session) if session else self.sessions.all()
+        for session in sessions:
+            session.data_out(**kwargs)
+
+    def _prepare_msg(self, text, from_obj, options, kwargs):
+        """
+        Run the message hooks and build the data to send for `msg`.
+
+        Args:
+            text (str or tuple): The message to send.
+            from_obj (obj or list): Object(s) sending the message.
+            options (dict): Message-specific option-value pairs.
+            kwargs (dict): Other send-commands. This is updated in-place.
+
+        Returns:
+            kwargs (dict or None): The data to send to the sessions, or
+                None if `at_msg_receive` aborted the message.
+
         """
         # try send hooks
         if from_obj:
@@ -567,7 +592,7 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
         try:
             if not self.at_msg_receive(text=text, **kwargs):
                 # if at_msg_receive returns false, we abort message to this object
-                return
+                return None
         except Exception:
             logger.log_trace()
 
@@ -579,11 +604,7 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
                 except Exception:
                     text = repr(text)
             kwargs['text'] = text
-
-        # relay to session(s)
-        sessions = make_iter(session) if session else self.sessions.all()
-        for session in sessions:
-            session.data_out(**kwargs)
+        return kwargs
 
 
     def for_contents(self, func, exclude=None, **kwargs):
@@ -654,7 +675,15 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
             depending on the results of `char.get_display_name(looker)` and
             `npc.get_display_name(looker)` for each particular onlooker
 
+            The message is only formatted once for all lookers seeing the
+            same names. Lookers using the default `msg` method and getting
+            the same message have it sent to all their sessions at once.
+
         """
+        global _SESSIONS
+        if not _SESSIONS:
+            from evennia.server.sessionhandler import SESSIONS as _SESSIONS
+
         # we also accept an outcommand on the form (message, {kwargs})
         is_outcmd = text and is_iter(text)
         inmessage = text[0] if is_outcmd else text
@@ -664,15 +693,37 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
         if exclude:
             exclude = make_iter(exclude)
             contents = [obj for obj in contents if obj not in exclude]
+
+        # can't share the send when explicitly sending to sessions
+        multisend = "session" not in kwargs
+        default_msg = DefaultObject.msg.__func__
+        options = kwargs.pop("options", None)
+        # {substitutions: outmessage}
+        rendered = {}
+        # {outmessage: [sessions]} for lookers using the default msg
+        to_send = defaultdict(list)
         for obj in contents:
             if mapping:
-                substitutions = {t: sub.get_display_name(obj)
-                                 if hasattr(sub, 'get_display_name')
-                                 else str(sub) for t, sub in mapping.items()}
-                outmessage = inmessage.format(**substitutions)
+                substitutions = tuple((t, sub.get_display_name(obj)
+                                       if hasattr(sub, 'get_display_name')
+                                       else str(sub)) for t, sub in mapping.items())
+                outmessage = rendered.get(substitutions)
+                if outmessage is None:
+                    outmessage = rendered[substitutions] = inmessage.format(**dict(substitutions))
             else:
                 outmessage = inmessage
-            obj.msg(text=(outmessage, outkwargs), from_obj=from_obj, **kwargs)
+            if multisend and getattr(obj.msg, "__func__", None) is default_msg:
+                if obj._prepare_msg((outmessage, outkwargs), from_obj,
+                                    options, dict(kwargs)) is not None:
+                    to_send[outmessage].extend(obj.sessions.all())
+            else:
+                obj.msg(text=(outmessage, outkwargs), from_obj=from_obj,
+                        options=options, **kwargs)
+
+        for outmessage, sessions in to_send.items():
+            if sessions:
+                _SESSIONS.data_out_multi(sessions, text=(outmessage, outkwargs),
+                                         options=options, **kwargs)
 
     def move_to(self, destination, quiet=False,
                 emit_to_obj=None, use_destination=True, to_none=False, move_hooks=True,
@@ -930,7 +981,9 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
         self.location = None  # this updates contents_cache for our location
 
         # Perform the deletion of the object
+        objid = self.id
         super(DefaultObject, self).delete()
+        SEARCH_INDEX.remove(objid)
         return True
 
     def access(self, accessing_obj, access_type='read', default=False, no_superuser_bypass=False, **kwargs):
@@ -1484,7 +1537,11 @@ class DefaultObject(with_metaclass(TypeclassBase, ObjectDB)):
         if not looker:
             return ""
         # get and identify all objects
-        visible = (con for con in self.contents if con != looker and
+        contents = self.contents
+        # lock checks and display hooks commonly read Attributes and Tags
+        AttributeHandler.prefetch(contents)
+        TagHandler.prefetch(contents)
+        visible = (con for con in contents if con != looker and
                    con.access(looker, "view"))
         exits, users, things = [], [], defaultdict(list)
         for con in visible:
@@ -0,0 +1,53 @@
+from mock import patch
+from evennia.objects.models import ObjectDB
+from evennia.objects.manager import SEARCH_INDEX
+from evennia.utils.test_resources import EvenniaTest
+
+
+class TestMsgContents(EvenniaTest):
+    def test_msg_contents_grouped(self):
+        with patch("evennia.server.sessionhandler.SESSIONS.data_out_multi") as mock_multi, \
+                patch.object(self.char2, "msg") as mock_msg, \
+                patch.object(self.obj1, "get_display_name", side_effect=lambda looker: "Obj") \
+                as mock_name:
+            self.room1.msg_contents("{obj} is here.", mapping={"obj": self.obj1},
+                                    exclude=self.char1)
+            self.assertEqual(mock_name.call_count, len(self.room1.contents) - 1)
+            # overridden msg is still called
+            mock_msg.assert_called_once_with(text=("Obj is here.", {}), from_obj=None,
+                                             options=None)
+            self.assertFalse(mock_multi.called)
+
+    def test_msg_contents_multisend(self):
+        self.char1.sessions.add(self.session)
+        with patch("evennia.server.sessionhandler.SESSIONS.data_out_multi") as mock_multi:
+            self.room1.msg_contents("Hello!", exclude=self.char2)
+        mock_multi.assert_called_once_with([self.session], text=("Hello!", {}), options=None)
+
+
+class TestObjectSearch(EvenniaTest):
+    def setUp(self):
+        super(TestObjectSearch, self).setUp()
+        SEARCH_INDEX.build()
+        self.search = ObjectDB.objects.get_objs_with_key_or_alias
+
+    def test_global_search(self):
+        self.obj1.key = "big shiny sword"
+        self.obj2.aliases.add("rusty blade")
+        self.assertEqual(self.search("BIG shiny sword"), [self.obj1])
+        self.assertEqual(self.search("bi sw", exact=False), [self.obj1])
+        self.assertEqual(self.search("rusty blade"), [self.obj2])
+        self.assertEqual(self.search("rus", exact=False), [self.obj2])
+        self.obj2.aliases.remove("rusty blade")
+        self.assertEqual(self.search("rusty blade"), [])
+        self.obj1.delete()
+        self.assertEqual(self.search("big shiny sword"), [])
+
+    def test_candidate_search(self):
+        candidates = self.room1.contents
+        self.assertEqual(self.search("obj", candidates=candidates), [self.obj1])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search("obj", exact=False, candidates=candidates),
+                             [self.obj1, self.obj2])
+            self.assertEqual(self.search("char2", candidates=candidates,
+                                         typeclasses=[self.char2.typeclass_path]), [self.char2])
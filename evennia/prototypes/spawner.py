@@ -229,8 +229,9 @@ def prototype_from_object(obj):
     if not prot or len(prot) > 1:
         # no unambiguous prototype found - build new prototype
         prot = {}
+        # str() rounds the time to 1/100 s, so use the full repr
         prot['prototype_key'] = "From-Object-{}-{}".format(
-                obj.key, hashlib.md5(str(time.time())).hexdigest()[:7])
+                obj.key, hashlib.md5(repr(time.time())).hexdigest()[:7])
         prot['prototype_desc'] = "Built from {}".format(str(obj))
         prot['prototype_locks'] = "spawn:all();edit:all()"
         prot['prototype_tags'] = []
@@ -113,6 +113,18 @@ class ScriptDB(TypedObject):
         "Define Django meta options"
         verbose_name = "Script"
 
+    @classmethod
+    def get_idmapper_pinned(cls):
+        """
+        Pin all scripts in the idmapper cache, since evicting them
+        would stop their timers.
+
+        Returns:
+            pinned (set): The pks of the pinned scripts.
+
+        """
+        return set(cls.__dbclass__.__instance_cache__)
+
     #
     #
     # ScriptDB class properties
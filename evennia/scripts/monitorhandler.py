@@ -9,11 +9,16 @@ functionality:
 - Attribute-monitor tracks an object's specific Attribute and perform
     an action whenever that Attribute *changes* for whatever reason.
 
+Changes are not reported immediately but on the next reactor tick. A
+field changing many times within one tick thus only triggers its
+monitors once, when the final value is in place.
+
 """
 import inspect
 from builtins import object
 
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from twisted.internet import reactor
 from evennia.server.models import ServerConfig
 from evennia.utils.dbserialize import dbserialize, dbunserialize
 from evennia.utils import logger
@@ -36,6 +41,12 @@ class MonitorHandler(object):
         """
         self.savekey = "_monitorhandler_save"
         self.monitors = defaultdict(lambda: defaultdict(dict))
+        # (obj, fieldname) of all monitored fields, for a quick check in at_update
+        self._index = set()
+        # (obj, fieldname) updated since the last flush, in order of update
+        self._pending = OrderedDict()
+        self._flush_call = None
+        self._after_flush = []
 
     def save(self):
         """
@@ -67,7 +78,7 @@ class MonitorHandler(object):
                 non-persistent tickers must be killed.
 
         """
-        self.monitors = defaultdict(lambda: defaultdict(dict))
+        self.clear()
         restored_monitors = ServerConfig.objects.conf(key=self.savekey)
         if restored_monitors:
             restored_monitors = dbunserialize(restored_monitors)
@@ -85,6 +96,7 @@ class MonitorHandler(object):
 
                     if obj and hasattr(obj, fieldname):
                         self.monitors[obj][fieldname][idstring] = (callback, persistent, kwargs)
+                        self._index.add((obj, fieldname))
                 except Exception:
                     continue
         # make sure to clean data from database
@@ -92,12 +104,51 @@ class MonitorHandler(object):
 
     def at_update(self, obj, fieldname):
         """
-        Called by the field as it saves.
+        Called by the field as it saves. The monitors are called on the
+        next reactor tick, once per field no matter how many times it
+        was updated.
+
+        """
+        if (obj, fieldname) not in self._index:
+            return
+        self._pending[(obj, fieldname)] = True
+        if not self._flush_call:
+            self._flush_call = reactor.callLater(0, self.flush)
+
+    def after_flush(self, callback):
+        """
+        Have a callable called once the pending monitor callbacks have
+        been run. This allows monitor callbacks to collect their
+        results and send them together.
+
+        Args:
+            callback (callable): Called without arguments. It is only
+                called once, however many times it was added during
+                the same flush.
+
+        """
+        if callback not in self._after_flush:
+            self._after_flush.append(callback)
 
+    def flush(self):
         """
+        Call the monitors of all fields updated since the last flush.
+        This is called automatically on the next reactor tick after an
+        update.
+
+        """
+        if self._flush_call and self._flush_call.active():
+            self._flush_call.cancel()
+        self._flush_call = None
+        pending, self._pending = self._pending, OrderedDict()
+
         to_delete = []
-        if obj in self.monitors and fieldname in self.monitors[obj]:
-            for idstring, (callback, persistent, kwargs) in self.monitors[obj][fieldname].iteritems():
+        for obj, fieldname in pending:
+            if (obj, fieldname) not in self._index:
+                # removed since the update
+                continue
+            for idstring, (callback, persistent, kwargs) in \
+                    self.monitors[obj][fieldname].items():
                 try:
                     callback(obj=obj, fieldname=fieldname, **kwargs)
                 except Exception:
@@ -105,7 +156,27 @@ class MonitorHandler(object):
                     logger.log_trace("Monitor callback was removed.")
         # we cleanup non-found monitors (has to be done after loop)
         for (obj, fieldname, idstring) in to_delete:
-            del self.monitors[obj][fieldname][idstring]
+            self._remove(obj, fieldname, idstring)
+
+        after_flush, self._after_flush = self._after_flush, []
+        for callback in after_flush:
+            try:
+                callback()
+            except Exception:
+                logger.log_trace()
+
+    def _remove(self, obj, fieldname, idstring):
+        """
+        Remove a monitor and drop empty entries.
+
+        """
+        if obj in self.monitors and fieldname in self.monitors[obj]:
+            self.monitors[obj][fieldname].pop(idstring, None)
+            if not self.monitors[obj][fieldname]:
+                del self.monitors[obj][fieldname]
+                self._index.discard((obj, fieldname))
+                if not self.monitors[obj]:
+                    del self.monitors[obj]
 
     def add(self, obj, fieldname, callback, idstring="", persistent=False, **kwargs):
         """
@@ -151,6 +222,7 @@ class MonitorHandler(object):
             logger.log_trace(err)
         else:
             self.monitors[obj][fieldname][idstring] = (callback, persistent, kwargs)
+            self._index.add((obj, fieldname))
 
     def remove(self, obj, fieldname, idstring=""):
         """
@@ -162,15 +234,18 @@ class MonitorHandler(object):
                 return
             fieldname = "db_value"
 
-        idstring_dict = self.monitors[obj][fieldname]
-        if idstring in idstring_dict:
-            del self.monitors[obj][fieldname][idstring]
+        self._remove(obj, fieldname, idstring)
 
     def clear(self):
         """
         Delete all monitors.
         """
         self.monitors = defaultdict(lambda: defaultdict(dict))
+        self._index = set()
+        self._pending = OrderedDict()
+        if self._flush_call and self._flush_call.active():
+            self._flush_call.cancel()
+        self._flush_call = None
 
     def all(self):
         """
@@ -2,16 +2,22 @@
 Module containing the task handler for Evennia deferred tasks, persistent or not.
 """
 
+import heapq
 from datetime import datetime, timedelta
 
 from twisted.internet import reactor
+from twisted.internet.defer import Deferred, maybeDeferred
 from twisted.internet.task import deferLater
+from django.db import transaction
 from evennia.server.models import ServerConfig
 from evennia.utils.logger import log_err
 from evennia.utils.dbserialize import dbserialize, dbunserialize
 
 TASK_HANDLER = None
 
+# persistent tasks are saved as ServerConfig entries "delayed_tasks:<task_id>"
+_SAVE_NAME = "delayed_tasks"
+
 
 class TaskHandler(object):
 
@@ -26,11 +32,126 @@ class TaskHandler(object):
     `evennia.scripts.taskhandler.TASK_HANDLER`, which contains one
     instance of this class, and use its `add` and `remove` methods.
 
+    Persistent tasks are kept in a heap ordered by their due date and
+    only the earliest one has a call scheduled with the reactor. Each
+    task is saved to the database on its own, so adding or running a
+    task doesn't re-save all the others.
+
     """
 
     def __init__(self):
         self.tasks = {}
-        self.to_save = {}
+        # (date, task_id) of persistent tasks, earliest first. Removed
+        # tasks are only skipped when they reach the top.
+        self._heap = []
+        self._next_id = 1
+        # deferreds returned by `add`, fired when their task runs
+        self._deferreds = {}
+        # the reactor call for the earliest task, and its date
+        self._call = None
+        self._call_date = None
+
+    def _conf_key(self, task_id):
+        """
+        Get the ServerConfig key of a persistent task.
+
+        """
+        return "%s:%i" % (_SAVE_NAME, task_id)
+
+    def _serialize(self, date, callback, args, kwargs):
+        """
+        Serialize a task for saving. The whole task is serialized in one
+        go; only if that fails are the arguments checked one by one.
+
+        Args:
+            date (datetime): When the task is due.
+            callback (function or instance method): The callback.
+            args (list): Positional arguments to the callback.
+            kwargs (dict): Keyword arguments to the callback.
+
+        Returns:
+            serialized, args, kwargs (tuple): The serialized task and the
+                arguments that could be saved.
+
+        Raises:
+            ValueError: If the callback can not be pickled.
+
+        """
+        if getattr(callback, "__self__", None):
+            # `callback` is an instance method
+            safe_callback = (callback.__self__, callback.__name__)
+        else:
+            safe_callback = callback
+
+        try:
+            return dbserialize((date, safe_callback, args, kwargs)), args, kwargs
+        except (TypeError, AttributeError):
+            pass
+
+        # Find the arguments that can't be pickled
+        safe_args = []
+        safe_kwargs = {}
+        for arg in args:
+            try:
+                dbserialize(arg)
+            except (TypeError, AttributeError):
+                log_err("The positional argument {} cannot be "
+                        "pickled and will not be present in the arguments "
+                        "fed to the callback {}".format(arg, callback))
+            else:
+                safe_args.append(arg)
+
+        for key, value in kwargs.items():
+            try:
+                dbserialize(value)
+            except (TypeError, AttributeError):
+                log_err("The {} keyword argument {} cannot be "
+                        "pickled and will not be present in the arguments "
+                        "fed to the callback {}".format(key, value, callback))
+            else:
+                safe_kwargs[key] = value
+
+        try:
+            return dbserialize((date, safe_callback, safe_args, safe_kwargs)), safe_args, safe_kwargs
+        except (TypeError, AttributeError):
+            raise ValueError("the specified callback {} cannot be pickled. "
+                             "It must be a top-level function in a module or an "
+                             "instance method.".format(callback))
+
+    def _arm(self):
+        """
+        Make sure there is a reactor call scheduled for the earliest task.
+
+        """
+        while self._heap and self._heap[0][1] not in self.tasks:
+            # drop removed tasks
+            heapq.heappop(self._heap)
+        if not self._heap:
+            if self._call and self._call.active():
+                self._call.cancel()
+            self._call = None
+            return
+        date = self._heap[0][0]
+        if self._call and self._call.active():
+            if self._call_date <= date:
+                return
+            self._call.cancel()
+        seconds = max(0, (date - datetime.now()).total_seconds())
+        self._call_date = date
+        self._call = reactor.callLater(seconds, self._run_due)
+
+    def _run_due(self):
+        """
+        Run all tasks that are due and schedule the next one.
+
+        """
+        self._call = None
+        now = datetime.now()
+        while self._heap and self._heap[0][0] <= now:
+            _, task_id = heapq.heappop(self._heap)
+            if task_id in self.tasks:
+                self.do_task(task_id)
+        self._arm()
 
     def load(self):
         """Load from the ServerConfig.
@@ -40,55 +161,52 @@ class TaskHandler(object):
             It populates `self.tasks` according to the ServerConfig.
 
         """
-        to_save = False
-        value = ServerConfig.objects.conf("delayed_tasks", default={})
-        if isinstance(value, basestring):
-            tasks = dbunserialize(value)
-        else:
-            tasks = value
-
-        # At this point, `tasks` contains a dictionary of still-serialized tasks
-        for task_id, value in tasks.items():
+        saved = [(int(conf.key.split(":", 1)[1]), conf.value) for conf in
+                 ServerConfig.objects.filter(db_key__startswith=_SAVE_NAME + ":")]
+        to_delete = []
+
+        value = ServerConfig.objects.conf(_SAVE_NAME, default={})
+        if value:
+            # tasks saved all together by an older version
+            if isinstance(value, basestring):
+                value = dbunserialize(value)
+            with transaction.atomic():
+                for task_id, serialized in value.items():
+                    ServerConfig.objects.conf(self._conf_key(task_id), serialized)
+                    saved.append((task_id, serialized))
+                ServerConfig.objects.conf(_SAVE_NAME, delete=True)
+
+        # At this point, `saved` contains a list of still-serialized tasks
+        for task_id, value in saved:
             date, callback, args, kwargs = dbunserialize(value)
             if isinstance(callback, tuple):
                 # `callback` can be an object and name for instance methods
                 obj, method = callback
                 if obj is None:
-                    to_save = True
+                    to_delete.append(self._conf_key(task_id))
                     continue
 
                 callback = getattr(obj, method)
             self.tasks[task_id] = (date, callback, args, kwargs)
+            self._heap.append((date, task_id))
+        heapq.heapify(self._heap)
+        if self.tasks:
+            self._next_id = max(self._next_id, max(self.tasks) + 1)
 
-        if to_save:
-            self.save()
+        if to_delete:
+            ServerConfig.objects.filter(db_key__in=to_delete).delete()
 
     def save(self):
-        """Save the tasks in ServerConfig."""
-        for task_id, (date, callback, args, kwargs) in self.tasks.items():
-            if task_id in self.to_save:
-                continue
-
-            if getattr(callback, "__self__", None):
-                # `callback` is an instance method
-                obj = callback.__self__
-                name = callback.__name__
-                callback = (obj, name)
-
-            # Check if callback can be pickled. args and kwargs have been checked
-            safe_callback = None
-
-            try:
-                dbserialize(callback)
-            except (TypeError, AttributeError):
-                raise ValueError("the specified callback {} cannot be pickled. "
-                                 "It must be a top-level function in a module or an "
-                                 "instance method.".format(callback))
-            else:
-                safe_callback = callback
+        """
+        Re-save all persistent tasks in ServerConfig. Tasks are saved as
+        they are added, so this is not normally needed.
 
-            self.to_save[task_id] = dbserialize((date, safe_callback, args, kwargs))
-        ServerConfig.objects.conf("delayed_tasks", self.to_save)
+        """
+        with transaction.atomic():
+            ServerConfig.objects.filter(db_key__startswith=_SAVE_NAME + ":").delete()
+            for task_id, (date, callback, args, kwargs) in self.tasks.items():
+                serialized, _, _ = self._serialize(date, callback, args, kwargs)
+                ServerConfig.objects.conf(self._conf_key(task_id), serialized)
 
     def add(self, timedelay, callback, *args, **kwargs):
         """Add a new persistent task in the configuration.
@@ -102,47 +220,27 @@ class TaskHandler(object):
             persistent (bool, optional): persist the task (store it).
             any (any): additional keyword arguments to send to the callback
 
+        Returns:
+            deferred (Deferred): Fires with the return of the callback when
+                the task has run. Cancelling the deferred of a persistent
+                task removes the task.
+
         """
         persistent = kwargs.get("persistent", False)
         if persistent:
             del kwargs["persistent"]
-            now = datetime.now()
-            delta = timedelta(seconds=timedelay)
-
-            # Choose a free task_id
-            safe_args = []
-            safe_kwargs = {}
-            used_ids = self.tasks.keys()
-            task_id = 1
-            while task_id in used_ids:
-                task_id += 1
-
-            # Check that args and kwargs contain picklable information
-            for arg in args:
-                try:
-                    dbserialize(arg)
-                except (TypeError, AttributeError):
-                    log_err("The positional argument {} cannot be "
-                            "pickled and will not be present in the arguments "
-                            "fed to the callback {}".format(arg, callback))
-                else:
-                    safe_args.append(arg)
-
-            for key, value in kwargs.items():
-                try:
-                    dbserialize(value)
-                except (TypeError, AttributeError):
-                    log_err("The {} keyword argument {} cannot be "
-                            "pickled and will not be present in the arguments "
-                            "fed to the callback {}".format(key, value, callback))
-                else:
-                    safe_kwargs[key] = value
-
-            self.tasks[task_id] = (now + delta, callback, safe_args, safe_kwargs)
-            self.save()
-            callback = self.do_task
-            args = [task_id]
-            kwargs = {}
+            date = datetime.now() + timedelta(seconds=timedelay)
+            serialized, safe_args, safe_kwargs = self._serialize(date, callback, args, kwargs)
+
+            task_id = self._next_id
+            self._next_id += 1
+            ServerConfig.objects.conf(self._conf_key(task_id), serialized)
+            self.tasks[task_id] = (date, callback, safe_args, safe_kwargs)
+            heapq.heappush(self._heap, (date, task_id))
+            deferred = self._deferreds[task_id] = Deferred(
+                canceller=lambda _: self.tasks.get(task_id) and self.remove(task_id))
+            self._arm()
+            return deferred
 
         return deferLater(reactor, timedelay, callback, *args, **kwargs)
 
@@ -158,10 +256,8 @@ class TaskHandler(object):
 
         """
         del self.tasks[task_id]
-        if task_id in self.to_save:
-            del self.to_save[task_id]
-
-        self.save()
+        self._deferreds.pop(task_id, None)
+        ServerConfig.objects.conf(self._conf_key(task_id), delete=True)
 
     def do_task(self, task_id):
         """Execute the task (call its callback).
@@ -169,28 +265,34 @@ class TaskHandler(object):
         Args:
             task_id (int): a valid task ID.
 
+        Returns:
+            deferred (Deferred): Fires with the return of the callback.
+
         Note:
             This will also remove it from the list of current tasks.
 
         """
         date, callback, args, kwargs = self.tasks.pop(task_id)
-        if task_id in self.to_save:
-            del self.to_save[task_id]
-
-        self.save()
-        callback(*args, **kwargs)
+        ServerConfig.objects.conf(self._conf_key(task_id), delete=True)
+        deferred = maybeDeferred(callback, *args, **kwargs)
+        waiting = self._deferreds.pop(task_id, None)
+        if waiting:
+            deferred.chainDeferred(waiting)
+        else:
+            deferred.addErrback(lambda failure: log_err(
+                "Delayed task %i failed:\n%s" % (task_id, failure.getTraceback())))
+        return deferred
 
     def create_delays(self):
         """Create the delayed tasks for the persistent tasks.
 
         Note:
             This method should be automatically called when Evennia starts.
+            Only the earliest task is scheduled with the reactor, the
+            others follow as their time comes.
 
         """
-        now = datetime.now()
-        for task_id, (date, callbac, args, kwargs) in self.tasks.items():
-            seconds = max(0, (date - now).total_seconds())
-            deferLater(reactor, seconds, self.do_task, task_id)
+        self._arm()
 
 
 # Create the soft singleton
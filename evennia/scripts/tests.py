@@ -1,8 +1,17 @@
 # this is an optimized version only available in later Django versions
 from unittest import TestCase
+from datetime import datetime, timedelta
+from mock import Mock, call, patch
+from twisted.internet.task import Clock, deferLater
 from evennia.scripts.models import ScriptDB, ObjectDoesNotExist
 from evennia.utils.create import create_script
 from evennia.scripts.scripts import DoNothing
+from evennia.scripts.tickerhandler import Ticker, TickerHandler
+from evennia.scripts.taskhandler import TaskHandler
+from evennia.scripts.monitorhandler import MonitorHandler
+from evennia.server import inputfuncs
+from evennia.server.models import ServerConfig
+from evennia.utils.dbserialize import dbserialize
 
 
 class TestScriptDB(TestCase):
@@ -41,3 +50,254 @@ class TestScriptDB(TestCase):
         "Can deleted scripts be said to be valid?"
         self.scr.delete()
         self.assertFalse(self.scr.is_valid())  # assertRaises? See issue #509
+
+
+_TICKS = []
+
+
+def _tick(name):
+    _TICKS.append(name)
+
+
+class TestTicker(TestCase):
+    "Check the slotted Ticker spreads its subscribers over its interval"
+
+    def setUp(self):
+        del _TICKS[:]
+        self.clock = Clock()
+        self.ticker = Ticker(10)
+        self.ticker.task.clock = self.clock
+
+    def tearDown(self):
+        self.ticker.stop()
+
+    def _add(self, nsubs):
+        for num in range(nsubs):
+            store_key = (None, None, "evennia.scripts.tests._tick", 10, str(num), False)
+            self.ticker.add(store_key, num, _callback=_tick, _obj=None)
+
+    def _advance(self, nsteps):
+        # step the clock one ticker step at a time
+        for _ in range(nsteps):
+            self.clock.advance(1)
+
+    def test_slots(self):
+        self._add(20)
+        self.assertEqual(self.ticker.nslots, 10)
+        self.assertEqual(len(self.ticker), 20)
+        self._advance(1)
+        self.assertEqual(len(_TICKS), 2)
+        self._advance(9)
+        self.assertEqual(sorted(_TICKS), range(20))
+        self._advance(10)
+        self.assertEqual(len(_TICKS), 40)
+        stats = self.ticker.stats
+        self.assertTrue(stats["max_duration"] >= stats["duration"] >= 0)
+        self.assertTrue(stats["max_lag"] >= stats["lag"] >= 0)
+
+    def test_late_step(self):
+        self._add(20)
+        self._advance(1)
+        # the reactor is late; the steps at 2-4 are dropped by the task
+        self.clock.advance(4)
+        self.assertEqual(len(_TICKS), 10)
+        self._advance(5)
+        self.assertEqual(sorted(_TICKS), range(20))
+        # more than a full interval late calls each subscriber once
+        self.clock.advance(25)
+        self.assertEqual(len(_TICKS), 40)
+        self._advance(10)
+        self.assertEqual(len(_TICKS), 60)
+
+    def test_remove(self):
+        self._add(3)
+        self.ticker.remove((None, None, "evennia.scripts.tests._tick", 10, "1", False))
+        self._advance(10)
+        self.assertEqual(sorted(_TICKS), [0, 2])
+        self.ticker.stop()
+        self.assertFalse(self.ticker.task.running)
+
+    @patch("evennia.scripts.tickerhandler._TICKER_MAX_TIME_PER_TURN", -1)
+    def test_max_time_per_turn(self):
+        self._add(20)
+        with patch("evennia.scripts.tickerhandler.deferLater", wraps=deferLater) as mock_defer:
+            self.clock.advance(1)
+            # yields to the reactor after each call
+            self.assertEqual(mock_defer.call_count, 2)
+        self.assertEqual(len(_TICKS), 2)
+
+
+class TestTickerHandler(TestCase):
+    "Check the TickerHandler saves and restores its subscriptions one by one"
+
+    def setUp(self):
+        self.handler = TickerHandler(save_name="test_tickers")
+
+    def tearDown(self):
+        self.handler.clear()
+
+    def _saved(self):
+        return ServerConfig.objects.filter(db_key__startswith="test_tickers:").count()
+
+    def test_save_restore(self):
+        for num in range(3):
+            self.handler.add(10, _tick, idstring=str(num))
+        self.assertEqual(self._saved(), 3)
+        self.handler.remove(10, _tick, idstring="1")
+        self.assertEqual(self._saved(), 2)
+        self.handler.add(20, _tick, idstring="nonpersistent", persistent=False)
+        self.handler.save()
+        self.assertEqual(self._saved(), 4)  # incl. start delays
+        self.handler.ticker_pool.stop()
+
+        restored = TickerHandler(save_name="test_tickers")
+        restored.restore(server_reload=False)
+        self.assertEqual(sorted(key[4] for key in restored.ticker_storage), ["0", "2"])
+        self.assertEqual(sorted(restored.all()), [10])
+        self.assertEqual(self._saved(), 3)
+        restored.clear()
+        self.assertEqual(self._saved(), 0)
+
+    def test_restore_legacy(self):
+        self.handler.add(10, _tick, idstring="old")
+        store_key = list(self.handler.ticker_storage)[0]
+        legacy = dbserialize({store_key: self.handler.ticker_storage[store_key]})
+        self.handler.clear()
+        ServerConfig.objects.conf(key="test_tickers", value=legacy)
+
+        self.handler.restore()
+        self.assertEqual(list(self.handler.ticker_storage), [store_key])
+        self.assertEqual(ServerConfig.objects.conf(key="test_tickers"), None)
+        self.assertEqual(self._saved(), 1)
+
+
+class _FakeDatetime(datetime):
+    "Datetime following a task Clock"
+    clock = None
+    start = datetime(2018, 1, 1)
+
+    @classmethod
+    def now(cls):
+        return cls.start + timedelta(seconds=cls.clock.seconds())
+
+
+class TestTaskHandler(TestCase):
+    "Check persistent tasks are run in order and saved one by one"
+
+    def setUp(self):
+        del _TICKS[:]
+        self.clock = _FakeDatetime.clock = Clock()
+        self.patches = [patch("evennia.scripts.taskhandler.reactor", self.clock),
+                        patch("evennia.scripts.taskhandler.datetime", _FakeDatetime)]
+        for patcher in self.patches:
+            patcher.start()
+        self.handler = TaskHandler()
+
+    def tearDown(self):
+        for patcher in self.patches:
+            patcher.stop()
+        ServerConfig.objects.filter(db_key__startswith="delayed_tasks").delete()
+
+    def _saved(self):
+        return ServerConfig.objects.filter(db_key__startswith="delayed_tasks:").count()
+
+    def test_add_run(self):
+        deferreds = [self.handler.add(delay, _tick, delay, persistent=True)
+                     for delay in (30, 10, 20, 10)]
+        self.assertEqual(sorted(self.handler.tasks), [1, 2, 3, 4])
+        self.assertEqual(self._saved(), 4)
+        # only the earliest task is scheduled
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.handler.remove(3)
+        self.clock.advance(10)
+        self.assertEqual(_TICKS, [10, 10])
+        self.assertTrue(deferreds[1].called)
+        self.assertFalse(deferreds[0].called)
+        self.clock.advance(20)
+        self.assertEqual(_TICKS, [10, 10, 30])
+        self.assertFalse(deferreds[2].called)
+        self.assertEqual(self._saved(), 0)
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+    def test_cancel(self):
+        deferred = self.handler.add(10, _tick, 1, persistent=True)
+        deferred.addErrback(lambda failure: None)
+        deferred.cancel()
+        self.assertEqual(self.handler.tasks, {})
+        self.clock.advance(10)
+        self.assertEqual(_TICKS, [])
+
+    def test_load(self):
+        self.handler.add(10, _tick, 1, persistent=True)
+        self.handler.add(5, _tick, 2, persistent=True)
+        self.handler.remove(1)
+        # server shutdown
+        for call in self.clock.getDelayedCalls():
+            call.cancel()
+
+        loaded = TaskHandler()
+        loaded.load()
+        self.assertEqual(list(loaded.tasks), [2])
+        self.assertEqual(loaded.add(1, _tick, 3, persistent=True).called, False)
+        self.assertEqual(sorted(loaded.tasks), [2, 3])
+        loaded.create_delays()
+        self.clock.advance(5)
+        self.assertEqual(_TICKS, [3, 2])
+
+
+_MONITORED = []
+
+
+def _monitor_callback(obj=None, fieldname=None, **kwargs):
+    _MONITORED.append(getattr(obj, fieldname))
+
+
+class TestMonitorHandler(TestCase):
+    "Check that monitor callbacks are coalesced until the next tick"
+
+    def setUp(self):
+        del _MONITORED[:]
+        self.clock = Clock()
+        self.handler = MonitorHandler()
+        self.patches = [patch("evennia.scripts.monitorhandler.reactor", self.clock),
+                        patch("evennia.scripts.monitorhandler.MONITOR_HANDLER", self.handler),
+                        patch("evennia.utils.idmapper.models._MONITOR_HANDLER", self.handler)]
+        for patcher in self.patches:
+            patcher.start()
+        self.scr = create_script(DoNothing)
+
+    def tearDown(self):
+        for patcher in self.patches:
+            patcher.stop()
+        self.scr.delete()
+
+    def test_coalesce(self):
+        self.scr.key = "unmonitored"
+        self.assertFalse(self.clock.getDelayedCalls())
+        self.handler.add(self.scr, "db_key", _monitor_callback)
+        self.scr.key = "first"
+        self.scr.key = "second"
+        self.assertEqual(_MONITORED, [])
+        self.assertEqual(len(self.clock.getDelayedCalls()), 1)
+        self.clock.advance(0)
+        self.assertEqual(_MONITORED, ["second"])
+
+        self.scr.key = "third"
+        self.handler.remove(self.scr, "db_key")
+        self.clock.advance(0)
+        self.assertEqual(_MONITORED, ["second"])
+        self.assertFalse(self.handler.monitors)
+
+    def test_session_msg(self):
+        session = Mock()
+        inputfuncs._on_monitor_change(obj=self.scr, fieldname="db_key", name="key",
+                                      session=session)
+        inputfuncs._on_monitor_change(obj=self.scr, fieldname="db_persistent",
+                                      name="persistent", session=session)
+        inputfuncs._on_monitor_change(obj=self.scr, fieldname="db_key", name="key",
+                                      session=session)
+        self.handler.flush()
+        # one message per changed value, in the usual monitor format
+        self.assertEqual(session.msg.call_args_list,
+                         [call(monitor={"name": "key", "value": self.scr.key}),
+                          call(monitor={"name": "persistent", "value": self.scr.persistent})])
@@ -29,7 +29,13 @@ to reference them safely across reboots and saves).
 The handler will transparently set
 up and add new timers behind the scenes to tick at given intervals,
 using a TickerPool - all callables with the same interval will share
-the interval ticker.
+the interval ticker. To avoid calling all subscribers of a busy
+interval at the same moment, each ticker spreads its subscribers over
+a number of slots (`settings.TICKER_SLOTS`) called one after the other
+during the interval, like the slots of a timer wheel. If calling the
+subscribers takes long, the ticker pauses after
+`settings.TICKER_MAX_TIME_PER_TURN` seconds to let the server process
+other things before it continues.
 
 To remove:
 
@@ -66,12 +72,17 @@ call the handler's `save()` and `restore()` methods when the server reboots.
 
 """
 import inspect
+import hashlib
 from builtins import object
 
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import inlineCallbacks, Deferred
+from twisted.internet.task import deferLater
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
 from evennia.scripts.scripts import ExtendedLoopingCall
 from evennia.server.models import ServerConfig
+from evennia.typeclasses.attributes import AttributeHandler
 from evennia.utils.logger import log_trace, log_err
 from evennia.utils.dbserialize import dbserialize, dbunserialize, pack_dbobj
 from evennia.utils import variable_from_module
@@ -79,6 +90,9 @@ from evennia.utils import variable_from_module
 _GA = object.__getattribute__
 _SA = object.__setattr__
 
+_TICKER_SLOTS = settings.TICKER_SLOTS
+_TICKER_MAX_TIME_PER_TURN = settings.TICKER_MAX_TIME_PER_TURN
+
 
 _ERROR_ADD_TICKER = \
     """TickerHandler: Tried to add an invalid ticker:
@@ -91,60 +105,111 @@ class Ticker(object):
     Represents a repeatedly running task that calls
     hooks repeatedly. Overload `_callback` to change the
     way it operates.
+
+    The subscribers are spread evenly over `self.nslots` slots. The
+    task steps every `interval / nslots` seconds, each step calling
+    the subscribers of the next slot, so every subscriber is still
+    called once every `interval` seconds. If the task runs late and
+    steps are dropped, the next step calls all slots that were due.
+
     """
 
-    @inlineCallbacks
-    def _callback(self):
+    def _steps_due(self, now):
         """
-        This will be called repeatedly every `self.interval` seconds.
-        `self.subscriptions` contain tuples of (obj, args, kwargs) for
-        each subscribing object.
+        Get the number of steps due since the last step. The task drops
+        the steps it misses when the reactor is late (or when a step
+        takes longer than `interval / nslots`), so this may be more than
+        one.
 
-        If overloading, this callback is expected to handle all
-        subscriptions when it is triggered. It should not return
-        anything and should not traceback on poorly designed hooks.
-        The callback should ideally work under @inlineCallbacks so it
-        can yield appropriately.
+        Args:
+            now (float): The current time.
+
+        Returns:
+            nsteps (int): The number of steps due, at least one.
 
-        The _hook_key, which is passed down through the handler via
-        kwargs is used here to identify which hook method to call.
+        """
+        step = self.interval / float(self.nslots)
+        # the steps passed since the first one, with some leeway for
+        # rounding errors in the scheduled times
+        nsteps = int((now - self._step_origin) / step + 0.001) + 1
+        if nsteps <= self._step_count:
+            # a forced step; the task continues its steps from now
+            self._step_origin, self._step_count = now, 1
+            return 1
+        nsteps, self._step_count = nsteps - self._step_count, nsteps
+        return nsteps
 
+    @inlineCallbacks
+    def _callback(self):
         """
-        self._to_add = []
-        self._to_remove = []
-        self._is_ticking = True
-        for store_key, (args, kwargs) in self.subscriptions.iteritems():
-            callback = yield kwargs.pop("_callback", "at_tick")
-            obj = yield kwargs.pop("_obj", None)
+        This will be called repeatedly every `self.interval / self.nslots`
+        seconds, calling the subscribers in the next slot, or in all
+        slots that were due since the last call if steps were missed.
+        `self.subscriptions` contain tuples of (args, kwargs) for each
+        subscription.
+
+        If overloading, this callback is expected to handle all
+        subscriptions of the due slots when it is triggered. It should not
+        return anything and should not traceback on poorly designed
+        hooks. The callback should ideally work under @inlineCallbacks
+        so it can yield appropriately.
+
+        The _callback and _obj, which are passed down through the handler
+        via kwargs, are used to identify which hook method to call. They
+        are separated out when the subscription is added.
+
+        """
+        clock = self.task.clock
+        start = clock.seconds()
+        # how late we are compared to when this step should have run
+        lag = max(0, start - getattr(self.task, "_expectNextCallAt", start))
+        calls = []
+        nsteps = self._steps_due(start)
+        if nsteps > self.nslots:
+            # more than an interval was missed; call each slot once, keeping
+            # the slots in step with the clock
+            self._next_slot = (self._next_slot + nsteps - self.nslots) % self.nslots
+            nsteps = self.nslots
+        for _ in range(nsteps):
+            slot = self._slots[self._next_slot]
+            self._next_slot = (self._next_slot + 1) % self.nslots
+            calls.extend((slot, store_key, sub) for store_key, sub in slot.items())
+        # load the Attributes of all subscribers at once rather than one
+        # query per subscriber as their hooks access them
+        AttributeHandler.prefetch([obj for _, _, (_, obj, _, _) in calls
+                                   if hasattr(obj, "__dbclass__")])
+        turn_start = start
+        for slot, store_key, (callback, obj, args, kwargs) in calls:
+            if store_key not in slot:
+                # removed by an earlier subscriber in this step
+                continue
             try:
                 if callable(callback):
                     # call directly
-                    yield callback(*args, **kwargs)
-                    continue
-                # try object method
-                if not obj or not obj.pk:
+                    ret = callback(*args, **kwargs)
+                elif not obj or not obj.pk:
                     # object was deleted between calls
-                    self._to_remove.append(store_key)
+                    self.remove(store_key)
                     continue
                 else:
-                    yield _GA(obj, callback)(*args, **kwargs)
+                    # call object method
+                    ret = _GA(obj, callback)(*args, **kwargs)
+                if isinstance(ret, Deferred):
+                    yield ret
             except ObjectDoesNotExist:
                 log_trace("Removing ticker.")
-                self._to_remove.append(store_key)
+                self.remove(store_key)
             except Exception:
                 log_trace()
-            finally:
-                # make sure to re-store
-                kwargs["_callback"] = callback
-                kwargs["_obj"] = obj
-        # cleanup - we do this here to avoid changing the subscription dict while it loops
-        self._is_ticking = False
-        for store_key in self._to_remove:
-            self.remove(store_key)
-        for store_key, (args, kwargs) in self._to_add:
-            self.add(store_key, *args, **kwargs)
-        self._to_remove = []
-        self._to_add = []
+            if clock.seconds() - turn_start > _TICKER_MAX_TIME_PER_TURN:
+                # let the reactor handle other events before continuing
+                yield deferLater(clock, 0, lambda: None)
+                turn_start = clock.seconds()
+        duration = clock.seconds() - start
+        stats = self.stats
+        stats["lag"], stats["duration"] = lag, duration
+        stats["max_lag"] = max(stats["max_lag"], lag)
+        stats["max_duration"] = max(stats["max_duration"], duration)
 
     def __init__(self, interval):
         """
@@ -156,12 +221,24 @@ class Ticker(object):
         """
         self.interval = interval
         self.subscriptions = {}
-        self._is_ticking = False
-        self._to_remove = []
-        self._to_add = []
+        # slots are at least one second apart
+        self.nslots = max(1, min(_TICKER_SLOTS, int(interval)))
+        # each slot is {store_key: (callback, obj, args, kwargs)}
+        self._slots = [{} for _ in range(self.nslots)]
+        self._slot_index = {}
+        self._next_slot = 0
+        # the time of the first step and the number of steps taken since,
+        # set when the task starts
+        self._step_origin = 0
+        self._step_count = 0
+        # durations and lag (in seconds) of the latest and slowest steps
+        self.stats = {"duration": 0, "max_duration": 0, "lag": 0, "max_lag": 0}
         # set up a twisted asynchronous repeat call
         self.task = ExtendedLoopingCall(self._callback)
 
+    def __len__(self):
+        return len(self.subscriptions)
+
     def validate(self, start_delay=None):
         """
         Start/stop the task depending on how many subscribers we have
@@ -176,11 +253,17 @@ class Ticker(object):
             if not subs:
                 self.task.stop()
         elif subs:
-            self.task.start(self.interval, now=False, start_delay=start_delay)
+            step = self.interval / float(self.nslots)
+            self._step_origin = self.task.clock.seconds() + (
+                step if start_delay is None else max(0, start_delay))
+            self._step_count = 0
+            self.task.start(step, now=False, start_delay=start_delay)
 
     def add(self, store_key, *args, **kwargs):
         """
-        Sign up a subscriber to this ticker.
+        Sign up a subscriber to this ticker. New subscribers are put in
+        the slot with the fewest subscribers.
+
         Args:
             store_key (str): Unique storage hash for this ticker subscription.
             args (any, optional): Arguments to call the hook method with.
@@ -191,14 +274,18 @@ class Ticker(object):
                 `interval`.
 
         """
-        if self._is_ticking:
-            # protects the subscription dict from
-            # updating while it is looping
-            self._to_add.append((store_key, (args, kwargs)))
-        else:
-            start_delay = kwargs.pop("_start_delay", None)
-            self.subscriptions[store_key] = (args, kwargs)
-            self.validate(start_delay=start_delay)
+        start_delay = kwargs.pop("_start_delay", None)
+        self.subscriptions[store_key] = (args, kwargs)
+        index = self._slot_index.get(store_key)
+        if index is None:
+            index = min(range(self.nslots), key=lambda ind: len(self._slots[ind]))
+            self._slot_index[store_key] = index
+        # separate out the hook to call, so it need not be done every call
+        callkwargs = dict((key, val) for key, val in kwargs.items()
+                          if key not in ("_callback", "_obj", "_start_delay"))
+        self._slots[index][store_key] = (kwargs.get("_callback", "at_tick"),
+                                         kwargs.get("_obj", None), args, callkwargs)
+        self.validate(start_delay=start_delay)
 
     def remove(self, store_key):
         """
@@ -208,13 +295,11 @@ class Ticker(object):
             store_key (str): Unique store key.
 
         """
-        if self._is_ticking:
-            # this protects the subscription dict from
-            # updating while it is looping
-            self._to_remove.append(store_key)
-        else:
-            self.subscriptions.pop(store_key, False)
-            self.validate()
+        self.subscriptions.pop(store_key, False)
+        index = self._slot_index.pop(store_key, None)
+        if index is not None:
+            self._slots[index].pop(store_key, None)
+        self.validate()
 
     def stop(self):
         """
@@ -222,6 +307,8 @@ class Ticker(object):
 
         """
         self.subscriptions = {}
+        self._slots = [{} for _ in range(self.nslots)]
+        self._slot_index = {}
         self.validate()
 
 
@@ -289,6 +376,22 @@ class TickerPool(object):
             for ticker in self.tickers.values():
                 ticker.stop()
 
+    def stats(self):
+        """
+        Get the load of each ticker in the pool.
+
+        Returns:
+            stats (dict): A dict `{interval: {"subscriptions": int, "slots": int,
+                "duration": float, "max_duration": float, "lag": float, "max_lag": float},
+                ...}`. The durations are the times in seconds it took to call the
+                subscribers of one slot and the lags how late a slot started,
+                for the latest and the slowest step respectively.
+
+        """
+        return dict((interval, dict(ticker.stats, subscriptions=len(ticker.subscriptions),
+                                    slots=ticker.nslots))
+                    for interval, ticker in self.tickers.iteritems())
+
 
 class TickerHandler(object):
     """
@@ -375,34 +478,100 @@ class TickerHandler(object):
         outpath = path if path and isinstance(path, basestring) else None
         return (packed_obj, methodname, outpath, interval, idstring, persistent)
 
+    def _subscription_key(self, store_key):
+        """
+        Get the ServerConfig key under which a subscription is saved.
+
+        Args:
+            store_key (tuple): The unique store key of the subscription.
+
+        Returns:
+            key (str): A key on the form `save_name:hash`.
+
+        """
+        return "%s:%s" % (self.save_name, hashlib.md5(repr(store_key)).hexdigest())
+
+    def _save_subscription(self, store_key):
+        """
+        Save a single subscription to the database, as its own
+        ServerConfig entry.
+
+        Args:
+            store_key (tuple): The unique store key of the subscription.
+
+        """
+        args, kwargs = self.ticker_storage[store_key]
+        ServerConfig.objects.conf(key=self._subscription_key(store_key),
+                                  value=dbserialize((store_key, (args, kwargs))))
+
+    def _delete_subscriptions(self, store_keys=None):
+        """
+        Delete saved subscriptions from the database.
+
+        Args:
+            store_keys (list, optional): The store keys of the subscriptions
+                to delete. If not given, delete all saved subscriptions.
+
+        """
+        if store_keys is None:
+            ServerConfig.objects.filter(db_key__startswith=self.save_name + ":").delete()
+        elif store_keys:
+            ServerConfig.objects.filter(
+                db_key__in=[self._subscription_key(store_key) for store_key in store_keys]).delete()
+
     def save(self):
         """
-        Save ticker_storage as a serialized string into a temporary
-        ServerConf field. Whereas saving is done on the fly, if called
-        by server when it shuts down, the current timer of each ticker
-        will be saved so it can start over from that point.
-
-        """
-        if self.ticker_storage:
-            # get the current times so the tickers can be restarted with a delay later
-            start_delays = dict((interval, ticker.task.next_call_time())
-                                for interval, ticker in self.ticker_pool.tickers.items())
-
-            # remove any subscriptions that lost its object in the interim
-            to_save = {store_key: (args, kwargs) for store_key, (args, kwargs) in self.ticker_storage.items()
-                       if ((store_key[1] and ("_obj" in kwargs and kwargs["_obj"].pk) and
-                            hasattr(kwargs["_obj"], store_key[1])) or    # a valid method with existing obj
-                           store_key[2])}  # a path given
-
-            # update the timers for the tickers
-            for store_key, (args, kwargs) in to_save.items():
-                interval = store_key[1]
-                # this is a mutable, so it's updated in-place in ticker_storage
-                kwargs["_start_delay"] = start_delays.get(interval, None)
-            ServerConfig.objects.conf(key=self.save_name, value=dbserialize(to_save))
-        else:
-            # make sure we have nothing lingering in the database
+        Subscriptions are saved to the database one by one as they are
+        added and removed. This is called by the server when it shuts
+        down and saves the current timer of each ticker so it can start
+        over from that point. It also removes subscriptions that lost
+        their object in the interim.
+
+        """
+        # get the current times so the tickers can be restarted with a delay later
+        start_delays = dict((interval, ticker.task.next_call_time())
+                            for interval, ticker in self.ticker_pool.tickers.items())
+        ServerConfig.objects.conf(key=self.save_name + ":start_delays", value=start_delays)
+
+        # remove any subscriptions that lost its object in the interim
+        to_remove = [store_key for store_key, (args, kwargs) in self.ticker_storage.items()
+                     if not ((store_key[1] and ("_obj" in kwargs and kwargs["_obj"].pk) and
+                              hasattr(kwargs["_obj"], store_key[1])) or  # a valid method with existing obj
+                             store_key[2])]  # a path given
+        for store_key in to_remove:
+            del self.ticker_storage[store_key]
+        self._delete_subscriptions(to_remove)
+
+    def _load_saved(self):
+        """
+        Load all saved subscriptions from the database in one go. This
+        also loads subscriptions saved by older versions, which stored
+        them all in a single ServerConfig entry.
+
+        Returns:
+            saved (list): A list of `(key, (store_key, (args, kwargs)))`,
+                where `key` is the ServerConfig key the subscription was
+                loaded from (`None` if loaded from the old format). Saved
+                database objects are already unpacked.
+            start_delays (dict): The time left on each interval at the
+                last save, `{interval: delay}`.
+
+        """
+        saved, start_delays = [], {}
+        for conf in ServerConfig.objects.filter(db_key__startswith=self.save_name + ":"):
+            if conf.key == self.save_name + ":start_delays":
+                start_delays = conf.value
+                continue
+            try:
+                saved.append((conf.key, dbunserialize(conf.value)))
+            except Exception:
+                log_trace("Tickerhandler: Could not load ticker %s." % conf.key)
+        legacy = ServerConfig.objects.conf(key=self.save_name)
+        if legacy:
+            # an old full dump of ticker_storage
+            saved.extend((None, sub) for sub in dbunserialize(legacy).iteritems())
             ServerConfig.objects.conf(key=self.save_name, delete=True)
+        return saved, start_delays
 
     def restore(self, server_reload=True):
         """
@@ -417,46 +586,58 @@ class TickerHandler(object):
 
         """
         # load stored command instructions and use them to re-initialize handler
-        restored_tickers = ServerConfig.objects.conf(key=self.save_name)
-        if restored_tickers:
-            # the dbunserialize will convert all serialized dbobjs to real objects
-
-            restored_tickers = dbunserialize(restored_tickers)
-            self.ticker_storage = {}
-            for store_key, (args, kwargs) in restored_tickers.iteritems():
-                try:
-                    # at this point obj is the actual object (or None) due to how
-                    # the dbunserialize works
-                    obj, callfunc, path, interval, idstring, persistent = store_key
-                    if not persistent and not server_reload:
-                        # this ticker will not be restarted
-                        continue
-                    if isinstance(callfunc, basestring) and not obj:
-                        # methods must have an existing object
-                        continue
-                    # we must rebuild the store_key here since obj must not be
-                    # stored as the object itself for the store_key to be hashable.
-                    store_key = self._store_key(obj, path, interval, callfunc, idstring, persistent)
-
-                    if obj and callfunc:
-                        kwargs["_callback"] = callfunc
-                        kwargs["_obj"] = obj
-                    elif path:
-                        modname, varname = path.rsplit(".", 1)
-                        callback = variable_from_module(modname, varname)
-                        kwargs["_callback"] = callback
-                        kwargs["_obj"] = None
-                    else:
-                        # Neither object nor path - discard this ticker
-                        log_err("Tickerhandler: Removing malformed ticker: %s" % str(store_key))
-                        continue
-                except Exception:
-                    # this suggests a malformed save or missing objects
-                    log_trace("Tickerhandler: Removing malformed ticker: %s" % str(store_key))
+        restored_tickers, start_delays = self._load_saved()
+        self.ticker_storage = {}
+        # saved entries to remove, and subscriptions to (re-)save
+        to_delete, to_save = [], []
+        for conf_key, (store_key, (args, kwargs)) in restored_tickers:
+            if conf_key:
+                to_delete.append(conf_key)
+            try:
+                # at this point obj is the actual object (or None) due to how
+                # the dbunserialize works
+                obj, callfunc, path, interval, idstring, persistent = store_key
+                if not persistent and not server_reload:
+                    # this ticker will not be restarted
                     continue
-                # if we get here we should create a new ticker
-                self.ticker_storage[store_key] = (args, kwargs)
-                self.ticker_pool.add(store_key, *args, **kwargs)
+                if isinstance(callfunc, basestring) and not obj:
+                    # methods must have an existing object
+                    continue
+                # we must rebuild the store_key here since obj must not be
+                # stored as the object itself for the store_key to be hashable.
+                store_key = self._store_key(obj, path, interval, callfunc, idstring, persistent)
+
+                if obj and callfunc:
+                    kwargs["_callback"] = callfunc
+                    kwargs["_obj"] = obj
+                elif path:
+                    modname, varname = path.rsplit(".", 1)
+                    callback = variable_from_module(modname, varname)
+                    kwargs["_callback"] = callback
+                    kwargs["_obj"] = None
+                else:
+                    # Neither object nor path - discard this ticker
+                    log_err("Tickerhandler: Removing malformed ticker: %s" % str(store_key))
+                    continue
+            except Exception:
+                # this suggests a malformed save or missing objects
+                log_trace("Tickerhandler: Removing malformed ticker: %s" % str(store_key))
+                continue
+            # if we get here we should create a new ticker
+            kwargs.pop("_start_delay", None)
+            self.ticker_storage[store_key] = (args, kwargs)
+            self.ticker_pool.add(store_key, _start_delay=start_delays.get(interval), *args, **kwargs)
+            if conf_key == self._subscription_key(store_key):
+                # already saved under the right key
+                to_delete.pop()
+            else:
+                to_save.append(store_key)
+
+        # clean out tickers that were not restored and convert old saves
+        with transaction.atomic():
+            ServerConfig.objects.filter(db_key__in=to_delete).delete()
+            for store_key in to_save:
+                self._save_subscription(store_key)
 
     def add(self, interval=60, callback=None, idstring="", persistent=True, *args, **kwargs):
         """
@@ -499,7 +680,7 @@ class TickerHandler(object):
         kwargs["_callback"] = callfunc  # either method-name or callable
         self.ticker_storage[store_key] = (args, kwargs)
         self.ticker_pool.add(store_key, *args, **kwargs)
-        self.save()
+        self._save_subscription(store_key)
 
     def remove(self, interval=60, callback=None, idstring="", persistent=True):
         """
@@ -522,7 +703,7 @@ class TickerHandler(object):
         to_remove = self.ticker_storage.pop(store_key, None)
         if to_remove:
             self.ticker_pool.remove(store_key)
-            self.save()
+            self._delete_subscriptions([store_key])
 
     def clear(self, interval=None):
         """
@@ -538,12 +719,14 @@ class TickerHandler(object):
         """
         self.ticker_pool.stop(interval)
         if interval:
-            self.ticker_storage = dict((store_key, store_key)
-                                       for store_key in self.ticker_storage
-                                       if store_key[1] != interval)
+            to_remove = [store_key for store_key in self.ticker_storage
+                         if store_key[3] == interval]
+            for store_key in to_remove:
+                del self.ticker_storage[store_key]
+            self._delete_subscriptions(to_remove)
         else:
             self.ticker_storage = {}
-        self.save()
+            self._delete_subscriptions()
 
     def all(self, interval=None):
         """
@@ -570,6 +753,16 @@ class TickerHandler(object):
                 return {interval: ticker.subscriptions}
             return None
 
+    def stats(self):
+        """
+        Get the load of each ticker interval.
+
+        Returns:
+            stats (dict): Timing statistics per interval, see `TickerPool.stats`.
+
+        """
+        return self.ticker_pool.stats()
+
     def all_display(self):
         """
         Get all tickers on an easily displayable form.
@@ -117,7 +117,8 @@ class AMPServerClientProtocol(amp.AMPMultiConnectionProtocol):
 
         Args:
             command (AMP Command): A protocol send command.
-            sessid (int): A unique Session id.
+            sessid (int or list): A unique Session id, or a list of them
+                for `MsgServer2PortalMulti`.
             kwargs (any): Any data to pickle into the command.
 
         Returns:
@@ -125,10 +126,16 @@ class AMPServerClientProtocol(amp.AMPMultiConnectionProtocol):
 
         Notes:
             Data will be sent across the wire pickled as a tuple
-            (sessid, kwargs).
+            (sessid, kwargs). If batching is active, messages will
+            instead be queued and sent as part of a `MsgBatch`.
 
         """
-        return self.callRemote(command, packed_data=amp.dumps((sessid, kwargs))).addErrback(
+        if self.batch_msgs and (command is amp.MsgServer2Portal or
+                                command is amp.MsgServer2PortalMulti):
+            return self.batch_data(sessid, kwargs)
+        # anything queued must arrive before this
+        self.flush_batch()
+        return self.callRemote(command, packed_data=amp.pack((sessid, kwargs))).addErrback(
                 self.errback, command.key)
 
     def send_MsgServer2Portal(self, session, **kwargs):
@@ -143,6 +150,19 @@ class AMPServerClientProtocol(amp.AMPMultiConnectionProtocol):
         """
         return self.data_to_portal(amp.MsgServer2Portal, session.sessid, **kwargs)
 
+    def send_MsgServer2PortalMulti(self, sessions, **kwargs):
+        """
+        Access method - executed on the Server for sending the same
+            data to many sessions on the Portal in one message.
+
+        Args:
+            sessions (list): Sessions to send to.
+            kwargs (any, optiona): Extra data.
+
+        """
+        return self.data_to_portal(amp.MsgServer2PortalMulti,
+                                   [session.sessid for session in sessions], **kwargs)
+
     def send_AdminServer2Portal(self, session, operation="", **kwargs):
         """
         Administrative access method called by the Server to send an
@@ -182,6 +202,29 @@ class AMPServerClientProtocol(amp.AMPMultiConnectionProtocol):
             self.factory.server.sessions.data_in(session, **kwargs)
         return {}
 
+    @amp.MsgBatch.responder
+    @amp.catch_traceback
+    def server_receive_msgbatch(self, packed_data):
+        """
+        Receives a batch of messages arriving to server. This method
+        is executed on the Server.
+
+        Args:
+            packed_data (str): Data to receive (a pickled list of
+                (sessid, kwargs) tuples).
+
+        """
+        sessions = self.factory.server.sessions
+        for sessid, kwargs in self.data_in(packed_data):
+            # an error in one message must not stop the rest of the batch
+            try:
+                session = sessions.get(sessid, None)
+                if session:
+                    sessions.data_in(session, **kwargs)
+            except Exception:
+                logger.log_trace("batched message from sessid {}".format(sessid))
+        return {}
+
     @amp.AdminPortal2Server.responder
     @amp.catch_traceback
     def server_receive_adminportal2server(self, packed_data):
@@ -21,6 +21,7 @@ settings.INPUT_FUNC_MODULES.
 from future.utils import viewkeys
 
 import importlib
+from collections import OrderedDict
 from django.conf import settings
 from evennia.commands.cmdhandler import cmdhandler
 from evennia.accounts.models import AccountDB
@@ -362,6 +363,23 @@ _monitorable = {
 }
 
 
+# monitor updates waiting to be sent, per session
+_MONITOR_UPDATES = OrderedDict()
+
+
+def _send_monitor_updates():
+    """
+    Send the monitor updates collected during a monitorhandler flush.
+    Each changed value is only sent once, with its final value.
+
+    """
+    global _MONITOR_UPDATES
+    updates, _MONITOR_UPDATES = _MONITOR_UPDATES, OrderedDict()
+    for session, values in updates.items():
+        for name, value in values.items():
+            session.msg(monitor={"name": name, "value": value})
+
+
 def _on_monitor_change(**kwargs):
     fieldname = kwargs["fieldname"]
     obj = kwargs["obj"]
@@ -370,13 +388,18 @@ def _on_monitor_change(**kwargs):
     # the session may be None if the char quits and someone
     # else then edits the object
     if session:
-        session.msg(monitor={"name": name, "value": _GA(obj, fieldname)})
+        from evennia.scripts.monitorhandler import MONITOR_HANDLER
+        _MONITOR_UPDATES.setdefault(session, OrderedDict())[name] = _GA(obj, fieldname)
+        MONITOR_HANDLER.after_flush(_send_monitor_updates)
 
 
 def monitor(session, *args, **kwargs):
     """
     Adds monitoring to a given property or Attribute.
 
+    Changes are sent as `monitor` with the kwargs `name` and `value`. A
+    value changed several times at once is only sent with its final value.
+
     Kwargs:
       name (str): The name of the property or Attribute
         to report. No db_* prefix is needed. Only names
@@ -8,7 +8,7 @@ from __future__ import print_function
 from functools import wraps
 import time
 from twisted.protocols import amp
-from collections import defaultdict, namedtuple
+from collections import namedtuple
 from cStringIO import StringIO
 from itertools import count
 import zlib  # Used in Compressed class
@@ -17,8 +17,12 @@ try:
 except ImportError:
     import pickle
 
+from twisted.internet import reactor
 from twisted.internet.defer import DeferredList, Deferred
-from evennia.utils.utils import to_str, variable_from_module
+from twisted.internet.error import ConnectionLost
+from twisted.python.failure import Failure
+from django.conf import settings
+from evennia.utils.utils import to_str, variable_from_module, class_from_module
 
 # delayed import
 _LOGGER = None
@@ -49,9 +53,17 @@ NULNUL = '\0\0'
 
 AMP_MAXLEN = amp.MAX_VALUE_LENGTH    # max allowed data length in AMP protocol (cannot be changed)
 
-# buffers
-_SENDBATCH = defaultdict(list)
-_MSGBUFFER = defaultdict(list)
+# batching of outgoing messages
+_BATCH_MSGS = settings.AMP_BATCH_MSGS
+_BATCH_MAXMSGS = settings.AMP_BATCH_MAXMSGS
+_BATCH_INTERVAL = settings.AMP_BATCH_INTERVAL
+
+# wire codec for session data
+_CODEC = class_from_module(settings.AMP_CODEC)()
+
+# compression statistics, see get_compression_stats
+_COMPRESSION_STATS = {"compressed": 0, "raw": 0, "bytes_in": 0, "bytes_out": 0,
+                      "compress_time": 0.0, "decompress_time": 0.0}
 
 # resources
 
@@ -83,6 +95,16 @@ def loads(data):
     return pickle.loads(to_str(data))
 
 
+# Helper functions for session data, using the AMP_CODEC.
+
+def pack(data):
+    return _CODEC.encode(data)
+
+
+def unpack(data):
+    return _CODEC.decode(data)
+
+
 @wraps
 def catch_traceback(func):
     "Helper decorator"
@@ -99,6 +121,23 @@ def catch_traceback(func):
     return decorator
 
 
+def get_compression_stats():
+    """
+    Get statistics for the compression of AMP data in this process.
+
+    Returns:
+        stats (dict): A dict with keys `compressed` and `raw` (number
+            of chunks sent with and without compression), `bytes_in`
+            (size of the data before compression), `bytes_out` (size of
+            the data sent on the wire), `bytes_saved`, `compress_time`
+            and `decompress_time` (total seconds spent).
+
+    """
+    stats = dict(_COMPRESSION_STATS)
+    stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+    return stats
+
+
 # AMP Communication Command types
 
 class Compressed(amp.String):
@@ -108,7 +147,16 @@ class Compressed(amp.String):
     batch-grouping of too-long sends is borrowed from the "mediumbox"
     recipy at twisted-hacks's ~glyph/+junk/amphacks/mediumbox.
 
+    Data shorter than `threshold`, or which would not get any smaller,
+    is sent uncompressed, prefixed with a `RAW` flag byte. Zlib data
+    always starts with the zlib header byte, so needs no flag.
+
     """
+    compress = settings.AMP_COMPRESSION
+    level = settings.AMP_COMPRESSION_LEVEL
+    threshold = settings.AMP_COMPRESSION_THRESHOLD
+
+    RAW = b'\0'
 
     def fromBox(self, name, strings, objects, proto):
         """
@@ -132,10 +180,12 @@ class Compressed(amp.String):
         we break up too-long data snippets into multiple batches here.
 
         """
+        # leave room for the RAW flag
+        maxlen = AMP_MAXLEN - 1
         value = StringIO(objects[name])
-        strings[name] = self.toStringProto(value.read(AMP_MAXLEN), proto)
+        strings[name] = self.toStringProto(value.read(maxlen), proto)
         for counter in count(2):
-            chunk = value.read(AMP_MAXLEN)
+            chunk = value.read(maxlen)
             if not chunk:
                 break
             strings["%s.%d" % (name, counter)] = self.toStringProto(chunk, proto)
@@ -144,13 +194,31 @@ class Compressed(amp.String):
         """
         Convert to send as a string on the wire, with compression.
         """
-        return zlib.compress(super(Compressed, self).toString(inObject), 9)
+        data = super(Compressed, self).toString(inObject)
+        length = len(data)
+        _COMPRESSION_STATS["bytes_in"] += length
+        if self.compress and length >= self.threshold:
+            t0 = time.time()
+            compressed = zlib.compress(data, self.level)
+            _COMPRESSION_STATS["compress_time"] += time.time() - t0
+            if len(compressed) < length:
+                _COMPRESSION_STATS["compressed"] += 1
+                _COMPRESSION_STATS["bytes_out"] += len(compressed)
+                return compressed
+        _COMPRESSION_STATS["raw"] += 1
+        _COMPRESSION_STATS["bytes_out"] += length + 1
+        return self.RAW + data
 
     def fromString(self, inString):
         """
         Convert (decompress) from the string-representation on the wire to Python.
         """
-        return super(Compressed, self).fromString(zlib.decompress(inString))
+        if inString[:1] == self.RAW:
+            return super(Compressed, self).fromString(inString[1:])
+        t0 = time.time()
+        data = zlib.decompress(inString)
+        _COMPRESSION_STATS["decompress_time"] += time.time() - t0
+        return super(Compressed, self).fromString(data)
 
 
 class MsgLauncher2Portal(amp.Command):
@@ -187,6 +255,36 @@ class MsgServer2Portal(amp.Command):
     response = []
 
 
+class MsgServer2PortalMulti(amp.Command):
+    """
+    Message Server -> Portal, for many sessions
+
+    Sends the same data to several sessions. The data is a packed
+    tuple (sessids, kwargs), where sessids is a list.
+
+    """
+    key = "MsgServer2PortalMulti"
+    arguments = [('packed_data', Compressed())]
+    errors = {Exception: 'EXCEPTION'}
+    response = []
+
+
+class MsgBatch(amp.Command):
+    """
+    Bidirectional Server <-> Portal
+
+    Sent instead of MsgServer2Portal/MsgPortal2Server when message
+    batching is active. The data is a packed list of (sessid, kwargs)
+    tuples collected since the last batch was sent. Data sent to many
+    sessions has a list of sessids in place of the sessid.
+
+    """
+    key = "MsgBatch"
+    arguments = [('packed_data', Compressed())]
+    errors = {Exception: 'EXCEPTION'}
+    response = []
+
+
 class AdminPortal2Server(amp.Command):
     """
     Administration Portal -> Server
@@ -269,6 +367,12 @@ class AMPMultiConnectionProtocol(amp.AMP):
         self.send_mode = True
         self.send_task = None
         self.multibatches = 0
+        # outgoing message batching
+        self.batch_msgs = _BATCH_MSGS
+        self.batch_maxmsgs = _BATCH_MAXMSGS
+        self.batch_interval = _BATCH_INTERVAL
+        self.send_batch = []
+        self.send_batch_deferred = None
 
     def dataReceived(self, data):
         """
@@ -326,6 +430,15 @@ class AMPMultiConnectionProtocol(amp.AMP):
             self.factory.broadcasts.remove(self)
         except ValueError:
             pass
+        # we can't send any pending batch anymore
+        if self.send_task and self.send_task.active():
+            self.send_task.cancel()
+        self.send_task = None
+        batch, self.send_batch = self.send_batch, []
+        deferred, self.send_batch_deferred = self.send_batch_deferred, None
+        if deferred:
+            deferred.errback(Failure(ConnectionLost(
+                "%i batched message(s) were not sent." % len(batch))))
 
     # Error handling
 
@@ -356,7 +469,7 @@ class AMPMultiConnectionProtocol(amp.AMP):
             unpaced_data (any): Unpacked package
 
         """
-        return loads(packed_data)
+        return unpack(packed_data)
 
     def broadcast(self, command, sessid, **kwargs):
         """
@@ -381,6 +494,50 @@ class AMPMultiConnectionProtocol(amp.AMP):
 
         return DeferredList(deferreds)
 
+    # message batching
+
+    def batch_data(self, sessid, kwargs):
+        """
+        Queue data to be sent across the wire as part of a `MsgBatch`.
+        The batch is sent on the next reactor tick (or after
+        `batch_interval` seconds), or as soon as it holds
+        `batch_maxmsgs` messages, whichever comes first.
+
+        Args:
+            sessid (int): A unique Session id.
+            kwargs (dict): The data to send.
+
+        Returns:
+            deferred (Deferred): Fires when the batch has been sent. If
+                the connection is lost before that, the error is logged.
+
+        """
+        self.send_batch.append((sessid, kwargs))
+        if not self.send_batch_deferred:
+            self.send_batch_deferred = Deferred().addErrback(self.errback, MsgBatch.key)
+        deferred = self.send_batch_deferred
+        if len(self.send_batch) >= self.batch_maxmsgs:
+            self.flush_batch()
+        elif not self.send_task:
+            self.send_task = reactor.callLater(self.batch_interval, self.flush_batch)
+        return deferred
+
+    def flush_batch(self):
+        """
+        Send all queued batch data across the wire as one `MsgBatch`.
+        This must be called before sending other commands, to make sure
+        they don't arrive before messages queued ahead of them.
+
+        """
+        if self.send_task and self.send_task.active():
+            self.send_task.cancel()
+        self.send_task = None
+        batch, self.send_batch = self.send_batch, []
+        deferred, self.send_batch_deferred = self.send_batch_deferred, None
+        if batch:
+            self.callRemote(MsgBatch, packed_data=pack(batch)).addErrback(
+                self.errback, MsgBatch.key).chainDeferred(deferred)
+
     # generic function send/recvs
 
     def send_FunctionCall(self, modulepath, functionname, *args, **kwargs):
@@ -399,6 +556,7 @@ class AMPMultiConnectionProtocol(amp.AMP):
             function call
 
         """
+        self.flush_batch()
         return self.callRemote(FunctionCall,
                                module=modulepath,
                                function=functionname,
@@ -0,0 +1,148 @@
+"""
+Wire codecs for the session data sent between Portal and Server.
+
+The codec to use is set by `settings.AMP_CODEC`. A codec encodes the
+`(sessid, kwargs)` tuples (or lists of them, when batching) sent with
+the MsgPortal2Server, MsgServer2Portal and MsgBatch AMP commands. The
+data has already been made wire-safe by `SessionHandler.clean_senddata`,
+so the codec only needs to handle simple types.
+
+Compression is handled separately, by the AMP `Compressed` argument.
+
+"""
+import marshal
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from evennia.utils.utils import to_str
+
+
+class PickleCodec(object):
+    """
+    The default AMP wire codec. This pickles the data, so it handles
+    any picklable Python data, but means unpickling data from another
+    process.
+
+    Each codec starts its encoded data with its `version` byte, so
+    mismatching codecs on the Portal and Server are detected instead
+    of producing garbage. Other codecs subclass this one and override
+    `version`, `encode` and `decode`.
+
+    """
+    version = b'\x80'  # the pickle protocol 2+ header
+
+    def check_version(self, data):
+        """
+        Check that data was encoded by this codec.
+
+        Args:
+            data (str): The encoded data.
+
+        Raises:
+            ValueError: If the version byte doesn't match.
+
+        """
+        if data[:1] != self.version:
+            raise ValueError("%s: unknown data version %r (expected %r). Make sure Portal and "
+                             "Server use the same AMP_CODEC." % (self.__class__.__name__,
+                                                                 data[:1], self.version))
+
+    def encode(self, data):
+        """
+        Encode data for sending across the wire.
+
+        Args:
+            data (any): The data to encode.
+
+        Returns:
+            encoded (str): The encoded data.
+
+        """
+        return to_str(pickle.dumps(to_str(data), pickle.HIGHEST_PROTOCOL))
+
+    def decode(self, data):
+        """
+        Decode data arriving from the wire.
+
+        Args:
+            data (str): The encoded data.
+
+        Returns:
+            decoded (any): The decoded data.
+
+        Raises:
+            ValueError: If the data was not encoded by this codec.
+
+        """
+        self.check_version(data)
+        return pickle.loads(to_str(data))
+
+
+_BASIC_TYPES = frozenset((str, unicode, int, long, float, bool))
+
+
+def _basic(data):
+    """
+    Convert data to the basic types the BinaryCodec handles. Subclasses
+    of the basic types are converted to the type itself and other
+    objects to their string representation.
+
+    Args:
+        data (any): The data to convert.
+
+    Returns:
+        basic (any): The converted data.
+
+    """
+    if type(data) in _BASIC_TYPES or data is None:
+        return data
+    elif isinstance(data, dict):
+        return dict((_basic(key), _basic(value)) for key, value in data.iteritems())
+    elif isinstance(data, tuple):
+        return tuple(_basic(item) for item in data)
+    elif isinstance(data, list):
+        return [_basic(item) for item in data]
+    elif isinstance(data, frozenset):
+        return frozenset(_basic(item) for item in data)
+    elif isinstance(data, set):
+        return set(_basic(item) for item in data)
+    for basetype in (bool, int, long, float, unicode, str):
+        if isinstance(data, basetype):
+            return basetype(data)
+    return unicode(data)
+
+
+class BinaryCodec(PickleCodec):
+    """
+    Binary codec for the basic types allowed through `clean_senddata`;
+    that is str, unicode, int, float, bool, None, lists, tuples, dicts
+    and sets of those. Subclasses of these are sent as the basic type
+    and other objects as their string representation, the same way
+    `clean_senddata` treats database objects.
+
+    The data is encoded with the `marshal` module (format version 2),
+    which is written in C, so this is faster than pickling, both ways.
+    Unlike unpickling, decoding never imports modules or calls anything.
+    Run `evennia.server.profiling.amp_benchmark.run_codecs()` to compare
+    the codecs.
+
+    Format: The version byte, followed by the marshalled value.
+
+    """
+    version = b'\x02'
+
+    def encode(self, data):
+        try:
+            return self.version + marshal.dumps(data, 2)
+        except ValueError:
+            # subclasses of the basic types (like ANSIString) or other objects
+            return self.version + marshal.dumps(_basic(data), 2)
+
+    def decode(self, data):
+        self.check_version(data)
+        try:
+            return marshal.loads(data[1:])
+        except (EOFError, ValueError, TypeError):
+            raise ValueError("BinaryCodec: malformed data.")
@@ -133,16 +133,22 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
 
         Notes:
             Data will be sent across the wire pickled as a tuple
-            (sessid, kwargs).
-
-        """
-        if self.factory.server_connection:
-            return self.factory.server_connection.callRemote(
-                        command, packed_data=amp.dumps((sessid, kwargs))).addErrback(
+            (sessid, kwargs). If batching is active, messages will
+            instead be queued and sent as part of a `MsgBatch`.
+
+        """
+        server_connection = self.factory.server_connection
+        if server_connection:
+            if server_connection.batch_msgs and command is amp.MsgPortal2Server:
+                return server_connection.batch_data(sessid, kwargs)
+            # anything queued must arrive before this
+            server_connection.flush_batch()
+            return server_connection.callRemote(
+                        command, packed_data=amp.pack((sessid, kwargs))).addErrback(
                             self.errback, command.key)
         else:
             # if no server connection is available, broadcast
-            return self.broadcast(command, sessid, packed_data=amp.dumps((sessid, kwargs)))
+            return self.broadcast(command, sessid, packed_data=amp.pack((sessid, kwargs)))
 
     def start_server(self, server_twistd_cmd):
         """
@@ -365,6 +371,50 @@ class AMPServerProtocol(amp.AMPMultiConnectionProtocol):
             logger.log_trace("packed_data len {}".format(len(packed_data)))
         return {}
 
+    @amp.MsgServer2PortalMulti.responder
+    @amp.catch_traceback
+    def portal_receive_server2portalmulti(self, packed_data):
+        """
+        Receives a message for many sessions arriving to Portal from
+        Server. This method is executed on the Portal.
+
+        Args:
+            packed_data (str): Pickled data (sessids, kwargs) coming over the wire.
+
+        """
+        try:
+            sessids, kwargs = self.data_in(packed_data)
+            self.factory.portal.sessions.data_out_multi(sessids, **kwargs)
+        except Exception:
+            logger.log_trace("packed_data len {}".format(len(packed_data)))
+        return {}
+
+    @amp.MsgBatch.responder
+    @amp.catch_traceback
+    def portal_receive_msgbatch(self, packed_data):
+        """
+        Receives a batch of messages arriving to Portal from Server.
+        This method is executed on the Portal.
+
+        Args:
+            packed_data (str): Pickled list of (sessid, kwargs) tuples
+                coming over the wire. The sessid may be a list of sessids.
+
+        """
+        portal_sessionhandler = self.factory.portal.sessions
+        for sessid, kwargs in self.data_in(packed_data):
+            # an error in one message must not stop the rest of the batch
+            try:
+                if isinstance(sessid, list):
+                    portal_sessionhandler.data_out_multi(sessid, **kwargs)
+                    continue
+                session = portal_sessionhandler.get(sessid, None)
+                if session:
+                    portal_sessionhandler.data_out(session, **kwargs)
+            except Exception:
+                logger.log_trace("batched message to sessid {}".format(sessid))
+        return {}
+
     @amp.AdminServer2Portal.responder
     @amp.catch_traceback
     def portal_receive_adminserver2portal(self, packed_data):
@@ -435,5 +435,26 @@ class PortalSessionHandler(SessionHandler):
                     except Exception:
                         log_trace()
 
+    def data_out_multi(self, sessids, **kwargs):
+        """
+        Called by server for having the portal relay the same data to
+        many sessions.
+
+        Args:
+            sessids (list): Ids of the sessions to send to. Sessions that
+                have disconnected are skipped.
+
+        Kwargs:
+            kwargs (any): As for `data_out`.
+
+        """
+        for sessid in sessids:
+            session = self.get(sessid, None)
+            if session:
+                # the send methods may change their kwargs
+                self.data_out(session, **dict((cmdname, (cmdargs, dict(cmdkwargs)))
+                                              for cmdname, (cmdargs, cmdkwargs)
+                                              in kwargs.iteritems()))
+
 
 PORTAL_SESSIONS = PortalSessionHandler()
@@ -18,13 +18,58 @@ from evennia.server.portal import ttype, mssp, telnet_oob, naws, suppress_ga
 from evennia.server.portal.mccp import Mccp, mccp_compress, MCCP
 from evennia.server.portal.mxp import Mxp, mxp_parse
 from evennia.utils import ansi
-from evennia.utils.utils import to_str
+from evennia.utils.utils import to_str, LRUCache
 
 _RE_N = re.compile(r"\|n$")
 _RE_LEND = re.compile(r"\n$|\r$|\r\n$|\r\x00$|", re.MULTILINE)
 _RE_LINEBREAK = re.compile(r"\n\r|\r\n|\n|\r", re.DOTALL + re.MULTILINE)
 _RE_SCREENREADER_REGEX = re.compile(r"%s" % settings.SCREENREADER_REGEX_STRIP, re.DOTALL + re.MULTILINE)
 _IDLE_COMMAND = settings.IDLE_COMMAND + "\n"
+_RENDER_CACHE = LRUCache(settings.PORTAL_RENDER_CACHE_SIZE)
+
+
+def _render_text(text, prompt=False, raw=False, nocolor=False, xterm256=False,
+                 mxp=False, screenreader=False):
+    """
+    Render text for a telnet client. The result only depends on the
+    arguments, so it is cached; text sent to many sessions is rendered
+    once for each combination of client options.
+
+    Args:
+        text (str): The text to render.
+        prompt (bool, optional): Render the text as a prompt.
+        raw (bool, optional): Don't convert any markup.
+        nocolor (bool, optional): Strip all color.
+        xterm256 (bool, optional): Use xterm256 colors.
+        mxp (bool, optional): Convert MXP links.
+        screenreader (bool, optional): Clean the text up for screenreaders.
+
+    Returns:
+        rendered (str): The rendered text.
+
+    """
+    if raw and not screenreader:
+        return text
+    key = (text, bool(prompt), bool(raw), bool(nocolor), bool(xterm256), bool(mxp),
+           bool(screenreader))
+    rendered = _RENDER_CACHE.get(key)
+    if rendered is not None:
+        return rendered
+
+    rendered = text
+    if screenreader:
+        # screenreader mode cleans up output
+        rendered = ansi.parse_ansi(rendered, strip_ansi=True, xterm256=False, mxp=False)
+        rendered = _RE_SCREENREADER_REGEX.sub("", rendered)
+    if not raw:
+        # we need to make sure to kill the color at the end in order
+        # to match the webclient output. Prompts don't keep MXP links.
+        rendered = ansi.parse_ansi(_RE_N.sub("", rendered) + ("||n" if rendered.endswith("|") else "|n"),
+                                   strip_ansi=nocolor, xterm256=xterm256, mxp=mxp and not prompt)
+        if mxp:
+            rendered = mxp_parse(rendered)
+    _RENDER_CACHE.set(key, rendered)
+    return rendered
 
 
 class TelnetServerFactory(protocol.ServerFactory):
@@ -328,20 +373,10 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
         mxp = options.get("mxp", flags.get("MXP", False))
         screenreader = options.get("screenreader", flags.get("SCREENREADER", False))
 
-        if screenreader:
-            # screenreader mode cleans up output
-            text = ansi.parse_ansi(text, strip_ansi=True, xterm256=False, mxp=False)
-            text = _RE_SCREENREADER_REGEX.sub("", text)
-
         if options.get("send_prompt"):
             # send a prompt instead.
-            prompt = text
-            if not raw:
-                # processing
-                prompt = ansi.parse_ansi(_RE_N.sub("", prompt) + ("||n" if prompt.endswith("|") else "|n"),
-                                         strip_ansi=nocolor, xterm256=xterm256)
-                if mxp:
-                    prompt = mxp_parse(prompt)
+            prompt = _render_text(text, prompt=True, raw=raw, nocolor=nocolor, xterm256=xterm256,
+                                  mxp=mxp, screenreader=screenreader)
             prompt = prompt.replace(IAC, IAC + IAC).replace('\n', '\r\n')
             prompt += IAC + GA
             self.transport.write(mccp_compress(self, prompt))
@@ -359,18 +394,8 @@ class TelnetProtocol(Telnet, StatefulTelnetProtocol, Session):
                     # by telling the client that WE WILL echo, the client can
                     # safely turn OFF its OWN echo.
                     self.transport.write(mccp_compress(self, IAC + WILL + ECHO))
-            if raw:
-                # no processing
-                self.sendLine(text)
-                return
-            else:
-                # we need to make sure to kill the color at the end in order
-                # to match the webclient output.
-                linetosend = ansi.parse_ansi(_RE_N.sub("", text) + ("||n" if text.endswith("|") else "|n"),
-                                             strip_ansi=nocolor, xterm256=xterm256, mxp=mxp)
-                if mxp:
-                    linetosend = mxp_parse(linetosend)
-                self.sendLine(linetosend)
+            self.sendLine(_render_text(text, raw=raw, nocolor=nocolor, xterm256=xterm256,
+                                       mxp=mxp, screenreader=screenreader))
 
     def send_prompt(self, *args, **kwargs):
         """
@@ -8,16 +8,20 @@ try:
 except ImportError:
     import unittest
 
-from mock import Mock
+from mock import Mock, patch
 import string
-from evennia.server.portal import irc
+from evennia.server.portal import irc, amp, amp_server, amp_codec, telnet, webclient
+from evennia.server import amp_client
 
 from twisted.conch.telnet import IAC, WILL, DONT, SB, SE, NAWS, DO
+from twisted.internet.error import ConnectionLost
+from twisted.internet.task import Clock
 from twisted.test import proto_helpers
 from twisted.trial.unittest import TestCase as TwistedTestCase
 
 from .telnet import TelnetServerFactory, TelnetProtocol
 from .portal import PORTAL_SESSIONS
+from .portalsessionhandler import PortalSessionHandler
 from .suppress_ga import SUPPRESS_GA
 from .naws import DEFAULT_HEIGHT, DEFAULT_WIDTH
 from .ttype import TTYPE, IS
@@ -149,3 +153,213 @@ class TestTelnet(TwistedTestCase):
         self.proto.nop_keep_alive.stop()
         self.proto._handshake_delay.cancel()
         return d
+
+
+class TestRenderCache(TestCase):
+    def setUp(self):
+        telnet._RENDER_CACHE.clear()
+        webclient._RENDER_CACHE.clear()
+
+    def test_telnet(self):
+        with patch("evennia.server.portal.telnet.ansi.parse_ansi", wraps=telnet.ansi.parse_ansi) as mock_parse:
+            rendered = telnet._render_text("|rHello|n", xterm256=True)
+            self.assertEqual(rendered, "\x1b[1m\x1b[31mHello\x1b[0m")
+            # same text and options for another session, from another message
+            self.assertEqual(telnet._render_text("".join(["|rHello", "|n"]), xterm256=1), rendered)
+            self.assertEqual(mock_parse.call_count, 1)
+            self.assertEqual(telnet._render_text("|rHello|n", nocolor=True), "Hello")
+            self.assertEqual(mock_parse.call_count, 2)
+            self.assertEqual(telnet._render_text("|rHello|n", raw=True), "|rHello|n")
+            self.assertEqual(mock_parse.call_count, 2)
+
+    def test_webclient(self):
+        with patch("evennia.server.portal.webclient.parse_html",
+                   wraps=webclient.parse_html) as mock_parse:
+            rendered = webclient._render_text("|rHello|n")
+            self.assertEqual(webclient._render_text("|rHello|n"), rendered)
+            self.assertEqual(mock_parse.call_count, 1)
+            self.assertNotEqual(webclient._render_text("|rHello|n", nocolor=True), rendered)
+            self.assertEqual(mock_parse.call_count, 2)
+
+
+class TestAMPBatch(TwistedTestCase):
+    def setUp(self):
+        super(TestAMPBatch, self).setUp()
+        self.clock = Clock()
+        patcher = patch("evennia.server.portal.amp.reactor", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.proto = amp_server.AMPServerProtocol()
+        self.proto.factory = Mock()
+        self.proto.factory.server_connection = self.proto
+        self.proto.callRemote = Mock()
+        self.proto.batch_msgs = True
+
+    def test_batch_send(self):
+        for sessid in range(5):
+            self.proto.send_MsgPortal2Server(Mock(sessid=sessid), text="hello")
+        self.assertFalse(self.proto.callRemote.called)
+        self.clock.advance(0)
+        self.assertEqual(self.proto.callRemote.call_count, 1)
+        args, kwargs = self.proto.callRemote.call_args
+        self.assertEqual(args[0], amp.MsgBatch)
+        self.assertEqual(amp.unpack(kwargs["packed_data"]),
+                         [(sessid, {"text": "hello"}) for sessid in range(5)])
+
+    def test_batch_maxmsgs(self):
+        self.proto.batch_maxmsgs = 2
+        for sessid in range(5):
+            self.proto.send_MsgPortal2Server(Mock(sessid=sessid), text="hello")
+        self.assertEqual(self.proto.callRemote.call_count, 2)
+        self.clock.advance(0)
+        self.assertEqual(self.proto.callRemote.call_count, 3)
+
+    def test_batch_flushed_before_other_commands(self):
+        self.proto.send_MsgPortal2Server(Mock(sessid=1), text="hello")
+        self.proto.send_AdminPortal2Server(Mock(sessid=1), operation=amp.PDISCONN)
+        self.assertEqual([call[0][0] for call in self.proto.callRemote.call_args_list],
+                         [amp.MsgBatch, amp.AdminPortal2Server])
+        self.clock.advance(0)
+        self.assertEqual(self.proto.callRemote.call_count, 2)
+
+    def test_batch_connection_lost(self):
+        self.proto.factory.broadcasts = []
+        self.proto.factory.disconnect_callbacks = {}
+        with patch.object(self.proto, "errback") as mock_errback:
+            deferred = self.proto.batch_data(1, {"text": "hello"})
+            self.proto.connectionLost(None)
+        # the queued message is dropped, but not silently
+        self.assertTrue(deferred.called)
+        self.assertTrue(mock_errback.call_args[0][0].check(ConnectionLost))
+        self.clock.advance(0)
+        self.assertFalse(self.proto.callRemote.called)
+
+    def test_receive_batch(self):
+        sessions = self.proto.factory.portal.sessions
+        self.proto.portal_receive_msgbatch(
+            amp.pack([(1, {"text": "hello"}), (2, {"text": "world"})]))
+        self.assertEqual(sessions.data_out.call_count, 2)
+        sessions.data_out.assert_called_with(sessions.get(2), text="world")
+
+    def test_receive_batch_error(self):
+        sessions = self.proto.factory.portal.sessions
+        sessions.data_out.side_effect = [None, RuntimeError("broken"), None]
+        with patch("evennia.server.portal.amp_server.logger") as mock_logger:
+            self.proto.portal_receive_msgbatch(
+                amp.pack([(1, {"text": "a"}), (2, {"text": "b"}), (3, {"text": "c"})]))
+        self.assertEqual(mock_logger.log_trace.call_count, 1)
+        self.assertEqual(sessions.data_out.call_count, 3)
+        sessions.data_out.assert_called_with(sessions.get(3), text="c")
+
+        server = amp_client.AMPServerClientProtocol()
+        server.factory = Mock()
+        server_sessions = server.factory.server.sessions
+        server_sessions.data_in.side_effect = [None, RuntimeError("broken"), None]
+        with patch("evennia.server.amp_client.logger") as mock_logger:
+            server.server_receive_msgbatch(
+                amp.pack([(1, {"text": "a"}), (2, {"text": "b"}), (3, {"text": "c"})]))
+        self.assertEqual(mock_logger.log_trace.call_count, 1)
+        self.assertEqual(server_sessions.data_in.call_count, 3)
+
+    def test_receive_multi(self):
+        sessions = self.proto.factory.portal.sessions
+        self.proto.portal_receive_server2portalmulti(amp.pack(([1, 2], {"text": "hello"})))
+        sessions.data_out_multi.assert_called_once_with([1, 2], text="hello")
+        self.proto.portal_receive_msgbatch(amp.pack([([3, 4], {"text": "world"})]))
+        sessions.data_out_multi.assert_called_with([3, 4], text="world")
+        self.assertFalse(sessions.data_out.called)
+
+    def test_send_multi_batched(self):
+        self.proto = amp_client.AMPServerClientProtocol()
+        self.proto.callRemote = Mock()
+        self.proto.batch_msgs = True
+        self.proto.send_MsgServer2Portal(Mock(sessid=1), text="hello")
+        self.proto.send_MsgServer2PortalMulti([Mock(sessid=2), Mock(sessid=3)], text="world")
+        self.clock.advance(0)
+        args, kwargs = self.proto.callRemote.call_args
+        self.assertEqual(amp.unpack(kwargs["packed_data"]),
+                         [(1, {"text": "hello"}), ([2, 3], {"text": "world"})])
+
+    def test_portal_data_out_multi(self):
+        handler = PortalSessionHandler()
+        sessions = [Mock(sessid=1), Mock(sessid=2)]
+        handler.update({1: sessions[0], 2: sessions[1]})
+        handler.data_out_multi([1, 2, 3], text=[["hello"], {"options": {}}])
+        for session in sessions:
+            session.send_text.assert_called_once_with("hello", options={})
+
+
+class TestAMPCompressed(TestCase):
+    def setUp(self):
+        self.argument = amp.Compressed()
+
+    def test_small_data_is_raw(self):
+        data = self.argument.toString("look")
+        self.assertEqual(data, amp.Compressed.RAW + "look")
+        self.assertEqual(self.argument.fromString(data), "look")
+
+    def test_large_data_is_compressed(self):
+        text = "A long and repetitive text. " * 100
+        stats = amp.get_compression_stats()
+        data = self.argument.toString(text)
+        self.assertTrue(len(data) < len(text))
+        self.assertEqual(self.argument.fromString(data), text)
+        new_stats = amp.get_compression_stats()
+        self.assertEqual(new_stats["compressed"], stats["compressed"] + 1)
+        self.assertTrue(new_stats["bytes_saved"] > stats["bytes_saved"])
+
+    def test_compression_off(self):
+        text = "A long and repetitive text. " * 100
+        with patch.object(amp.Compressed, "compress", False):
+            data = self.argument.toString(text)
+        self.assertEqual(data, amp.Compressed.RAW + text)
+        self.assertEqual(self.argument.fromString(data), text)
+
+    def test_box_roundtrip(self):
+        text = "".join(chr(i % 256) for i in range(amp.AMP_MAXLEN * 2))
+        strings, objects = {}, {}
+        self.argument.toBox("data", strings, {"data": text}, None)
+        self.assertTrue(all(len(chunk) <= amp.AMP_MAXLEN for chunk in strings.values()))
+        self.argument.fromBox("data", strings, objects, None)
+        self.assertEqual(objects["data"], text)
+
+
+class TestAMPCodec(TestCase):
+    data = (12, {"text": [["You see |ra red ball|n."], {"options": {"raw": False}}],
+                 "prompt": [[u"HP: 10 \xe5"], {}],
+                 "oob": [[1, -2, 70000, -70000, 2 ** 40, 1.5, None, True, False],
+                         {"a": (1, 2), 3: ["x" * 300], "long": list(range(300))}]})
+
+    def test_binary_roundtrip(self):
+        codec = amp_codec.BinaryCodec()
+        self.assertEqual(codec.decode(codec.encode(self.data)), self.data)
+        self.assertEqual(codec.decode(codec.encode([])), [])
+        self.assertEqual(codec.decode(codec.encode(None)), None)
+
+    def test_binary_types(self):
+        codec = amp_codec.BinaryCodec()
+        decoded = codec.decode(codec.encode([True, 1, u"a", "a", 1.0, 2 ** 40]))
+        self.assertEqual([type(value) for value in decoded],
+                         [bool, int, unicode, str, float, type(2 ** 40)])
+        self.assertEqual(codec.decode(codec.encode(set([1]))), set([1]))
+
+    def test_binary_unsupported(self):
+        class Text(unicode):
+            pass
+        codec = amp_codec.BinaryCodec()
+        decoded = codec.decode(codec.encode((1, {"text": [[Text(u"hi")], {"obj": object}]})))
+        self.assertEqual(type(decoded[1]["text"][0][0]), unicode)
+        # unsupported objects are sent as strings
+        self.assertEqual(decoded[1]["text"][1]["obj"], u"<type 'object'>")
+
+    def test_binary_malformed(self):
+        codec = amp_codec.BinaryCodec()
+        encoded = codec.encode(self.data)
+        for bad in (encoded[:-1], "\x01" + encoded[1:], "\x02Z",
+                    amp_codec.PickleCodec().encode(self.data)):
+            self.assertRaises(ValueError, codec.decode, bad)
+
+    def test_pickle_roundtrip(self):
+        codec = amp_codec.PickleCodec()
+        self.assertEqual(codec.decode(codec.encode(self.data)), self.data)
+        self.assertRaises(ValueError, codec.decode, amp_codec.BinaryCodec().encode(self.data))
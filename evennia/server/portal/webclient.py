@@ -19,12 +19,48 @@ import json
 from twisted.internet.protocol import Protocol
 from django.conf import settings
 from evennia.server.session import Session
-from evennia.utils.utils import to_str, mod_import
+from evennia.utils.utils import to_str, mod_import, LRUCache
 from evennia.utils.ansi import parse_ansi
 from evennia.utils.text2html import parse_html
 
 _RE_SCREENREADER_REGEX = re.compile(r"%s" % settings.SCREENREADER_REGEX_STRIP, re.DOTALL + re.MULTILINE)
 _CLIENT_SESSIONS = mod_import(settings.SESSION_ENGINE).SessionStore
+_RENDER_CACHE = LRUCache(settings.PORTAL_RENDER_CACHE_SIZE)
+
+
+def _render_text(text, raw=False, nocolor=False, screenreader=False):
+    """
+    Render text as html for the webclient, used by both the websocket
+    and the AJAX webclient. The result only depends on the arguments, so
+    it is cached; text sent to many sessions is rendered once for each
+    combination of client options.
+
+    Args:
+        text (str): The text to render.
+        raw (bool, optional): Don't convert any markup.
+        nocolor (bool, optional): Strip all color.
+        screenreader (bool, optional): Clean the text up for screenreaders.
+
+    Returns:
+        rendered (str): The rendered text.
+
+    """
+    if raw and not screenreader:
+        return text
+    key = (text, bool(raw), bool(nocolor), bool(screenreader))
+    rendered = _RENDER_CACHE.get(key)
+    if rendered is not None:
+        return rendered
+
+    rendered = text
+    if screenreader:
+        # screenreader mode cleans up output
+        rendered = parse_ansi(rendered, strip_ansi=True, xterm256=False, mxp=False)
+        rendered = _RE_SCREENREADER_REGEX.sub("", rendered)
+    if not raw:
+        rendered = parse_html(rendered, strip_ansi=nocolor)
+    _RENDER_CACHE.set(key, rendered)
+    return rendered
 
 
 class WebSocketClient(Protocol, Session):
@@ -214,15 +250,8 @@ class WebSocketClient(Protocol, Session):
         screenreader = options.get("screenreader", flags.get("SCREENREADER", False))
         prompt = options.get("send_prompt", False)
 
-        if screenreader:
-            # screenreader mode cleans up output
-            text = parse_ansi(text, strip_ansi=True, xterm256=False, mxp=False)
-            text = _RE_SCREENREADER_REGEX.sub("", text)
         cmd = "prompt" if prompt else "text"
-        if raw:
-            args[0] = text
-        else:
-            args[0] = parse_html(text, strip_ansi=nocolor)
+        args[0] = _render_text(text, raw=raw, nocolor=nocolor, screenreader=screenreader)
 
         # send to client on required form [cmdname, args, kwargs]
         self.sendLine(json.dumps([cmd, args, kwargs]))
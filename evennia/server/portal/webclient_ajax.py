@@ -17,7 +17,6 @@ http://localhost:4001/webclient.)
                  to sessions connected over the webclient.
 """
 import json
-import re
 import time
 
 from twisted.web import server, resource
@@ -25,13 +24,11 @@ from twisted.internet.task import LoopingCall
 from django.utils.functional import Promise
 from django.utils.encoding import force_unicode
 from django.conf import settings
-from evennia.utils.ansi import parse_ansi
 from evennia.utils import utils
-from evennia.utils.text2html import parse_html
 from evennia.server import session
+from evennia.server.portal.webclient import _render_text
 
 _CLIENT_SESSIONS = utils.mod_import(settings.SESSION_ENGINE).SessionStore
-_RE_SCREENREADER_REGEX = re.compile(r"%s" % settings.SCREENREADER_REGEX_STRIP, re.DOTALL + re.MULTILINE)
 _SERVERNAME = settings.SERVERNAME
 _KEEPALIVE = 30  # how often to check keepalive
 
@@ -380,15 +377,8 @@ class AjaxWebClientSession(session.Session):
         screenreader = options.get("screenreader", flags.get("SCREENREADER", False))
         prompt = options.get("send_prompt", False)
 
-        if screenreader:
-            # screenreader mode cleans up output
-            text = parse_ansi(text, strip_ansi=True, xterm256=False, mxp=False)
-            text = _RE_SCREENREADER_REGEX.sub("", text)
         cmd = "prompt" if prompt else "text"
-        if raw:
-            args[0] = text
-        else:
-            args[0] = parse_html(text, strip_ansi=nocolor)
+        args[0] = _render_text(text, raw=raw, nocolor=nocolor, screenreader=screenreader)
 
         # send to client on required form [cmdname, args, kwargs]
         self.client.lineSend(self.csessid, [cmd, args, kwargs])
@@ -0,0 +1,187 @@
+"""
+AMP message benchmark
+
+This measures how many messages per second can be passed from the
+Server to the Portal over AMP, with and without message batching
+(the `AMP_BATCH_MSGS` setting). The two AMP protocols are connected
+in-memory so no network or running game is needed. Run from your game
+directory with
+
+    evennia shell
+    >>> from evennia.server.profiling import amp_benchmark
+    >>> amp_benchmark.run()
+
+Each "tick" sends one message to each of a number of sessions, like
+when a message is sent to everyone in a crowded room.
+
+`run_codecs()` compares the wire codecs (see `settings.AMP_CODEC`)
+against the old pickle + zlib-9 encoding of session data.
+
+"""
+from __future__ import print_function
+from __future__ import division
+
+import time
+import zlib
+from collections import namedtuple
+from mock import Mock, patch
+from twisted.internet.task import Clock
+from twisted.test import iosim
+from evennia.server.portal import amp, amp_server, amp_codec
+from evennia.server import amp_client
+
+_SESSION = namedtuple("Session", ["sessid"])
+
+
+class _ServerProtocol(amp_client.AMPServerClientProtocol):
+    """
+    Server-side protocol that doesn't start a portal sync on connect.
+
+    """
+    def connectionMade(self):
+        amp.AMPMultiConnectionProtocol.connectionMade(self)
+
+
+def _connect(batch):
+    """
+    Connect a Server- and Portal-side protocol in-memory.
+
+    Args:
+        batch (bool): If the Server should batch its messages.
+
+    Returns:
+        server, portal, pump (tuple): The two protocols and the pump
+            moving data between them.
+
+    """
+    portal_factory = Mock(broadcasts=[])
+    portal_factory.portal.sessions.get = lambda sessid, default=None: _SESSION(sessid)
+    server_factory = Mock(broadcasts=[])
+
+    def portal_protocol():
+        protocol = amp_server.AMPServerProtocol()
+        protocol.factory = portal_factory
+        return protocol
+
+    def server_protocol():
+        protocol = _ServerProtocol()
+        protocol.factory = server_factory
+        protocol.batch_msgs = batch
+        return protocol
+
+    server, portal, pump = iosim.connectedServerAndClient(portal_protocol, server_protocol)
+    return server, portal, pump
+
+
+def benchmark(batch, nsessions=100, nticks=100, text="This is a test message."):
+    """
+    Time sending messages from Server to Portal.
+
+    Args:
+        batch (bool): If the Server should batch its messages.
+        nsessions (int, optional): Number of sessions to send to every tick.
+        nticks (int, optional): Number of ticks to run.
+        text (str, optional): The text to send to each session.
+
+    Returns:
+        msgs_per_sec (float): The number of messages arriving at the
+            Portal per second.
+
+    """
+    clock = Clock()
+    with patch("evennia.server.portal.amp.reactor", clock):
+        server, portal, pump = _connect(batch)
+        data_out = portal.factory.portal.sessions.data_out
+        sessions = [_SESSION(sessid) for sessid in range(nsessions)]
+        t0 = time.time()
+        for _ in range(nticks):
+            for session in sessions:
+                server.send_MsgServer2Portal(session, text=text)
+            # end of the reactor tick
+            clock.advance(0)
+            pump.flush()
+        dt = time.time() - t0
+    nmsgs = nsessions * nticks
+    if data_out.call_count != nmsgs:
+        print("Warning: only %i of %i messages arrived." % (data_out.call_count, nmsgs))
+    return nmsgs / dt
+
+
+def run(nsessions=100, nticks=100):
+    """
+    Run the benchmark with and without batching and print the result.
+
+    Args:
+        nsessions (int, optional): Number of sessions to send to every tick.
+        nticks (int, optional): Number of ticks to run.
+
+    """
+    unbatched = benchmark(False, nsessions=nsessions, nticks=nticks)
+    batched = benchmark(True, nsessions=nsessions, nticks=nticks)
+    print("AMP Server->Portal, %i sessions x %i ticks:" % (nsessions, nticks))
+    print("  unbatched: %10.1f msgs/s" % unbatched)
+    print("  batched:   %10.1f msgs/s (x%.1f)" % (batched, batched / unbatched))
+
+
+def benchmark_codec(encode, decode, data, nrepeats=10000):
+    """
+    Time encoding and decoding data.
+
+    Args:
+        encode (callable): Encodes data to a string.
+        decode (callable): Decodes the string back to data.
+        data (any): The data to encode.
+        nrepeats (int, optional): Number of times to encode/decode.
+
+    Returns:
+        encode_time, decode_time, size (tuple): Time per encode and
+            decode in microseconds and the size of the encoded data.
+
+    """
+    t0 = time.time()
+    for _ in range(nrepeats):
+        encoded = encode(data)
+    t1 = time.time()
+    for _ in range(nrepeats):
+        decode(encoded)
+    t2 = time.time()
+    return ((t1 - t0) * 1e6 / nrepeats, (t2 - t1) * 1e6 / nrepeats, len(encoded))
+
+
+def run_codecs(nrepeats=10000):
+    """
+    Compare the wire codecs and print the result.
+
+    Args:
+        nrepeats (int, optional): Number of times to encode/decode.
+
+    """
+    messages = (
+        ("text", (1, {"text": [["You see a sword, a shield and 12 gold coins."],
+                               {"options": {}}]})),
+        ("oob", (1, {"hp": [[10, 20], {"options": {}}],
+                     "stats": [[], {"str": 12, "dex": 8, "name": "Bob", "alive": True}]})),
+        ("batch", [(sessid, {"text": [["Bob says, 'Hello everyone!'"], {"options": {}}]})
+                   for sessid in range(100)]))
+    compressed = amp.Compressed()
+    pickle_codec = amp_codec.PickleCodec()
+    binary_codec = amp_codec.BinaryCodec()
+    codecs = (
+        ("pickle+zlib9", lambda data: zlib.compress(amp.dumps(data), 9),
+         lambda data: amp.loads(zlib.decompress(data))),
+        ("pickle", pickle_codec.encode, pickle_codec.decode),
+        ("pickle+Compressed", lambda data: compressed.toString(pickle_codec.encode(data)),
+         lambda data: pickle_codec.decode(compressed.fromString(data))),
+        ("binary", binary_codec.encode, binary_codec.decode),
+        ("binary+Compressed", lambda data: compressed.toString(binary_codec.encode(data)),
+         lambda data: binary_codec.decode(compressed.fromString(data))))
+    for msgname, data in messages:
+        print("%s message:" % msgname)
+        for codecname, encode, decode in codecs:
+            print("  %-18s encode %8.2f us, decode %8.2f us, %6i bytes" % (
+                (codecname, ) + benchmark_codec(encode, decode, data, nrepeats=nrepeats)))
+
+
+if __name__ == "__main__":
+    run()
+    run_codecs()
@@ -0,0 +1,233 @@
+"""
+ANSI parsing benchmark
+
+This measures how fast Evennia markup is converted to ANSI sequences by
+`evennia.utils.ansi.parse_ansi`. Run from your game directory with
+
+    evennia shell
+    >>> from evennia.server.profiling import ansi_benchmark
+    >>> ansi_benchmark.run()
+
+Two kinds of text are parsed:
+
+- Room descriptions, all different from each other, with colors,
+  xterm256 colors and MXP links.
+- The output of a large `EvTable`. This is long and has already been
+  converted to ANSI sequences, but is still parsed again when sent.
+
+Each text is rendered for an xterm256 client and stripped of colors,
+like when it is sent to a telnet client and measured with `ANSIString`.
+The single-pass tokenizer, with and without its cache, is compared
+against the old way of running one regex substitution per kind of
+markup.
+
+`run_ansistring()` times building large `EvTable` outputs, which
+creates a great many `ANSIString`s, and reports how many of them
+needed their code/character indexes and how much memory these took.
+
+"""
+from __future__ import print_function
+from __future__ import division
+
+import sys
+import time
+from array import array
+from mock import patch
+from evennia.utils import ansi
+from evennia.utils.evtable import EvTable
+from evennia.utils.utils import to_str
+
+_ROOM = ("|cThe Great Hall of House %i|n\n"
+         "A |wvast|n hall with |y%i|n banners of |[r|455crimson|n and |=kgrey|n cloth. "
+         "Long tables line the walls, laden with |gfood|n and |Rwine||ale. "
+         "A fire crackles in the hearth, casting |[x|530flickering light|n across the "
+         "flagstones.\n|wExits:|n |lcnorth|ltnorth|le, |lcsouth|ltsouth|le and |lceast|lteast|le.")
+
+
+def parse_ansi_chained(string, strip_ansi=False, xterm256=False, mxp=False,
+                       parser=ansi.ANSI_PARSER):
+    """
+    Parse markup the way `ANSIParser.parse_ansi` did before it had a
+    tokenizer, with one regex substitution per kind of markup and no
+    cache. Kept for comparison.
+
+    Args:
+        string (str): The string to parse.
+        strip_ansi (bool, optional): Strip all ANSI sequences.
+        xterm256 (bool, optional): Support xterm256 or not.
+        mxp (bool, optional): Support MXP markup or not.
+        parser (ANSIParser, optional): The parser to use the regexes of.
+
+    Returns:
+        string (str): The parsed string.
+
+    """
+    string = parser.brightbg_sub.sub(parser.sub_brightbg, string)
+    subs = [(getattr(parser, "xterm256_%s_sub" % color_type),
+             lambda match, color_type=color_type: parser.sub_xterm256(match, xterm256, color_type))
+            for color_type in ("fg", "bg", "gfg", "gbg")]
+    subs.append((parser.ansi_sub, parser.sub_ansi))
+
+    parsed_string = []
+    parts = parser.ansi_escapes.split(to_str(string)) + [" "]
+    for part, sep in zip(parts[::2], parts[1::2]):
+        for regex, replacer in subs:
+            part = regex.sub(replacer, part)
+        parsed_string.append("%s%s" % (part, sep[0].strip()))
+    parsed_string = "".join(parsed_string)
+
+    if not mxp:
+        parsed_string = parser.strip_mxp(parsed_string)
+    if strip_ansi:
+        parsed_string = parser.strip_raw_codes(parsed_string)
+    return parsed_string
+
+
+def _parse_tokenized(string, strip_ansi=False, xterm256=False, mxp=False):
+    """
+    Parse with the tokenizer, but without looking in its cache.
+
+    """
+    parser = ansi.ANSI_PARSER
+    parsed_string = parser.render(parser._tokenize(to_str(string)), xterm256=xterm256)
+    if not mxp:
+        parsed_string = parser.strip_mxp(parsed_string)
+    if strip_ansi:
+        parsed_string = parser.strip_raw_codes(parsed_string)
+    return parsed_string
+
+
+def room_descriptions(nrooms):
+    """
+    Create room descriptions.
+
+    Args:
+        nrooms (int): The number of descriptions.
+
+    Returns:
+        descs (list): The descriptions, all different.
+
+    """
+    return [_ROOM % (i, i % 50) for i in range(nrooms)]
+
+
+def table_output(nrows):
+    """
+    Create the output of an `EvTable`, like from a `who` command.
+
+    Args:
+        nrows (int): The number of rows.
+
+    Returns:
+        output (str): The table, as sent to a session.
+
+    """
+    table = EvTable("|wAccount|n", "|wOn for|n", "|wIdle|n", "|wLocation|n", "|wCmds|n",
+                    border="cells")
+    for i in range(nrows):
+        table.add_row("|cPlayer%i|n" % i, "%id" % (i % 7), "%im" % (i % 60),
+                      "|yRoom #%i|n" % (i * 3), str(i * 11))
+    return str(table)
+
+
+def benchmark(parse, texts, nrepeats=1):
+    """
+    Time parsing texts, for an xterm256 client and stripped.
+
+    Args:
+        parse (callable): The parse function, taking the same
+            arguments as `parse_ansi`.
+        texts (list): The texts to parse.
+        nrepeats (int, optional): Number of times to parse all texts.
+
+    Returns:
+        time (float): Time per text, in microseconds.
+
+    """
+    t0 = time.time()
+    for _ in range(nrepeats):
+        for text in texts:
+            parse(text, xterm256=True)
+            parse(text, strip_ansi=True)
+    return (time.time() - t0) * 1e6 / (nrepeats * len(texts))
+
+
+def run(nrooms=2000, nrows=500):
+    """
+    Run the benchmark and print the result.
+
+    Args:
+        nrooms (int, optional): Number of room descriptions to parse.
+        nrows (int, optional): Number of rows in the table.
+
+    """
+    rooms = room_descriptions(nrooms)
+    table = [table_output(nrows)]
+    for name, texts, nrepeats in (("%i room descriptions" % nrooms, rooms, 1),
+                                  ("%i-row EvTable, %i chars" % (nrows, len(table[0])), table, 10)):
+        assert all(parse_ansi_chained(text, xterm256=True) == ansi.parse_ansi(text, xterm256=True)
+                   for text in texts)
+        chained = benchmark(parse_ansi_chained, texts, nrepeats)
+        tokenized = benchmark(_parse_tokenized, texts, nrepeats)
+        # the first round fills the cache
+        benchmark(ansi.parse_ansi, texts, 1)
+        cached = benchmark(ansi.parse_ansi, texts, nrepeats)
+        print("%s, per text:" % name)
+        print("  chained regexes: %10.1f us" % chained)
+        print("  tokenizer:       %10.1f us (x%.1f)" % (tokenized, chained / tokenized))
+        print("  tokenizer cache: %10.1f us (x%.1f)" % (cached, chained / cached))
+
+
+def _list_size(indexes):
+    """
+    The memory used by a list of the given indexes, in bytes. Small ints
+    are shared by Python and are not counted.
+
+    """
+    return sys.getsizeof(list(indexes)) + sum(sys.getsizeof(i) for i in indexes if i > 256)
+
+
+def run_ansistring(nrows=500, nrepeats=3):
+    """
+    Time building `EvTable` outputs and print the result, along with
+    the number of ANSIStrings whose indexes were needed and the memory
+    these indexes took.
+
+    Args:
+        nrows (int, optional): Number of rows in the table.
+        nrepeats (int, optional): Number of tables to build.
+
+    """
+    init = ansi.ANSIString.__init__
+    get_indexes = ansi.ANSIString._get_indexes
+    stats = {"strings": 0, "indexed": 0, "array_size": 0, "list_size": 0}
+
+    def _init(self, *args, **kwargs):
+        stats["strings"] += 1
+        init(self, *args, **kwargs)
+
+    def _get_indexes(self):
+        code_indexes, char_indexes = get_indexes(self)
+        stats["indexed"] += 1
+        for indexes in (code_indexes, char_indexes):
+            stats["array_size"] += sys.getsizeof(array('i', indexes))
+            stats["list_size"] += _list_size(indexes)
+        return code_indexes, char_indexes
+
+    with patch.object(ansi.ANSIString, "__init__", _init), \
+            patch.object(ansi.ANSIString, "_get_indexes", _get_indexes):
+        table_output(nrows)
+    t0 = time.time()
+    for _ in range(nrepeats):
+        table_output(nrows)
+    dt = (time.time() - t0) / nrepeats
+
+    print("%i-row EvTable: %.1f ms" % (nrows, dt * 1000))
+    print("  ANSIStrings created: %i, indexed: %i" % (stats["strings"], stats["indexed"]))
+    print("  index memory: %.1f kB as arrays, %.1f kB as lists" % (
+          stats["array_size"] / 1024, stats["list_size"] / 1024))
+
+
+if __name__ == "__main__":
+    run()
+    run_ansistring()
@@ -0,0 +1,94 @@
+"""
+Attribute serialization benchmark
+
+This measures how fast large nested Attribute values are serialized by
+`evennia.utils.dbserialize`, and how fast they are saved to and loaded
+from an Attribute. Run from your game directory with
+
+    evennia shell
+    >>> from evennia.server.profiling import dbserialize_benchmark
+    >>> dbserialize_benchmark.run()
+
+The data is modelled on a quest log, a map and a mailbox, with a few
+database objects mixed in. The Attribute timings use a temporary object
+that is deleted afterwards.
+
+"""
+from __future__ import print_function
+from __future__ import division
+
+import time
+from collections import OrderedDict, deque
+from evennia.utils import dbserialize
+
+
+def nested_data(nelements, obj=None):
+    """
+    Build an Attribute-like value with a quest log, a map and mail.
+
+    Args:
+        nelements (int): Roughly the number of leaf elements.
+        obj (Object, optional): Database object to mix into the data.
+
+    Returns:
+        data (dict): The nested data.
+
+    """
+    nrooms = nelements // 4
+    return {"quests": ["quest %i finished" % i for i in range(nelements // 4)],
+            "map": dict(("room%i" % i, {"x": i, "y": -i, "visited": i % 2 == 0})
+                        for i in range(nrooms // 4)),
+            "mail": [(u"subject %i" % i, "body text", obj if i % 100 == 0 else None, 1.5)
+                     for i in range(nelements // 4)],
+            "misc": OrderedDict((i, deque([i, [i]])) for i in range(10))}
+
+
+def _time(func, *args, **kwargs):
+    """
+    Call a function and time it.
+
+    Returns:
+        result, dt (tuple): The return of the function and the time
+            it took, in milliseconds.
+
+    """
+    t0 = time.time()
+    ret = func(*args, **kwargs)
+    return ret, (time.time() - t0) * 1000
+
+
+def run(nelements=10000):
+    """
+    Run the benchmark and print the result.
+
+    Args:
+        nelements (int, optional): Roughly the number of leaf elements
+            in the serialized data.
+
+    """
+    from evennia.utils.create import create_object
+    obj = create_object("evennia.objects.objects.DefaultObject", key="dbserialize_benchmark")
+    try:
+        data = nested_data(nelements, obj=obj)
+        pickled, t_to = _time(dbserialize.to_pickle, data)
+        unpickled, t_from = _time(dbserialize.from_pickle, pickled)
+        assert unpickled == data
+        print("%i elements:" % nelements)
+        print("  to_pickle:   %10.2f ms" % t_to)
+        print("  from_pickle: %10.2f ms" % t_from)
+
+        data = nested_data(nelements)
+        _, t_save = _time(obj.attributes.add, "bench", data)
+        value, t_load = _time(obj.attributes.get, "bench")
+        assert value == data
+        _, t_update = _time(value["quests"].append, "new quest")
+        print("Attribute with %i elements:" % nelements)
+        print("  save:          %10.2f ms" % t_save)
+        print("  load:          %10.2f ms" % t_load)
+        print("  nested update: %10.2f ms" % t_update)
+    finally:
+        obj.delete()
+
+
+if __name__ == "__main__":
+    run()
@@ -91,6 +91,7 @@ except ImportError:
 _MAINTENANCE_COUNT = 0
 _FLUSH_CACHE = None
 _IDMAPPER_CACHE_MAXSIZE = settings.IDMAPPER_CACHE_MAXSIZE
+_IDMAPPER_CACHE_MAXINSTANCES = settings.IDMAPPER_CACHE_MAXINSTANCES
 _GAMETIME_MODULE = None
 
 _IDLE_TIMEOUT = settings.IDLE_TIMEOUT
@@ -122,7 +123,7 @@ def _server_maintenance():
 
     if _MAINTENANCE_COUNT % 300 == 0:
         # check cache size every 5 minutes
-        _FLUSH_CACHE(_IDMAPPER_CACHE_MAXSIZE)
+        _FLUSH_CACHE(_IDMAPPER_CACHE_MAXSIZE, max_instances=_IDMAPPER_CACHE_MAXINSTANCES)
     if _MAINTENANCE_COUNT % 3600 == 0:
         # validate scripts every hour
         evennia.ScriptDB.objects.validate()
@@ -387,6 +388,9 @@ class Evennia(object):
         # always called, also for a reload
         self.at_server_stop()
 
+        # write out any buffered log lines
+        logger.flush_log_buffers(threaded=False)
+
         if hasattr(self, "web_root"):  # not set very first start
             yield self.web_root.empty_threadpool()
 
@@ -35,6 +35,7 @@ _INLINEFUNC_ENABLED = settings.INLINEFUNC_ENABLED
 # delayed imports
 _AccountDB = None
 _ServerSession = None
+_SESSION_DATA_OUT = None
 _ServerConfig = None
 _ScriptDB = None
 _OOB_HANDLER = None
@@ -191,6 +192,8 @@ class SessionHandler(dict):
         options = kwargs.pop("options", None) or {}
         raw = options.get("raw", False)
         strip_inlinefunc = options.get("strip_inlinefunc", False)
+        # only parse inlinefuncs on the outgoing path (sessionhandler->)
+        parse_inlinefuncs = _INLINEFUNC_ENABLED and not raw and isinstance(self, ServerSessionHandler)
 
         def _validate(data):
             "Helper function to convert data to AMP-safe (picketable) values"
@@ -209,8 +212,8 @@ class SessionHandler(dict):
                     # wrong encoding set on the session. Set it to a safe one
                     session.protocol_flags["ENCODING"] = "utf-8"
                     data = to_str(to_unicode(data), encoding=session.protocol_flags["ENCODING"])
-                if _INLINEFUNC_ENABLED and not raw and isinstance(self, ServerSessionHandler):
-                    # only parse inlinefuncs on the outgoing path (sessionhandler->)
+                if parse_inlinefuncs and "$" in data:
+                    # text without a $ can't hold an inlinefunc
                     data = parse_inlinefunc(data, strip=strip_inlinefunc, session=session)
                 # At this point the object is certainly the right encoding, but may still be a unicode object--
                 # to_str does not actually force objects to become bytestrings.
@@ -225,8 +228,16 @@ class SessionHandler(dict):
             else:
                 return data
 
+        # plain utf-8 text without inlinefuncs to parse is already send-safe
+        plain_text_ok = session.protocol_flags.get("ENCODING") == "utf-8"
+
         rkwargs = {}
         for key, data in kwargs.iteritems():
+            if (plain_text_ok and type(data) is str and data and type(key) is str and
+                    not (parse_inlinefuncs and "$" in data)):
+                # fast path, no need to validate
+                rkwargs[key] = [[data], {"options": options}]
+                continue
             key = _validate(key)
             if not data:
                 if key == "text":
@@ -765,6 +776,43 @@ class ServerSessionHandler(SessionHandler):
         self.server.amp_protocol.send_MsgServer2Portal(session,
                                                        **kwargs)
 
+    def data_out_multi(self, sessions, **kwargs):
+        """
+        Sending the same data Server -> Portal to many sessions. Sessions
+        sharing a text encoding are sent the data in one message, only
+        cleaned once.
+
+        Args:
+            sessions (list): Sessions to relay to.
+            kwargs (any): As for `data_out`.
+
+        Notes:
+            Sessions with their own `data_out` method, as well as all
+            sessions if inlinefuncs are parsed (their result may depend
+            on the session), are sent to one by one.
+
+        """
+        global _SESSION_DATA_OUT
+        if not _SESSION_DATA_OUT:
+            from evennia.server.serversession import ServerSession
+            _SESSION_DATA_OUT = ServerSession.data_out.__func__
+
+        options = kwargs.get("options", None) or {}
+        share = not (_INLINEFUNC_ENABLED and not options.get("raw", False))
+        by_encoding = {}
+        for session in sessions:
+            if share and getattr(type(session).data_out, "__func__", None) is _SESSION_DATA_OUT:
+                by_encoding.setdefault(session.protocol_flags.get("ENCODING"), []).append(session)
+            else:
+                session.data_out(**kwargs)
+
+        for group in by_encoding.values():
+            if len(group) == 1:
+                self.data_out(group[0], **kwargs)
+            else:
+                cleaned = self.clean_senddata(group[0], dict(kwargs))
+                self.server.amp_protocol.send_MsgServer2PortalMulti(group, **cleaned)
+
     def get_inputfuncs(self):
         """
         Get all registered inputfuncs (access function)
@@ -109,6 +109,33 @@ EVENNIA_ADMIN = True
 AMP_HOST = 'localhost'
 AMP_PORT = 4006
 AMP_INTERFACE = '127.0.0.1'
+# If set, messages between Portal and Server are collected and sent
+# across AMP in batches rather than one at a time. This means far fewer
+# AMP calls when many messages are sent at the same time (such as when
+# speaking in a crowded room). A batch is sent on the next reactor
+# tick (or after AMP_BATCH_INTERVAL seconds), or as soon as it holds
+# AMP_BATCH_MAXMSGS messages.
+AMP_BATCH_MSGS = False
+AMP_BATCH_MAXMSGS = 500
+AMP_BATCH_INTERVAL = 0
+# Data sent across AMP is compressed with zlib at this level (1-9, higher
+# is slower but compresses better). Data smaller than the threshold (in
+# bytes) is sent uncompressed, since compressing it is not worth the
+# time. Portal and Server usually run on the same machine, so turning
+# compression off completely may be better in that case. Compression
+# statistics are available from evennia.server.portal.amp.get_compression_stats().
+AMP_COMPRESSION = True
+AMP_COMPRESSION_LEVEL = 6
+AMP_COMPRESSION_THRESHOLD = 256
+# The codec used to encode session data sent between Portal and Server.
+# The default pickles the data. The BinaryCodec only supports the basic
+# types (str, unicode, int, float, bool, None, list, tuple, dict and set)
+# that are sent with session messages, sending other objects as strings.
+# It is faster than pickle and means no unpickling of data coming from
+# the other process, but its data is somewhat larger (compression evens
+# this out for big messages). Portal and Server must use the same codec,
+# so restart (not reload) after changing this.
+AMP_CODEC = "evennia.server.portal.amp_codec.PickleCodec"
 
 
 # Path to the lib directory containing the bulk of the codebase's code.
@@ -144,6 +171,9 @@ CYCLE_LOGFILES = True
 CHANNEL_LOG_NUM_TAIL_LINES = 20
 # Max size (in bytes) of channel log files before they rotate
 CHANNEL_LOG_ROTATE_SIZE = 1000000
+# Channel messages are logged in batches, collecting lines for this
+# many seconds before writing them to file.
+LOG_FILE_BUFFER_DELAY = 1.0
 # Local time zone for this installation. All choices can be found here:
 # http://www.postgresql.org/docs/8.0/interactive/datetime-keywords.html#DATETIME-TIMEZONE-SET-TABLE
 TIME_ZONE = 'UTC'
@@ -178,30 +208,45 @@ ENCODINGS = ["utf-8", "latin-1", "ISO-8859-1"]
 # of users with screen readers. Note that ANSI/MXP doesn't need to
 # be stripped this way, that is handled automatically.
 SCREENREADER_REGEX_STRIP = r"\+-+|\+$|\+~|--+|~~+|==+"
+# The Portal protocols cache the text they render for their clients
+# (color, MXP, html conversion etc), keyed on the text and the client's
+# render options. A text sent to many sessions, such as a say in a
+# crowded room, is then only rendered once for each combination of
+# options. This is the max number of rendered texts each protocol keeps.
+PORTAL_RENDER_CACHE_SIZE = 1000
 # Database objects are cached in what is known as the idmapper. The idmapper
 # caching results in a massive speedup of the server (since it dramatically
 # limits the number of database accesses needed) and also allows for
 # storing temporary data on objects. It is however also the main memory
-# consumer of Evennia. With this setting the cache can be capped and
-# flushed when it reaches a certain size. Minimum is 50 MB but it is
-# not recommended to set this to less than 100 MB for a distribution
-# system.
-# Empirically, N_objects_in_cache ~ ((RMEM - 35) / 0.0157):
-#  mem(MB)   |  objs in cache   ||   mem(MB)   |   objs in cache
-#      50    |       ~1000      ||      800    |     ~49 000
-#     100    |       ~4000      ||     1200    |     ~75 000
-#     200    |      ~10 000     ||     1600    |    ~100 000
-#     500    |      ~30 000     ||     2000    |    ~125 000
-# Note that the estimated memory usage is not exact (and the cap is only
-# checked every 5 minutes), so err on the side of caution if
-# running on a server with limited memory. Also note that Python
-# will not necessarily return the memory to the OS when the idmapper
-# flashes (the memory will be freed and made available to the Python
-# process only). How many objects need to be in memory at any given
-# time depends very much on your game so some experimentation may
-# be necessary (use @server to see how many objects are in the idmapper
-# cache at any time). Setting this to None disables the cache cap.
+# consumer of Evennia. With this setting the cache can be capped. When the
+# server's memory use gets within 10% of this size, the least recently
+# used quarter of the cache is evicted. Puppeted objects, their locations
+# and everything in them, connected accounts and scripts are never
+# evicted. Minimum is 50 MB but it is not recommended to set this to less
+# than 100 MB for a distribution system.
+# Note that the memory use is only checked every 5 minutes, so err on
+# the side of caution if running on a server with limited memory. Also
+# note that Python will not necessarily return the memory to the OS when
+# the idmapper evicts objects (the memory will be freed and made available
+# to the Python process only). How many objects need to be in memory at
+# any given time depends very much on your game so some experimentation
+# may be necessary (use @server to see how many objects are in the
+# idmapper cache at any time). Setting this to None disables the cache cap.
 IDMAPPER_CACHE_MAXSIZE = 200      # (MB)
+# The max number of instances to keep in the idmapper cache for each
+# database model, like {"ObjectDB": 20000, "default": 50000}, where
+# "default" applies to models not listed. The least recently used
+# instances are evicted first. None means no cap.
+IDMAPPER_CACHE_MAXINSTANCES = None
+# The TickerHandler spreads the subscribers of each ticker interval evenly
+# over this many slots, called one after the other during the interval, so
+# that not all subscribers fire at the same moment. Slots are at least one
+# second apart, so a 5-second ticker uses at most 5 slots.
+TICKER_SLOTS = 10
+# The max time (in seconds) a ticker may spend calling its subscribers
+# before it pauses to let the Server handle other events (such as player
+# commands), continuing right after.
+TICKER_MAX_TIME_PER_TURN = 0.05
 # This determines how many connections per second the Portal should
 # accept, as a DoS countermeasure. If the rate exceeds this number, incoming
 # connections will be queued to this rate, so none will be lost.
@@ -302,6 +347,11 @@ SEARCH_MULTIMATCH_TEMPLATE = " {number}-{name}{aliases}{info}\n"
 # both for command- and object-searches. This allows full control
 # over the error output (it uses SEARCH_MULTIMATCH_TEMPLATE by default).
 SEARCH_AT_RESULT = "evennia.utils.utils.at_search_result"
+# Global object searches by key or alias use an in-memory index of all
+# object keys and aliases, built on the first search. This is kept up to
+# date when keys and aliases are changed through Evennia; turn it off if
+# objects are renamed directly in the database while the server runs.
+OBJECT_SEARCH_INDEX = True
 # Single characters to ignore at the beginning of a command. When set, e.g.
 # cmd, @cmd and +cmd will all find a command "cmd" or one named "@cmd" etc. If
 # you have defined two different commands cmd and @cmd you can still enter
@@ -415,6 +465,15 @@ CMDSET_FALLBACKS = {CMDSET_CHARACTER: 'evennia.commands.default.cmdset_character
                     CMDSET_ACCOUNT: 'evennia.commands.default.cmdset_account.AccountCmdSet',
                     CMDSET_SESSION: 'evennia.commands.default.cmdset_session.SessionCmdSet',
                     CMDSET_UNLOGGEDIN: 'evennia.commands.default.cmdset_unloggedin.UnloggedinCmdSet'}
+# The results of merging cmdsets are cached, both for the full merger and
+# for partial mergers that can be re-used (such as the merger of the
+# session-, account- and character-cmdsets, which is the same in every
+# room). This is the max number of mergers to cache. The least recently
+# used mergers are evicted first. Cmdsets are recognized by their class,
+# key and the keys, aliases, locks and arg_regex of their commands. If
+# you change a command in a cmdset in any other way after the cmdset was
+# created, re-`add()` the command so the cmdset gets a new version.
+CMDSET_MERGE_CACHE_SIZE = 2000
 # Parent class for all default commands. Changing this class will
 # modify all default commands, so do so carefully.
 COMMAND_DEFAULT_CLASS = "evennia.commands.default.muxcommand.MuxCommand"
@@ -483,6 +542,33 @@ START_LOCATION = "#2"
 # out of sync between the processes. Keep on unless you face such
 # issues.
 TYPECLASS_AGGRESSIVE_CACHE = True
+# Lock definitions are compiled once and the compiled form is shared by
+# all objects using the same lock definition. This is the max number of
+# unique lock definitions (like 'edit:perm(Builder)') to keep compiled.
+LOCK_COMPILE_CACHE_SIZE = 10000
+# Memoize the result of lock checks per accessing object and access
+# type. The memoized result is invalidated whenever the permissions,
+# Tags, Attributes or locks of the objects involved change. Lock
+# functions depending on other state (like `holds` or `inside`) are
+# marked as not cacheable and are always re-run. Note that in-place
+# changes to mutable Attributes (like `obj.db.mylist.append(1)`) are
+# not tracked, so custom lock functions relying on such Attributes
+# should be marked with `cacheable = False`.
+LOCK_RESULT_CACHE = False
+# The max number of memoized lock results kept for each locked object,
+# when LOCK_RESULT_CACHE is set. The memoized results of an object are
+# all dropped when this is reached.
+LOCK_RESULT_CACHE_SIZE = 1000
+# In-place changes to mutable Attributes (like `obj.db.mylist.append(1)` or
+# `obj.db.mydict["hp"] -= 1`) normally re-serialize and save the whole
+# Attribute on every change. With write-behind, such changes are kept in
+# memory and each changed Attribute is saved only once, at the end of the
+# Command or after ATTRIBUTE_WRITE_BEHIND_DELAY seconds, whichever comes
+# first. Reading the Attribute sees the changes right away, but changes
+# not yet saved are lost if the Server crashes. The same deferring can be
+# done for a block of code with `with obj.attributes.batch():`.
+ATTRIBUTE_WRITE_BEHIND = False
+ATTRIBUTE_WRITE_BEHIND_DELAY = 0.1
 
 ######################################################################
 # Batch processors
@@ -528,6 +614,11 @@ INLINEFUNC_ENABLED = False
 # is loaded from left-to-right, same-named functions will overload
 INLINEFUNC_MODULES = ["evennia.utils.inlinefuncs",
                       "server.conf.inlinefuncs"]
+# Strings with inlinefuncs are compiled once and the compiled form is
+# re-used when the same string is sent again. This is the max number of
+# compiled strings to keep. It is also the max number of results of
+# inlinefuncs marked as `pure` that are remembered for each session.
+INLINEFUNC_CACHE_SIZE = 1000
 # Module holding handlers for OLCFuncs. These allow for embedding
 # functional code in prototypes
 PROTOTYPEFUNC_MODULES = ["evennia.utils.prototypefuncs",
@@ -12,14 +12,16 @@ from builtins import object
 import re
 import fnmatch
 import weakref
+from collections import defaultdict
 
 from django.db import models
 from django.conf import settings
 from django.utils.encoding import smart_str
 
-from evennia.locks.lockhandler import LockHandler
+from evennia.locks.lockhandler import LockHandler, bump_lock_version
 from evennia.utils.idmapper.models import SharedMemoryModel
-from evennia.utils.dbserialize import to_pickle, from_pickle
+from evennia.utils.dbserialize import (to_pickle, from_pickle, deferred_saves,
+                                       get_deferred_save, discard_deferred_save)
 from evennia.utils.picklefield import PickledObjectField
 from evennia.utils.utils import lazy_property, to_str, make_iter, is_iter
 
@@ -140,6 +142,10 @@ class Attribute(SharedMemoryModel):
         as storing a dbobj which is then deleted elsewhere) out-of-sync.
         The overhead of unpickling seems hard to avoid.
         """
+        deferred = get_deferred_save(self)
+        if deferred is not None:
+            # in-place changes not yet saved to the database
+            return deferred
         return from_pickle(self.db_value, db_obj=self)
 
     # @value.setter
@@ -148,6 +154,7 @@ class Attribute(SharedMemoryModel):
         Setter. Allows for self.value = value. We cannot cache here,
         see self.__value_get.
         """
+        discard_deferred_save(self)
         self.db_value = to_pickle(new_value)
         # print("value_set, self.db_value:", repr(self.db_value))  # DEBUG
         self.save(update_fields=["db_value"])
@@ -155,6 +162,7 @@ class Attribute(SharedMemoryModel):
     # @value.deleter
     def __value_del(self):
         """Deleter. Allows for del attr.value. This removes the entire attribute."""
+        discard_deferred_save(self)
         self.delete()
     value = property(__value_get, __value_set, __value_del)
 
@@ -205,6 +213,8 @@ class AttributeHandler(object):
     _attredit = "attredit"
     _attrread = "attrread"
     _attrtype = None
+    # the name of this handler's property on the typeclassed object
+    _handlername = "attributes"
 
     def __init__(self, obj):
         """Initialize handler."""
@@ -265,6 +275,9 @@ class AttributeHandler(object):
                 cachefound = True
             except KeyError:
                 attr = None
+                if _TYPECLASS_AGGRESSIVE_CACHE and self._cache_complete:
+                    # all attributes are cached, so this one doesn't exist
+                    cachefound = True
 
             if attr and (not hasattr(attr, "pk") and attr.pk is None):
                 # clear out Attributes deleted from elsewhere. We must search this anew.
@@ -300,7 +313,7 @@ class AttributeHandler(object):
             # assume the cache to be complete unless we have queried
             # for this category before
             catkey = "-%s" % category
-            if _TYPECLASS_AGGRESSIVE_CACHE and catkey in self._catcache:
+            if _TYPECLASS_AGGRESSIVE_CACHE and (self._cache_complete or catkey in self._catcache):
                 return [attr for key, attr in self._cache.items() if key.endswith(catkey) and attr]
             else:
                 # we have to query to make this category up-date in the cache
@@ -333,9 +346,9 @@ class AttributeHandler(object):
         cachekey = "%s-%s" % (key, category)
         catkey = "-%s" % category
         self._cache[cachekey] = attr_obj
-        # mark that the category cache is no longer up-to-date
+        # mark that the category cache is no longer up-to-date. A complete
+        # cache stays complete, since the new attribute is now in it.
         self._catcache.pop(catkey, None)
-        self._cache_complete = False
 
     def _delcache(self, key, category):
         """
@@ -346,6 +359,8 @@ class AttributeHandler(object):
             category (str or None): A cleaned category name
 
         """
+        key = key.strip().lower() if key else None
+        category = category.strip().lower() if category else None
         catkey = "-%s" % category
         if key:
             cachekey = "%s-%s" % (key, category)
@@ -353,9 +368,9 @@ class AttributeHandler(object):
         else:
             self._cache = {key: attrobj for key, attrobj in
                            self._cache.items() if not key.endswith(catkey)}
-        # mark that the category cache is no longer up-to-date
+        # mark that the category cache is no longer up-to-date. A complete
+        # cache stays complete, since only the removed attributes left it.
         self._catcache.pop(catkey, None)
-        self._cache_complete = False
 
     def reset_cache(self):
         """
@@ -365,6 +380,113 @@ class AttributeHandler(object):
         self._cache = {}
         self._catcache = {}
 
+    def batch(self):
+        """
+        Defer saving in-place changes to mutable Attributes (like
+        `obj.db.mylist.append(1)`) until the end of a `with` block, so
+        each changed Attribute is only serialized and saved once.
+
+        Returns:
+            context (contextmanager): The context to use with `with`.
+
+        Examples:
+            ```python
+            with obj.attributes.batch():
+                obj.db.stats["hp"] -= 10
+                obj.db.stats["mana"] -= 5
+                obj.db.inventory.append(item)
+            ```
+
+        Notes:
+            The deferring applies to all Attributes changed inside the
+            block, not only to those of this handler's object.
+
+        """
+        return deferred_saves()
+
+    @classmethod
+    def prefetch(cls, objs, keys=None, category=None):
+        """
+        Load the Attributes of many objects into their handler caches
+        using a single database query. Use this before looping over a
+        group of objects (like the contents of a room) and accessing
+        their Attributes one by one.
+
+        Args:
+            objs (Object or list): Typeclassed entities to load Attributes
+                for. Entities of different database models are loaded
+                with one query per model.
+            keys (str or list, optional): Only load Attributes with these
+                keys. Keys not found are cached as missing, so accessing
+                them afterwards will not query the database.
+            category (str, optional): Only load Attributes of this category.
+                If `keys` are given, this is the category of those keys.
+
+        Notes:
+            If neither `keys` nor `category` are given, all Attributes of
+            the objects are loaded and their caches are marked as complete.
+            Objects for which this was already done are skipped.
+
+        """
+        if not _TYPECLASS_AGGRESSIVE_CACHE:
+            return
+        keys = [key.strip().lower() for key in make_iter(keys)] if keys else None
+        category = category.strip().lower() if category else None
+        catkey = "-%s" % category
+        handlers = defaultdict(dict)
+        for obj in make_iter(objs):
+            if not (obj and obj.pk):
+                continue
+            handler = getattr(obj, cls._handlername)
+            if handler._cache_complete or (not keys and category and catkey in handler._catcache):
+                continue
+            handlers[handler._model][handler._objid] = handler
+        for model, model_handlers in handlers.items():
+            cls._prefetch_model(model, model_handlers, keys, category)
+
+    @classmethod
+    def _prefetch_model(cls, model, handlers, keys, category):
+        """
+        Helper for `prefetch`, loading the Attributes of one database model.
+
+        Args:
+            model (str): The lower-case database model name.
+            handlers (dict): The handlers to fill, keyed on object id.
+            keys (list or None): Cleaned keys to load.
+            category (str or None): Cleaned category to load.
+
+        """
+        catkey = "-%s" % category
+        handler = next(iter(handlers.values()))
+        query = {"%s__id__in" % model: list(handlers),
+                 "attribute__db_model__iexact": model,
+                 "attribute__db_attrtype": cls._attrtype}
+        if keys:
+            query["attribute__db_key__in"] = keys
+        if keys or category:
+            query["attribute__db_category__iexact"] = category
+        conns = getattr(handler.obj, cls._m2m_fieldname).through.objects.filter(
+            **query).select_related("attribute")
+        found = defaultdict(dict)
+        objid_field = "%s_id" % model
+        for conn in conns:
+            attr = conn.attribute
+            found[getattr(conn, objid_field)]["%s-%s" % (
+                to_str(attr.db_key).lower(),
+                attr.db_category.lower() if attr.db_category else None)] = attr
+        for objid, handler in handlers.items():
+            attrs = found.get(objid, {})
+            if keys:
+                for key in keys:
+                    cachekey = "%s-%s" % (key, category)
+                    handler._cache[cachekey] = attrs.get(cachekey)
+            elif category:
+                handler._cache.update(attrs)
+                handler._catcache[catkey] = True
+            else:
+                handler._cache = attrs
+                handler._cache_complete = True
+
     def has(self, key=None, category=None):
         """
         Checks if the given Attribute (or list of Attributes) exists on
@@ -524,6 +646,7 @@ class AttributeHandler(object):
             getattr(self.obj, self._m2m_fieldname).add(new_attr)
             # update cache
             self._setcache(keystr, category, new_attr)
+        bump_lock_version(self.obj)
 
     def batch_add(self, *args, **kwargs):
         """
@@ -598,6 +721,7 @@ class AttributeHandler(object):
         if new_attrobjs:
             # Add new objects to m2m field all at once
             getattr(self.obj, self._m2m_fieldname).add(*new_attrobjs)
+        bump_lock_version(self.obj)
 
     def remove(self, key, raise_exception=False, category=None,
                accessing_obj=None, default_access=True):
@@ -637,7 +761,8 @@ class AttributeHandler(object):
                         # this happens if the attr was already deleted
                         pass
                     finally:
-                        self._delcache(key, category)
+                        self._delcache(keystr, category)
+                        bump_lock_version(self.obj)
             if not attr_objs and raise_exception:
                 raise AttributeError
 
@@ -665,6 +790,7 @@ class AttributeHandler(object):
         self._cache = {}
         self._catcache = {}
         self._cache_complete = False
+        bump_lock_version(self.obj)
 
     def all(self, accessing_obj=None, default_access=True):
         """
@@ -799,6 +925,7 @@ class NickHandler(AttributeHandler):
 
     """
     _attrtype = "nick"
+    _handlername = "nicks"
 
     def __init__(self, *args, **kwargs):
         super(NickHandler, self).__init__(*args, **kwargs)
@@ -14,6 +14,7 @@ from collections import defaultdict
 
 from django.conf import settings
 from django.db import models
+from evennia.locks.lockhandler import bump_lock_version
 from evennia.utils.utils import to_str, make_iter
 
 
@@ -84,6 +85,8 @@ class TagHandler(object):
     """
     _m2m_fieldname = "db_tags"
     _tagtype = None
+    # the name of this handler's property on the typeclassed object
+    _handlername = "tags"
 
     def __init__(self, obj):
         """
@@ -149,6 +152,8 @@ class TagHandler(object):
                 del self._cache[cachekey]
             if tag:
                 return [tag]  # return cached entity
+            elif _TYPECLASS_AGGRESSIVE_CACHE and (self._cache_complete or cachekey in self._cache):
+                return []  # cached as not existing
             else:
                 query = {"%s__id" % self._model: self._objid,
                          "tag__db_model": self._model,
@@ -165,8 +170,8 @@ class TagHandler(object):
             # assume the cache to be complete unless we have queried
             # for this category before
             catkey = "-%s" % category
-            if _TYPECLASS_AGGRESSIVE_CACHE and catkey in self._catcache:
-                return [tag for key, tag in self._cache.items() if key.endswith(catkey)]
+            if _TYPECLASS_AGGRESSIVE_CACHE and (self._cache_complete or catkey in self._catcache):
+                return [tag for key, tag in self._cache.items() if key.endswith(catkey) and tag]
             else:
                 # we have to query to make this category up-date in the cache
                 query = {"%s__id" % self._model: self._objid,
@@ -199,9 +204,9 @@ class TagHandler(object):
         cachekey = "%s-%s" % (key, category)
         catkey = "-%s" % category
         self._cache[cachekey] = tag_obj
-        # mark that the category cache is no longer up-to-date
+        # mark that the category cache is no longer up-to-date. A complete
+        # cache stays complete, since the new tag is now in it.
         self._catcache.pop(catkey, None)
-        self._cache_complete = False
 
     def _delcache(self, key, category):
         """
@@ -218,10 +223,10 @@ class TagHandler(object):
             cachekey = "%s-%s" % (key, category)
             self._cache.pop(cachekey, None)
         else:
-            [self._cache.pop(key, None) for key in self._cache if key.endswith(catkey)]
-        # mark that the category cache is no longer up-to-date
+            [self._cache.pop(key, None) for key in list(self._cache) if key.endswith(catkey)]
+        # mark that the category cache is no longer up-to-date. A complete
+        # cache stays complete, since only the removed tags left it.
         self._catcache.pop(catkey, None)
-        self._cache_complete = False
 
     def reset_cache(self):
         """
@@ -231,6 +236,85 @@ class TagHandler(object):
         self._cache = {}
         self._catcache = {}
 
+    @classmethod
+    def prefetch(cls, objs, keys=None, category=None):
+        """
+        Load the Tags of many objects into their handler caches using
+        a single database query.
+
+        Args:
+            objs (Object or list): Typeclassed entities to load Tags for. One
+                query is made per database model.
+            keys (str or list, optional): Only load Tags with these keys. Keys
+                not found are cached as missing.
+            category (str, optional): Only load Tags of this category. If `keys`
+                are given, this is the category of those keys.
+
+        Notes:
+            If neither `keys` nor `category` are given, all Tags of the
+            objects are loaded and their caches are marked as complete.
+            Objects for which this was already done are skipped.
+
+        """
+        if not _TYPECLASS_AGGRESSIVE_CACHE:
+            return
+        keys = [key.strip().lower() for key in make_iter(keys)] if keys else None
+        category = category.strip().lower() if category else None
+        catkey = "-%s" % category
+        handlers = defaultdict(dict)
+        for obj in make_iter(objs):
+            if not (obj and obj.pk):
+                continue
+            handler = getattr(obj, cls._handlername)
+            if handler._cache_complete or (not keys and category and catkey in handler._catcache):
+                continue
+            handlers[handler._model][handler._objid] = handler
+        for model, model_handlers in handlers.items():
+            cls._prefetch_model(model, model_handlers, keys, category)
+
+    @classmethod
+    def _prefetch_model(cls, model, handlers, keys, category):
+        """
+        Helper for `prefetch`, loading the Tags of one database model.
+
+        Args:
+            model (str): The lower-case database model name.
+            handlers (dict): The handlers to fill, keyed on object id.
+            keys (list or None): Cleaned keys to load.
+            category (str or None): Cleaned category to load.
+
+        """
+        catkey = "-%s" % category
+        handler = next(iter(handlers.values()))
+        query = {"%s__id__in" % model: list(handlers),
+                 "tag__db_model": model,
+                 "tag__db_tagtype": cls._tagtype}
+        if keys:
+            query["tag__db_key__in"] = keys
+        if keys or category:
+            query["tag__db_category__iexact"] = category
+        conns = getattr(handler.obj, cls._m2m_fieldname).through.objects.filter(
+            **query).select_related("tag")
+        found = defaultdict(dict)
+        objid_field = "%s_id" % model
+        for conn in conns:
+            tag = conn.tag
+            found[getattr(conn, objid_field)]["%s-%s" % (
+                to_str(tag.db_key).lower(),
+                tag.db_category.lower() if tag.db_category else None)] = tag
+        for objid, handler in handlers.items():
+            tags = found.get(objid, {})
+            if keys:
+                for key in keys:
+                    cachekey = "%s-%s" % (key, category)
+                    handler._cache[cachekey] = tags.get(cachekey)
+            elif category:
+                handler._cache.update(tags)
+                handler._catcache[catkey] = True
+            else:
+                handler._cache = tags
+                handler._cache_complete = True
+
     def add(self, tag=None, category=None, data=None):
         """
         Add a new tag to the handler.
@@ -266,6 +350,7 @@ class TagHandler(object):
                                                            tagtype=self._tagtype)
             getattr(self.obj, self._m2m_fieldname).add(tagobj)
             self._setcache(tagstr, category, tagobj)
+        bump_lock_version(self.obj)
 
     def get(self, key=None, default=None, category=None, return_tagobj=False, return_list=False):
         """
@@ -324,6 +409,7 @@ class TagHandler(object):
             if tagobj:
                 getattr(self.obj, self._m2m_fieldname).remove(tagobj[0])
             self._delcache(key, category)
+        bump_lock_version(self.obj)
 
     def clear(self, category=None):
         """
@@ -344,6 +430,7 @@ class TagHandler(object):
         self._cache = {}
         self._catcache = {}
         self._cache_complete = False
+        bump_lock_version(self.obj)
 
     def all(self, return_key_and_category=False, return_objs=False):
         """
@@ -414,6 +501,31 @@ class AliasHandler(TagHandler):
 
     """
     _tagtype = "alias"
+    _handlername = "aliases"
+
+    def _update_search_index(self):
+        """
+        Let the object update its search index entry, if it has one.
+
+        """
+        update = getattr(self.obj, "_update_search_index", None)
+        if update:
+            update()
+
+    def add(self, *args, **kwargs):
+        "Add aliases. See `TagHandler.add`."
+        super(AliasHandler, self).add(*args, **kwargs)
+        self._update_search_index()
+
+    def remove(self, *args, **kwargs):
+        "Remove aliases. See `TagHandler.remove`."
+        super(AliasHandler, self).remove(*args, **kwargs)
+        self._update_search_index()
+
+    def clear(self, *args, **kwargs):
+        "Remove all aliases. See `TagHandler.clear`."
+        super(AliasHandler, self).clear(*args, **kwargs)
+        self._update_search_index()
 
 
 class PermissionHandler(TagHandler):
@@ -422,3 +534,4 @@ class PermissionHandler(TagHandler):
 
     """
     _tagtype = "permission"
+    _handlername = "permissions"
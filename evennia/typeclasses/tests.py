@@ -3,6 +3,11 @@ Unit tests for typeclass base system
 
 """
 
+from mock import patch
+from evennia.typeclasses.attributes import AttributeHandler
+from evennia.typeclasses.tags import TagHandler
+from evennia.utils import dbserialize
+from evennia.utils.dbserialize import from_pickle, get_deferred_save
 from evennia.utils.test_resources import EvenniaTest
 
 # ------------------------------------------------------------
@@ -57,3 +62,128 @@ class TestTypedObjectManager(EvenniaTest):
         self.assertEquals(self._manager("get_by_tag", category=["category1", "category2"]),
                           [self.obj2])
         self.assertEquals(self._manager("get_by_tag", category=["category5", "category4"]), [])
+
+
+# ------------------------------------------------------------
+# Handler tests
+# ------------------------------------------------------------
+
+
+class TestHandlerPrefetch(EvenniaTest):
+    def setUp(self):
+        super(TestHandlerPrefetch, self).setUp()
+        self.obj1.attributes.add("attr1", 1)
+        self.obj1.attributes.add("attr2", 2, category="cat1")
+        self.obj2.attributes.add("attr1", 3)
+        self.obj1.tags.add("tag1")
+        self.obj2.tags.add("tag2", "cat1")
+        self.objs = [self.obj1, self.obj2]
+        for obj in self.objs:
+            obj.attributes.reset_cache()
+            obj.tags.reset_cache()
+
+    def test_prefetch_attributes(self):
+        with self.assertNumQueries(1):
+            AttributeHandler.prefetch(self.objs)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.obj1.attributes.get("attr1"), 1)
+            self.assertEqual(self.obj1.attributes.get("attr2", category="cat1"), 2)
+            self.assertEqual(self.obj2.attributes.get("attr1"), 3)
+            self.assertEqual(self.obj2.attributes.get("attr2"), None)
+            self.assertEqual(self.obj1.attributes.get(category="cat1", return_list=True), [2])
+            # already cached
+            AttributeHandler.prefetch(self.objs)
+
+    def test_prefetch_attribute_keys(self):
+        with self.assertNumQueries(1):
+            AttributeHandler.prefetch(self.objs, keys=["attr1", "missing"])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.obj1.attributes.get("attr1"), 1)
+            self.assertEqual(self.obj2.attributes.get("missing"), None)
+        self.assertEqual(self.obj1.attributes.get("attr2", category="cat1"), 2)
+
+    def test_prefetch_tags(self):
+        with self.assertNumQueries(1):
+            TagHandler.prefetch(self.objs)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.obj1.tags.get("tag1"), "tag1")
+            self.assertEqual(self.obj1.tags.get("tag2"), None)
+            self.assertEqual(self.obj2.tags.get("tag2", category="cat1"), "tag2")
+            self.assertEqual(self.obj2.tags.get(category="cat1"), "tag2")
+
+    def test_prefetch_tag_category(self):
+        with self.assertNumQueries(1):
+            TagHandler.prefetch(self.objs, category="cat1")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.obj2.tags.get(category="cat1"), "tag2")
+            self.assertEqual(self.obj1.tags.get(category="cat1"), None)
+
+    def test_prefetch_complete_cache(self):
+        AttributeHandler.prefetch(self.objs)
+        TagHandler.prefetch(self.objs)
+        self.obj1.attributes.add("attr3", 4)
+        self.obj1.attributes.remove("attr1")
+        self.obj1.tags.add("tag3")
+        self.obj1.tags.remove("tag1")
+        # adding and removing keeps the caches complete
+        with self.assertNumQueries(0):
+            AttributeHandler.prefetch(self.objs)
+            TagHandler.prefetch(self.objs)
+            self.assertEqual(self.obj1.attributes.get("attr1"), None)
+            self.assertEqual(self.obj1.attributes.get("attr3"), 4)
+            self.assertEqual([attr.key for attr in self.obj1.attributes.all()], ["attr2", "attr3"])
+            self.assertEqual(self.obj1.tags.all(), ["tag3"])
+
+    def test_contents_prefetch(self):
+        with patch.object(AttributeHandler, "prefetch") as mock_prefetch:
+            self.room1.contents_cache.init()
+            self.assertFalse(mock_prefetch.called)
+            contents = self.room1.contents
+            mock_prefetch.assert_called_once_with(contents)
+            # a direct db_location save re-inits all cached contents, without prefetching
+            self.obj1.db_location = self.room2
+            self.obj1.save(update_fields=["db_location"])
+            self.assertEqual(mock_prefetch.call_count, 1)
+
+
+
+class TestAttributeBatch(EvenniaTest):
+    def test_batch(self):
+        self.obj1.db.stats = {"hp": 10, "mana": 5}
+        self.obj1.db.inventory = []
+        attr = self.obj1.attributes.get("stats", return_obj=True)
+        with self.obj1.attributes.batch():
+            with self.assertNumQueries(0):
+                self.obj1.db.stats["hp"] -= 1
+                self.obj1.db.stats["mana"] -= 1
+                self.obj1.db.inventory.append(1)
+                with self.obj1.attributes.batch():
+                    self.obj1.db.stats["hp"] -= 1
+            # reads see the unsaved changes
+            self.assertEqual(self.obj1.db.stats, {"hp": 8, "mana": 4})
+            self.assertEqual(self.obj1.db.inventory, [1])
+            # only saved when the outermost block ends
+            self.assertEqual(from_pickle(attr.db_value), {"hp": 10, "mana": 5})
+        self.assertEqual(get_deferred_save(attr), None)
+        self.assertEqual(from_pickle(attr.db_value), {"hp": 8, "mana": 4})
+        self.assertEqual(self.obj1.db.inventory, [1])
+
+    def test_batch_waiting(self):
+        self.obj1.db.stats = {"hp": 10}
+        attr = self.obj1.attributes.get("stats", return_obj=True)
+        with self.obj1.attributes.batch():
+            self.obj1.db.stats["hp"] = 5
+            # the timer flush runs if the block waits on the reactor
+            self.assertTrue(dbserialize._FLUSH_CALL.active())
+            dbserialize.flush_deferred_saves()
+            self.assertEqual(from_pickle(attr.db_value), {"hp": 5})
+            self.obj1.db.stats["hp"] = 1
+        self.assertEqual(from_pickle(attr.db_value), {"hp": 1})
+
+    def test_batch_replaced_value(self):
+        self.obj1.db.stats = {"hp": 10}
+        with self.obj1.attributes.batch():
+            self.obj1.db.stats["hp"] = 5
+            self.obj1.db.stats = {"hp": 1}
+            self.assertEqual(self.obj1.db.stats, {"hp": 1})
+        self.assertEqual(self.obj1.db.stats, {"hp": 1})
@@ -16,14 +16,15 @@ the ansi mapping.
 from builtins import object, range
 
 import re
-from collections import OrderedDict
+from array import array
+from bisect import bisect_left, bisect_right
 
 from django.conf import settings
 
 from evennia.utils import utils
 from evennia.utils import logger
 
-from evennia.utils.utils import to_str, to_unicode
+from evennia.utils.utils import to_str
 from future.utils import with_metaclass
 
 
@@ -71,11 +72,39 @@ ANSI_SPACE = " "
 # Escapes
 ANSI_ESCAPES = ("{{", "\\\\", "\|\|")
 
-_PARSE_CACHE = OrderedDict()
+# token lists of parsed strings, see ANSIParser.tokenize
 _PARSE_CACHE_SIZE = 10000
+_PARSE_CACHE = utils.LRUCache(_PARSE_CACHE_SIZE)
 
 _COLOR_NO_DEFAULT = settings.COLOR_NO_DEFAULT
 
+_RE_SPECIAL_CHARS = "()[.^$*+?|"
+
+
+def _first_chars(regexes):
+    """
+    Find the characters the given regexes must start with. This lets
+    the regex engine skip ahead to possible markup quickly.
+
+    Args:
+        regexes (list): Regex strings.
+
+    Returns:
+        charset (str or None): A regex charset matching the first
+            characters, or `None` if this can't be told for all the
+            regexes.
+
+    """
+    chars = set()
+    for regex in regexes:
+        if regex[:1] == "\\" and not regex[1:2].isalnum():
+            chars.add(regex[1:2])
+        elif regex[:1] and regex[0] not in _RE_SPECIAL_CHARS:
+            chars.add(regex[0])
+        else:
+            return None
+    return "[%s]" % "".join(re.escape(char) for char in sorted(chars))
+
 
 class ANSIParser(object):
     """
@@ -208,6 +237,25 @@ class ANSIParser(object):
     # instance of each
     ansi_escapes = re.compile(r"(%s)" % "|".join(ANSI_ESCAPES), re.DOTALL)
 
+    # all markup in one regex, used by the tokenizer. Where several
+    # kinds of markup start at the same place, the first group wins.
+    markup_regex = r"|".join([r"(?P<%s>%s)" % (kind, regex) for kind, regex in (
+        ("escape", r"|".join(ANSI_ESCAPES)),
+        ("brightbg", brightbg_sub.pattern),
+        ("fg", xterm256_fg_sub.pattern),
+        ("bg", xterm256_bg_sub.pattern),
+        ("gfg", xterm256_gfg_sub.pattern),
+        ("gbg", xterm256_gbg_sub.pattern),
+        ("ansi", ansi_sub.pattern)) if regex])
+    markup_start = _first_chars(list(ANSI_ESCAPES) + xterm256_fg + xterm256_bg +
+                                xterm256_gfg + xterm256_gbg +
+                                [re.escape(tup[0]) for tup in ansi_map + ansi_xterm256_bright_bg_map])
+    if markup_start:
+        markup_regex = r"(?=%s)(?:%s)" % (markup_start, markup_regex)
+    markup_regex = re.compile(markup_regex, re.DOTALL)
+    xterm256_subs = {"fg": xterm256_fg_sub, "bg": xterm256_bg_sub,
+                     "gfg": xterm256_gfg_sub, "gbg": xterm256_gbg_sub}
+
     def sub_ansi(self, ansimatch):
         """
         Replacer used by `re.sub` to replace ANSI
@@ -408,55 +456,105 @@ class ANSIParser(object):
         if not string:
             return ''
 
-        # check cached parsings
-        global _PARSE_CACHE
-        cachekey = "%s-%s-%s-%s" % (string, strip_ansi, xterm256, mxp)
-        if cachekey in _PARSE_CACHE:
-            return _PARSE_CACHE[cachekey]
+        parsed_string = self.render(self.tokenize(string), xterm256=xterm256)
+
+        if not mxp and "|lc" in parsed_string:
+            parsed_string = self.strip_mxp(parsed_string)
+
+        if strip_ansi and "\033" in parsed_string:
+            # remove all ansi codes (including those manually
+            # inserted in string)
+            parsed_string = self.strip_raw_codes(parsed_string)
 
-        # pre-convert bright colors to xterm256 color tags
-        string = self.brightbg_sub.sub(self.sub_brightbg, string)
+        return parsed_string
 
-        def do_xterm256_fg(part):
-            return self.sub_xterm256(part, xterm256, "fg")
+    def tokenize(self, string):
+        """
+        Split a string into a list of tokens, in a single pass over the
+        string. The markup is resolved so the tokens can be rendered for
+        any client without looking at the string again. Token lists are
+        cached by string.
 
-        def do_xterm256_bg(part):
-            return self.sub_xterm256(part, xterm256, "bg")
+        Args:
+            string (str): The string to tokenize.
 
-        def do_xterm256_gfg(part):
-            return self.sub_xterm256(part, xterm256, "gfg")
+        Returns:
+            tokens (list): The tokens, to be passed to `render`. Each
+                token is either a `str` (text and the ANSI sequences
+                that are the same for all clients) or a tuple
+                `(ansi, xterm256)` with the sequence to use for
+                16-color and xterm256 clients respectively.
 
-        def do_xterm256_gbg(part):
-            return self.sub_xterm256(part, xterm256, "gbg")
+        """
+        string = utils.to_str(string)
+        tokens = _PARSE_CACHE.get(string)
+        if tokens is None:
+            tokens = self._tokenize(string)
+            _PARSE_CACHE.set(string, tokens)
+        return tokens
 
-        in_string = utils.to_str(string)
+    def _tokenize(self, string):
+        """
+        Tokenize a string without using the cache.
 
-        # do string replacement
-        parsed_string = []
-        parts = self.ansi_escapes.split(in_string) + [" "]
-        for part, sep in zip(parts[::2], parts[1::2]):
-            pstring = self.xterm256_fg_sub.sub(do_xterm256_fg, part)
-            pstring = self.xterm256_bg_sub.sub(do_xterm256_bg, pstring)
-            pstring = self.xterm256_gfg_sub.sub(do_xterm256_gfg, pstring)
-            pstring = self.xterm256_gbg_sub.sub(do_xterm256_gbg, pstring)
-            pstring = self.ansi_sub.sub(self.sub_ansi, pstring)
-            parsed_string.append("%s%s" % (pstring, sep[0].strip()))
-        parsed_string = "".join(parsed_string)
+        Args:
+            string (str): The string to tokenize.
 
-        if not mxp:
-            parsed_string = self.strip_mxp(parsed_string)
+        Returns:
+            tokens (list): The tokens.
+
+        """
+        tokens = []
+        text = []
+        pos = 0
+        ansi_map_get = self.ansi_map_dict.get
+        for match in self.markup_regex.finditer(string):
+            text.append(string[pos:match.start()])
+            pos = match.end()
+            kind = match.lastgroup
+            markup = match.group()
+            if kind == "ansi":
+                text.append(ansi_map_get(markup, ""))
+            elif kind == "escape":
+                text.append(markup[0])
+            elif kind == "brightbg":
+                # bright backgrounds are given as other markup
+                for token in self._tokenize(self.ansi_xterm256_bright_bg_map_dict.get(markup, "")):
+                    if isinstance(token, tuple):
+                        tokens.extend(("".join(text), token))
+                        text = []
+                    else:
+                        text.append(token)
+            else:
+                # xterm256 color; re-match to get the groups of its own pattern
+                rgbmatch = self.xterm256_subs[kind].match(markup)
+                tokens.extend(("".join(text), (self.sub_xterm256(rgbmatch, False, kind),
+                                                 self.sub_xterm256(rgbmatch, True, kind))))
+                text = []
+        text.append(string[pos:])
+        tokens.append("".join(text))
+        return [token for token in tokens if token]
 
-        if strip_ansi:
-            # remove all ansi codes (including those manually
-            # inserted in string)
-            return self.strip_raw_codes(parsed_string)
+    def render(self, tokens, xterm256=False):
+        """
+        Render a list of tokens from `tokenize` to a string.
 
-        # cache and crop old cache
-        _PARSE_CACHE[cachekey] = parsed_string
-        if len(_PARSE_CACHE) > _PARSE_CACHE_SIZE:
-            _PARSE_CACHE.popitem(last=False)
+        Args:
+            tokens (list): The tokens to render.
+            xterm256 (bool, optional): If the client supports xterm256
+                colors. If not, these are converted to 16-color ANSI.
 
-        return parsed_string
+        Returns:
+            string (str): The rendered string. This still contains any
+                MXP markup and the ANSI sequences, use `strip_mxp` and
+                `strip_raw_codes` to remove them.
+
+        """
+        if len(tokens) == 1 and not isinstance(tokens[0], tuple):
+            return tokens[0]
+        index = 1 if xterm256 else 0
+        return "".join([token[index] if isinstance(token, tuple) else token
+                        for token in tokens])
 
 
 ANSI_PARSER = ANSIParser()
@@ -670,7 +768,8 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
 
         Internally, ANSIString can also passes itself precached code/character
         indexes and clean strings to avoid doing extra work when combining
-        ANSIStrings.
+        ANSIStrings. The clean string can be given without the indexes; these
+        are then found from the raw string if they are needed.
 
         """
         string = args[0]
@@ -681,25 +780,25 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         code_indexes = kwargs.pop('code_indexes', None)
         char_indexes = kwargs.pop('char_indexes', None)
         clean_string = kwargs.pop('clean_string', None)
-        # All True, or All False, not just one.
-        checks = [x is None for x in [code_indexes, char_indexes, clean_string]]
-        if not len(set(checks)) == 1:
-            raise ValueError("You must specify code_indexes, char_indexes, "
-                             "and clean_string together, or not at all.")
-        if not all(checks):
+        if (code_indexes is None) != (char_indexes is None) or (
+                code_indexes is not None and clean_string is None):
+            raise ValueError("You must specify code_indexes and char_indexes "
+                             "together, and only with clean_string.")
+        if clean_string is not None:
             decoded = True
         if not decoded:
-            # Completely new ANSI String
-            clean_string = to_unicode(parser.parse_ansi(string, strip_ansi=True, mxp=True))
+            # Completely new ANSI String. The clean string is the same
+            # whether xterm256 colors are used or not.
             string = parser.parse_ansi(string, xterm256=True, mxp=True)
+            clean_string = parser.strip_raw_codes(string)
         elif clean_string is not None:
             # We have an explicit clean string.
             pass
         elif hasattr(string, '_clean_string'):
             # It's already an ANSIString
             clean_string = string._clean_string
-            code_indexes = string._code_indexes
-            char_indexes = string._char_indexes
+            code_indexes = string._lazy_code_indexes
+            char_indexes = string._lazy_char_indexes
             string = string._raw_string
         else:
             # It's a string that has been pre-ansi decoded.
@@ -707,12 +806,17 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
 
         if not isinstance(string, unicode):
             string = string.decode('utf-8')
+        if not isinstance(clean_string, unicode):
+            clean_string = clean_string.decode('utf-8')
 
-        ansi_string = super(ANSIString, cls).__new__(ANSIString, to_str(clean_string), "utf-8")
+        ansi_string = super(ANSIString, cls).__new__(ANSIString, clean_string)
         ansi_string._raw_string = string
         ansi_string._clean_string = clean_string
-        ansi_string._code_indexes = code_indexes
-        ansi_string._char_indexes = char_indexes
+        if code_indexes is not None and not isinstance(code_indexes, array):
+            code_indexes = array('i', code_indexes)
+            char_indexes = array('i', char_indexes)
+        ansi_string._lazy_code_indexes = code_indexes
+        ansi_string._lazy_char_indexes = char_indexes
         return ansi_string
 
     def __str__(self):
@@ -760,13 +864,32 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
 
         Finally, _code_indexes and _char_indexes are defined. These are lookup
         tables for which characters in the raw string are related to ANSI
-        escapes, and which are for the readable text.
+        escapes, and which are for the readable text. They are only needed
+        for slicing and indexing, so they are not found until first used.
 
         """
         self.parser = kwargs.pop('parser', ANSI_PARSER)
         super(ANSIString, self).__init__()
-        if self._code_indexes is None:
-            self._code_indexes, self._char_indexes = self._get_indexes()
+
+    @property
+    def _code_indexes(self):
+        """
+        The (sorted) indexes of the raw string holding ANSI escapes.
+
+        """
+        if self._lazy_code_indexes is None:
+            self._lazy_code_indexes, self._lazy_char_indexes = self._get_indexes()
+        return self._lazy_code_indexes
+
+    @property
+    def _char_indexes(self):
+        """
+        The (sorted) indexes of the raw string holding readable characters.
+
+        """
+        if self._lazy_char_indexes is None:
+            self._lazy_code_indexes, self._lazy_char_indexes = self._get_indexes()
+        return self._lazy_char_indexes
 
     @staticmethod
     def _shifter(iterable, offset):
@@ -775,7 +898,7 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         by a number.
 
         """
-        return [i + offset for i in iterable]
+        return array('i', [i + offset for i in iterable])
 
     @classmethod
     def _adder(cls, first, second):
@@ -786,12 +909,13 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
 
         raw_string = first._raw_string + second._raw_string
         clean_string = first._clean_string + second._clean_string
-        code_indexes = first._code_indexes[:]
-        char_indexes = first._char_indexes[:]
-        code_indexes.extend(
-            cls._shifter(second._code_indexes, len(first._raw_string)))
-        char_indexes.extend(
-            cls._shifter(second._char_indexes, len(first._raw_string)))
+        if first._lazy_code_indexes is None or second._lazy_code_indexes is None:
+            # leave it to the new string to find its indexes, if it needs them
+            return ANSIString(raw_string, clean_string=clean_string)
+        code_indexes = first._code_indexes + cls._shifter(second._code_indexes,
+                                                          len(first._raw_string))
+        char_indexes = first._char_indexes + cls._shifter(second._char_indexes,
+                                                          len(first._raw_string))
         return ANSIString(raw_string, code_indexes=code_indexes,
                           char_indexes=char_indexes,
                           clean_string=clean_string)
@@ -844,7 +968,8 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         replayed.
 
         """
-        slice_indexes = self._char_indexes[slc]
+        char_indexes = self._char_indexes
+        slice_indexes = char_indexes[slc]
         # If it's the end of the string, we need to append final color codes.
         if not slice_indexes:
             return ANSIString('')
@@ -852,21 +977,20 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
             string = self[slc.start]._raw_string
         except IndexError:
             return ANSIString('')
+        raw = self._raw_string
         last_mark = slice_indexes[0]
-        # Check between the slice intervals for escape sequences.
-        i = None
-        for i in slice_indexes[1:]:
-            for index in range(last_mark, i):
-                if index in self._code_indexes:
-                    string += self._raw_string[index]
-            last_mark = i
-            try:
-                string += self._raw_string[i]
-            except IndexError:
-                # raw_string not long enough
-                pass
-        if i is not None:
-            append_tail = self._get_interleving(self._char_indexes.index(i) + 1)
+        i = slice_indexes[-1]
+        if slc.step in (None, 1):
+            # a continuous slice; all between its first and last
+            # character is either text or escapes to keep
+            string += raw[last_mark + 1:i + 1]
+        else:
+            # Check between the slice intervals for escape sequences.
+            for i in slice_indexes[1:]:
+                string += self._get_codes(last_mark + 1, i) + raw[i]
+                last_mark = i
+        if len(slice_indexes) > 1:
+            append_tail = self._get_interleving(bisect_left(char_indexes, i) + 1)
         else:
             append_tail = ''
         return ANSIString(string + append_tail, decoded=True)
@@ -882,24 +1006,22 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         if isinstance(item, slice):
             # Slices must be handled specially.
             return self._slice(item)
+        char_indexes = self._char_indexes
         try:
-            self._char_indexes[item]
+            char_indexes[item]
         except IndexError:
             raise IndexError("ANSIString Index out of range")
         # Get character codes after the index as well.
-        if self._char_indexes[-1] == self._char_indexes[item]:
+        if char_indexes[-1] == char_indexes[item]:
             append_tail = self._get_interleving(item + 1)
         else:
             append_tail = ''
-        item = self._char_indexes[item]
+        item = char_indexes[item]
 
         clean = self._raw_string[item]
-        result = ''
         # Get the character they're after, and replay all escape sequences
         # previous to it.
-        for index in range(0, item + 1):
-            if index in self._code_indexes:
-                result += self._raw_string[index]
+        result = self._get_codes(0, item)
         return ANSIString(result + clean + append_tail, decoded=True)
 
     def clean(self):
@@ -974,36 +1096,51 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
 
         """
 
-        code_indexes = []
+        code_indexes = array('i')
+        char_indexes = array('i')
+        # all indexes not occupied by ansi codes are normal characters
+        end = 0
         for match in self.parser.ansi_regex.finditer(self._raw_string):
+            char_indexes.extend(range(end, match.start()))
             code_indexes.extend(range(match.start(), match.end()))
-        if not code_indexes:
-            # Plain string, no ANSI codes.
-            return code_indexes, list(range(0, len(self._raw_string)))
-        # all indexes not occupied by ansi codes are normal characters
-        char_indexes = [i for i in range(len(self._raw_string)) if i not in code_indexes]
+            end = match.end()
+        char_indexes.extend(range(end, len(self._raw_string)))
         return code_indexes, char_indexes
 
+    def _get_codes(self, start, end):
+        """
+        Get the code characters of the raw string between two indexes.
+
+        Args:
+            start (int): The raw string index to start from.
+            end (int): The raw string index to stop before.
+
+        Returns:
+            codes (unicode): The code characters, in order.
+
+        """
+        code_indexes = self._code_indexes
+        raw = self._raw_string
+        return u"".join([raw[index] for index in
+                         code_indexes[bisect_left(code_indexes, start):
+                                      bisect_left(code_indexes, end)]])
+
     def _get_interleving(self, index):
         """
         Get the code characters from the given slice end to the next
         character.
 
         """
-        try:
-            index = self._char_indexes[index - 1]
-        except IndexError:
+        char_indexes = self._char_indexes
+        nchars = len(char_indexes)
+        index -= 1
+        if index < 0:
+            index += nchars
+        if not 0 <= index < nchars:
             return ''
-        s = ''
-        while True:
-            index += 1
-            if index in self._char_indexes:
-                break
-            elif index in self._code_indexes:
-                s += self._raw_string[index]
-            else:
-                break
-        return s
+        # all between two characters are codes
+        end = char_indexes[index + 1] if index + 1 < nchars else len(self._raw_string)
+        return self._raw_string[char_indexes[index] + 1:end]
 
     def __mul__(self, other):
         """
@@ -1012,18 +1149,7 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         """
         if not isinstance(other, int):
             return NotImplemented
-        raw_string = self._raw_string * other
-        clean_string = self._clean_string * other
-        code_indexes = self._code_indexes[:]
-        char_indexes = self._char_indexes[:]
-        for i in range(1, other + 1):
-            code_indexes.extend(
-                self._shifter(self._code_indexes, i * len(self._raw_string)))
-            char_indexes.extend(
-                self._shifter(self._char_indexes, i * len(self._raw_string)))
-        return ANSIString(
-            raw_string, code_indexes=code_indexes, char_indexes=char_indexes,
-            clean_string=clean_string)
+        return ANSIString(self._raw_string * other, clean_string=self._clean_string * other)
 
     def __rmul__(self, other):
         return self.__mul__(other)
@@ -1272,8 +1398,8 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         if not isinstance(char, ANSIString):
             line = char * amount
             return ANSIString(
-                char * amount, code_indexes=[], char_indexes=list(range(0, len(line))),
-                clean_string=char)
+                line, code_indexes=array('i'), char_indexes=array('i', range(len(line))),
+                clean_string=line)
         try:
             start = char._code_indexes[0]
         except IndexError:
@@ -1282,10 +1408,10 @@ class ANSIString(with_metaclass(ANSIMeta, unicode)):
         prefix = char._raw_string[start:end]
         postfix = char._raw_string[end + 1:]
         line = char._clean_string * amount
-        code_indexes = [i for i in range(0, len(prefix))]
+        code_indexes = array('i', range(len(prefix)))
         length = len(prefix) + len(line)
-        code_indexes.extend([i for i in range(length, length + len(postfix))])
-        char_indexes = self._shifter(range(0, len(line)), len(prefix))
+        code_indexes.extend(range(length, length + len(postfix)))
+        char_indexes = array('i', range(len(prefix), length))
         raw_string = prefix + line + postfix
         return ANSIString(
             raw_string, clean_string=line, char_indexes=char_indexes,
@@ -15,11 +15,13 @@ classes. These are iterables that track their position in a nested
 structure and makes sure to send updates up to their root. This is
 used by Attributes - without it, one would not be able to update mutables
 in-situ, e.g `obj.db.mynestedlist[3][5] = 3` would never be saved and
-be out of sync with the database.
+be out of sync with the database. Saving can be deferred, so that many
+changes to the same Attribute are saved at once, see `deferred_saves`.
 
 """
 from builtins import object, int
 
+from contextlib import contextmanager
 from functools import update_wrapper
 from collections import defaultdict, MutableSequence, MutableSet, MutableMapping
 from collections import OrderedDict, deque
@@ -27,13 +29,14 @@ try:
     from cPickle import dumps, loads
 except ImportError:
     from pickle import dumps, loads
+from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.contenttypes.models import ContentType
 from evennia.utils.utils import to_str, uses_database, is_iter
 from evennia.utils import logger
 
 __all__ = ("to_pickle", "from_pickle", "do_pickle", "do_unpickle",
-           "dbserialize", "dbunserialize")
+           "dbserialize", "dbunserialize", "deferred_saves", "flush_deferred_saves")
 
 PICKLE_PROTOCOL = 2
 
@@ -70,6 +73,15 @@ _TO_MODEL_MAP = None
 _IGNORE_DATETIME_MODELS = None
 _SESSION_HANDLER = None
 
+_WRITE_BEHIND = settings.ATTRIBUTE_WRITE_BEHIND
+_WRITE_BEHIND_DELAY = settings.ATTRIBUTE_WRITE_BEHIND_DELAY
+# Attributes with unsaved in-place changes, {id(attr): (attr, root_mutable)}
+_DEFERRED_SAVES = OrderedDict()
+# how many deferred_saves blocks we are in
+_DEFER_DEPTH = 0
+# the delayed call flushing the write-behind saves
+_FLUSH_CALL = None
+
 
 def _IS_PACKED_DBOBJ(o):
     return isinstance(o, tuple) and len(o) == 4 and o[0] == '__packed_dbobj__'
@@ -174,7 +186,10 @@ class _SaverMutable(object):
                     non_saver_name = cls_name
                 raise ValueError(_ERROR_DELETED_ATTR.format(cls_name=cls_name, obj=self,
                                                             non_saver_name=non_saver_name))
-            self._db_obj.value = self
+            if _DEFER_DEPTH or _WRITE_BEHIND:
+                _defer_save(self._db_obj, self)
+            else:
+                self._db_obj.value = self
         else:
             logger.log_err("_SaverMutable %s has no root Attribute to save to." % self)
 
@@ -389,6 +404,118 @@ def deserialize(obj):
     return _iter(obj)
 
 
+#
+# Deferred saving of _Saver* mutables
+#
+
+
+def _defer_save(db_obj, root):
+    """
+    Mark an Attribute as having unsaved in-place changes.
+
+    Args:
+        db_obj (Attribute): The Attribute to save later.
+        root (_SaverMutable): The root of the changed mutable, which
+            will be saved to the Attribute.
+
+    """
+    global _FLUSH_CALL
+    _DEFERRED_SAVES[id(db_obj)] = (db_obj, root)
+    # the flush is scheduled also inside deferred_saves blocks; a block
+    # that waits on a Deferred should not hold back the saves of others
+    if not (_FLUSH_CALL and _FLUSH_CALL.active()):
+        from twisted.internet import reactor
+        _FLUSH_CALL = reactor.callLater(_WRITE_BEHIND_DELAY, flush_deferred_saves)
+
+
+def get_deferred_save(db_obj):
+    """
+    Get the unsaved value of an Attribute, if any.
+
+    Args:
+        db_obj (Attribute): The Attribute to check.
+
+    Returns:
+        value (_SaverMutable or None): The in-memory value waiting
+            to be saved, or `None` if there are no unsaved changes.
+
+    """
+    if _DEFERRED_SAVES:
+        deferred = _DEFERRED_SAVES.get(id(db_obj))
+        if deferred and deferred[0] is db_obj:
+            return deferred[1]
+    return None
+
+
+def discard_deferred_save(db_obj):
+    """
+    Forget the unsaved changes of an Attribute. This is called when
+    the Attribute is given a new value or is deleted.
+
+    Args:
+        db_obj (Attribute): The Attribute.
+
+    """
+    if _DEFERRED_SAVES:
+        _DEFERRED_SAVES.pop(id(db_obj), None)
+
+
+def flush_deferred_saves():
+    """
+    Save all Attributes with deferred in-place changes to the
+    database. This is called at the end of each Command and by a timer
+    after `ATTRIBUTE_WRITE_BEHIND_DELAY` seconds.
+
+    Notes:
+        This also saves changes made inside `deferred_saves` blocks that
+        have not ended yet, like a block in an `@inlineCallbacks` Command
+        waiting on a Deferred. Such a block can't hold back the saves of
+        the rest of the server that way.
+
+    """
+    global _FLUSH_CALL
+    if _FLUSH_CALL and _FLUSH_CALL.active():
+        _FLUSH_CALL.cancel()
+    _FLUSH_CALL = None
+    while _DEFERRED_SAVES:
+        db_obj, root = _DEFERRED_SAVES.popitem(last=False)[1]
+        if not db_obj.pk:
+            # deleted since it was changed
+            continue
+        try:
+            db_obj.value = root
+        except Exception:
+            logger.log_trace("Could not save deferred changes to Attribute %s." % db_obj)
+
+
+@contextmanager
+def deferred_saves():
+    """
+    Context manager deferring the saving of in-place changes to mutable
+    Attributes until the end of the block. Each changed Attribute is
+    then serialized and saved only once. Blocks can be nested, saving
+    happens when the outermost block ends. If the block yields to the
+    reactor, the changes are saved by the write-behind timer in the
+    meantime, so other code is not kept from saving.
+
+    Examples:
+        ```python
+        with deferred_saves():
+            for key in obj.db.stats:
+                obj.db.stats[key] += 1
+        ```
+
+    """
+    global _DEFER_DEPTH
+    _DEFER_DEPTH += 1
+    try:
+        yield
+    finally:
+        _DEFER_DEPTH -= 1
+        if not _DEFER_DEPTH:
+            flush_deferred_saves()
+
+
 #
 # serialization helpers
 
@@ -503,6 +630,90 @@ def unpack_session(item):
 # Access methods
 
 
+# Types to_pickle/from_pickle return as-is. This is keyed on exact type, so
+# subclasses (which may be database models in disguise) are not included.
+_PRIMITIVE_TYPES = frozenset((str, unicode, type(0), long, float, bool, type(None)))
+
+
+def _is_primitive_seq(items):
+    """
+    Check if an iterable contains only primitive types, meaning
+    it can be copied as a whole without processing each item.
+
+    """
+    return _PRIMITIVE_TYPES.issuperset(map(type, items))
+
+
+def _is_primitive_map(item):
+    """
+    Check if a mapping's keys and values are all of primitive types.
+
+    """
+    return (_PRIMITIVE_TYPES.issuperset(map(type, item.iterkeys())) and
+            _PRIMITIVE_TYPES.issuperset(map(type, item.itervalues())))
+
+
+def _to_pickle_list(item):
+    return list(item) if _is_primitive_seq(item) else [_to_pickle(val) for val in item]
+
+
+def _to_pickle_tuple(item):
+    return item if _is_primitive_seq(item) else tuple(_to_pickle(val) for val in item)
+
+
+def _to_pickle_dict(item):
+    if _is_primitive_map(item):
+        return dict(item)
+    return dict((_to_pickle(key), _to_pickle(val)) for key, val in item.items())
+
+
+def _to_pickle_set(item):
+    return set(item) if _is_primitive_seq(item) else set(_to_pickle(val) for val in item)
+
+
+def _to_pickle_ordereddict(item):
+    if _is_primitive_map(item):
+        return OrderedDict(item)
+    return OrderedDict((_to_pickle(key), _to_pickle(val)) for key, val in item.items())
+
+
+def _to_pickle_deque(item):
+    return deque(item) if _is_primitive_seq(item) else deque(_to_pickle(val) for val in item)
+
+
+_TO_PICKLE_DISPATCH = {
+    tuple: _to_pickle_tuple,
+    list: _to_pickle_list,
+    _SaverList: lambda item: _to_pickle_list(item._data),
+    dict: _to_pickle_dict,
+    _SaverDict: lambda item: _to_pickle_dict(item._data),
+    set: _to_pickle_set,
+    _SaverSet: lambda item: _to_pickle_set(item._data),
+    OrderedDict: _to_pickle_ordereddict,
+    _SaverOrderedDict: lambda item: _to_pickle_ordereddict(item._data),
+    deque: _to_pickle_deque,
+    _SaverDeque: lambda item: _to_pickle_deque(item._data)}
+
+
+def _to_pickle(item):
+    """Recursive processor and identification of data"""
+    dtype = type(item)
+    if dtype in _PRIMITIVE_TYPES:
+        return item
+    process = _TO_PICKLE_DISPATCH.get(dtype)
+    if process:
+        return process(item)
+    elif hasattr(item, '__iter__'):
+        # we try to conserve the iterable class, if not convert to list
+        try:
+            return item.__class__([_to_pickle(val) for val in item])
+        except (AttributeError, TypeError):
+            return [_to_pickle(val) for val in item]
+    elif hasattr(item, "sessid") and hasattr(item, "conn_time"):
+        return pack_session(item)
+    return pack_dbobj(item)
+
+
 def to_pickle(data):
     """
     This prepares data on arbitrary form to be pickled. It handles any
@@ -517,35 +728,139 @@ def to_pickle(data):
     Returns:
         data (any): Pickled data.
 
+    Notes:
+        Containers holding only strings, numbers, booleans and `None`
+        are copied as a whole instead of being processed item by item.
+
     """
-    def process_item(item):
-        """Recursive processor and identification of data"""
-        dtype = type(item)
-        if dtype in (basestring, int, float, bool):
-            return item
-        elif dtype == tuple:
-            return tuple(process_item(val) for val in item)
-        elif dtype in (list, _SaverList):
-            return [process_item(val) for val in item]
-        elif dtype in (dict, _SaverDict):
-            return dict((process_item(key), process_item(val)) for key, val in item.items())
-        elif dtype in (set, _SaverSet):
-            return set(process_item(val) for val in item)
-        elif dtype in (OrderedDict, _SaverOrderedDict):
-            return OrderedDict((process_item(key), process_item(val)) for key, val in item.items())
-        elif dtype in (deque, _SaverDeque):
-            return deque(process_item(val) for val in item)
-
-        elif hasattr(item, '__iter__'):
-            # we try to conserve the iterable class, if not convert to list
-            try:
-                return item.__class__([process_item(val) for val in item])
-            except (AttributeError, TypeError):
-                return [process_item(val) for val in item]
-        elif hasattr(item, "sessid") and hasattr(item, "conn_time"):
-            return pack_session(item)
-        return pack_dbobj(item)
-    return process_item(data)
+    return _to_pickle(data)
+
+
+def _from_pickle_tuple(item):
+    if _IS_PACKED_DBOBJ(item):
+        return unpack_dbobj(item)
+    elif _IS_PACKED_SESSION(item):
+        return unpack_session(item)
+    return item if _is_primitive_seq(item) else tuple(_from_pickle(val) for val in item)
+
+
+def _from_pickle_dict(item):
+    if _is_primitive_map(item):
+        return dict(item)
+    return dict((_from_pickle(key), _from_pickle(val)) for key, val in item.items())
+
+
+def _from_pickle_ordereddict(item):
+    if _is_primitive_map(item):
+        return OrderedDict(item)
+    return OrderedDict((_from_pickle(key), _from_pickle(val)) for key, val in item.items())
+
+
+_FROM_PICKLE_DISPATCH = {
+    tuple: _from_pickle_tuple,
+    list: lambda item: (list(item) if _is_primitive_seq(item) else
+                        [_from_pickle(val) for val in item]),
+    dict: _from_pickle_dict,
+    set: lambda item: (set(item) if _is_primitive_seq(item) else
+                       set(_from_pickle(val) for val in item)),
+    OrderedDict: _from_pickle_ordereddict,
+    deque: lambda item: (deque(item) if _is_primitive_seq(item) else
+                         deque(_from_pickle(val) for val in item))}
+
+
+def _from_pickle(item):
+    """Recursive processor and identification of data"""
+    dtype = type(item)
+    if dtype in _PRIMITIVE_TYPES:
+        return item
+    process = _FROM_PICKLE_DISPATCH.get(dtype)
+    if process:
+        return process(item)
+    elif hasattr(item, '__iter__'):
+        try:
+            # we try to conserve the iterable class if
+            # it accepts an iterator
+            return item.__class__(_from_pickle(val) for val in item)
+        except (AttributeError, TypeError):
+            return [_from_pickle(val) for val in item]
+    return item
+
+
+def _from_pickle_tree_list(item, parent=None, db_obj=None):
+    dat = _SaverList(_parent=parent, _db_obj=db_obj)
+    if _is_primitive_seq(item):
+        dat._data.extend(item)
+    else:
+        dat._data.extend(_from_pickle_tree(val, dat) for val in item)
+    return dat
+
+
+def _from_pickle_tree_dict(item, parent=None, db_obj=None):
+    dat = _SaverDict(_parent=parent, _db_obj=db_obj)
+    if _is_primitive_map(item):
+        dat._data.update(item)
+    else:
+        dat._data.update((_from_pickle(key), _from_pickle_tree(val, dat))
+                         for key, val in item.items())
+    return dat
+
+
+def _from_pickle_tree_set(item, parent=None, db_obj=None):
+    dat = _SaverSet(_parent=parent, _db_obj=db_obj)
+    if _is_primitive_seq(item):
+        dat._data.update(item)
+    else:
+        dat._data.update(_from_pickle_tree(val, dat) for val in item)
+    return dat
+
+
+def _from_pickle_tree_ordereddict(item, parent=None, db_obj=None):
+    dat = _SaverOrderedDict(_parent=parent, _db_obj=db_obj)
+    if _is_primitive_map(item):
+        dat._data.update(item)
+    else:
+        dat._data.update((_from_pickle(key), _from_pickle_tree(val, dat))
+                         for key, val in item.items())
+    return dat
+
+
+def _from_pickle_tree_deque(item, parent=None, db_obj=None):
+    dat = _SaverDeque(_parent=parent, _db_obj=db_obj)
+    dat._data.extend(item if _is_primitive_seq(item) else (_from_pickle(val) for val in item))
+    return dat
+
+
+_FROM_PICKLE_TREE_DISPATCH = {
+    list: _from_pickle_tree_list,
+    dict: _from_pickle_tree_dict,
+    set: _from_pickle_tree_set,
+    OrderedDict: _from_pickle_tree_ordereddict,
+    deque: _from_pickle_tree_deque}
+
+
+def _from_pickle_tree(item, parent):
+    """Recursive processor, building a parent-tree from iterable data"""
+    dtype = type(item)
+    if dtype in _PRIMITIVE_TYPES:
+        return item
+    process = _FROM_PICKLE_TREE_DISPATCH.get(dtype)
+    if process:
+        return process(item, parent=parent)
+    elif dtype is tuple:
+        if _IS_PACKED_DBOBJ(item):
+            return unpack_dbobj(item)
+        elif _IS_PACKED_SESSION(item):
+            return unpack_session(item)
+        return item if _is_primitive_seq(item) else tuple(_from_pickle_tree(val, parent)
+                                                          for val in item)
+    elif hasattr(item, '__iter__'):
+        try:
+            # we try to conserve the iterable class if it
+            # accepts an iterator
+            return item.__class__(_from_pickle_tree(val, parent) for val in item)
+        except (AttributeError, TypeError):
+            return _from_pickle_tree_list(item, parent=parent)
+    return item
 
 
 # @transaction.autocommit
@@ -569,106 +884,18 @@ def from_pickle(data, db_obj=None):
     Returns:
         data (any): Unpickled data.
 
-    """
-    def process_item(item):
-        """Recursive processor and identification of data"""
-        dtype = type(item)
-        if dtype in (basestring, int, float, bool):
-            return item
-        elif _IS_PACKED_DBOBJ(item):
-            # this must be checked before tuple
-            return unpack_dbobj(item)
-        elif _IS_PACKED_SESSION(item):
-            return unpack_session(item)
-        elif dtype == tuple:
-            return tuple(process_item(val) for val in item)
-        elif dtype == dict:
-            return dict((process_item(key), process_item(val)) for key, val in item.items())
-        elif dtype == set:
-            return set(process_item(val) for val in item)
-        elif dtype == OrderedDict:
-            return OrderedDict((process_item(key), process_item(val)) for key, val in item.items())
-        elif dtype == deque:
-            return deque(process_item(val) for val in item)
-        elif hasattr(item, '__iter__'):
-            try:
-                # we try to conserve the iterable class if
-                # it accepts an iterator
-                return item.__class__(process_item(val) for val in item)
-            except (AttributeError, TypeError):
-                return [process_item(val) for val in item]
-        return item
-
-    def process_tree(item, parent):
-        """Recursive processor, building a parent-tree from iterable data"""
-        dtype = type(item)
-        if dtype in (basestring, int, float, bool):
-            return item
-        elif _IS_PACKED_DBOBJ(item):
-            # this must be checked before tuple
-            return unpack_dbobj(item)
-        elif dtype == tuple:
-            return tuple(process_tree(val, item) for val in item)
-        elif dtype == list:
-            dat = _SaverList(_parent=parent)
-            dat._data.extend(process_tree(val, dat) for val in item)
-            return dat
-        elif dtype == dict:
-            dat = _SaverDict(_parent=parent)
-            dat._data.update((process_item(key), process_tree(val, dat))
-                             for key, val in item.items())
-            return dat
-        elif dtype == set:
-            dat = _SaverSet(_parent=parent)
-            dat._data.update(set(process_tree(val, dat) for val in item))
-            return dat
-        elif dtype == OrderedDict:
-            dat = _SaverOrderedDict(_parent=parent)
-            dat._data.update((process_item(key), process_tree(val, dat))
-                             for key, val in item.items())
-            return dat
-        elif dtype == deque:
-            dat = _SaverDeque(_parent=parent)
-            dat._data.extend(process_item(val) for val in item)
-            return dat
-        elif hasattr(item, '__iter__'):
-            try:
-                # we try to conserve the iterable class if it
-                # accepts an iterator
-                return item.__class__(process_tree(val, parent) for val in item)
-            except (AttributeError, TypeError):
-                dat = _SaverList(_parent=parent)
-                dat._data.extend(process_tree(val, dat) for val in item)
-                return dat
-        return item
+    Notes:
+        Containers holding only strings, numbers, booleans and `None`
+        are copied as a whole instead of being processed item by item.
 
+    """
     if db_obj:
         # convert lists, dicts and sets to their Saved* counterparts. It
         # is only relevant if the "root" is an iterable of the right type.
-        dtype = type(data)
-        if dtype == list:
-            dat = _SaverList(_db_obj=db_obj)
-            dat._data.extend(process_tree(val, dat) for val in data)
-            return dat
-        elif dtype == dict:
-            dat = _SaverDict(_db_obj=db_obj)
-            dat._data.update((process_item(key), process_tree(val, dat))
-                             for key, val in data.items())
-            return dat
-        elif dtype == set:
-            dat = _SaverSet(_db_obj=db_obj)
-            dat._data.update(process_tree(val, dat) for val in data)
-            return dat
-        elif dtype == OrderedDict:
-            dat = _SaverOrderedDict(_db_obj=db_obj)
-            dat._data.update((process_item(key), process_tree(val, dat))
-                             for key, val in data.items())
-            return dat
-        elif dtype == deque:
-            dat = _SaverDeque(_db_obj=db_obj)
-            dat._data.extend(process_item(val) for val in data)
-            return dat
-    return process_item(data)
+        process = _FROM_PICKLE_TREE_DISPATCH.get(type(data))
+        if process:
+            return process(data, db_obj=db_obj)
+    return _from_pickle(data)
 
 
 def do_pickle(data):
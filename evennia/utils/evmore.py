@@ -26,8 +26,19 @@ and justify_kwargs are kwargs to pass to utils.utils.justify in order to change
 of the text. The remaining **kwargs will be passed on to the
 caller.msg() construct every time the page is updated.
 
+The text can also be an `EvTable`. Its lines are then only built as
+the pages are shown, so a very large table can be paged without first
+rendering all of it:
+
+    table = EvTable("Name", "Location", table=[names, locations])
+    EvMore(caller, table)
+
+Since the length of the table is not known up front, the pager shows
+the number of the last page as `?` until it has been reached.
+
 """
 from builtins import object, range
+from itertools import islice
 
 from django.conf import settings
 from evennia import Command, CmdSet
@@ -129,7 +140,8 @@ class EvMore(object):
 
         Args:
             caller (Object or Account): Entity reading the text.
-            text (str): The text to put under paging.
+            text (str or EvTable): The text to put under paging. An `EvTable`
+                has its lines built as they are paged to.
             always_page (bool, optional): If `False`, the
                 pager will only kick in if `text` is too big
                 to fit the screen.
@@ -155,6 +167,10 @@ class EvMore(object):
         self._pages = []
         self._npages = []
         self._npos = []
+        # lines not yet put on a page and if all lines have been paged
+        self._lines = iter([])
+        self._complete = True
+        self._height = 1
         self.exit_on_lastpage = exit_on_lastpage
         self.exit_cmd = exit_cmd
         self._exit_msg = "Exited |wmore|n pager."
@@ -171,34 +187,39 @@ class EvMore(object):
         height = max(4, session.protocol_flags.get("SCREENHEIGHT", {0: _SCREEN_HEIGHT})[0] - 4)
         width = session.protocol_flags.get("SCREENWIDTH", {0: _SCREEN_WIDTH})[0]
 
-        if justify_kwargs is False:
-            # no justification. Simple division by line
-            lines = text.split("\n")
+        if hasattr(text, "iter_lines"):
+            # an EvTable, whose lines are built as they are paged to. These
+            # are ANSIStrings, so they are justified by their visible width.
+            lines = text.iter_lines()
         else:
+            lines = iter(text.split("\n"))
+
+        if justify_kwargs is not False:
             # we must break very long lines into multiple ones
             justify_kwargs = justify_kwargs or {}
             width = justify_kwargs.get("width", width)
             justify_kwargs["width"] = width
             justify_kwargs["align"] = justify_kwargs.get("align", 'l')
             justify_kwargs["indent"] = justify_kwargs.get("indent", 0)
-
-            lines = []
-            for line in text.split("\n"):
-                if len(line) > width:
-                    lines.extend(justify(line, **justify_kwargs).split("\n"))
-                else:
-                    lines.append(line)
+            lines = self._justify_lines(lines, justify_kwargs)
+        if hasattr(text, "iter_lines"):
+            lines = (unicode(line) for line in lines)
 
         # always limit number of chars to 10 000 per page
-        height = min(10000 // max(1, width), height)
-
-        self._pages = ["\n".join(lines[i:i + height]) for i in range(0, len(lines), height)]
-        self._npages = len(self._pages)
+        self._height = min(10000 // max(1, width), height)
+        self._lines = lines
+        self._complete = False
         self._npos = 0
 
+        # a table is paged as it is read, but of a text we already have
+        # all lines. We need at least one page ahead, to know if paging is needed.
+        self._read_pages(2 if hasattr(text, "iter_lines") else None)
+
         if self._npages <= 1 and not always_page:
-            # no need for paging; just pass-through.
-            caller.msg(text=text, session=self._session, **kwargs)
+            # no need for paging; just pass-through. A table is already
+            # fully rendered on its one page.
+            caller.msg(text=self._pages[0] if hasattr(text, "iter_lines") else text,
+                       session=self._session, **kwargs)
         else:
             # go into paging mode
             # first pass on the msg kwargs
@@ -208,16 +229,59 @@ class EvMore(object):
             # goto top of the text
             self.page_top()
 
+    def _justify_lines(self, lines, justify_kwargs):
+        """
+        Justify lines too long for the screen.
+
+        Args:
+            lines (iterable): The lines of text.
+            justify_kwargs (dict): Keyword arguments to `utils.justify`.
+
+        Yields:
+            line (str): The next line, fitting the screen.
+
+        """
+        width = justify_kwargs["width"]
+        for line in lines:
+            if len(line) > width:
+                for justified_line in justify(line, **justify_kwargs).split("\n"):
+                    yield justified_line
+            else:
+                yield line
+
+    def _read_pages(self, npages=None):
+        """
+        Put lines on pages until there are `npages` pages or all lines
+        have been paged.
+
+        Args:
+            npages (int, optional): The number of pages wanted. If not
+                given, all lines are paged.
+
+        """
+        while not self._complete and (npages is None or len(self._pages) < npages):
+            lines = list(islice(self._lines, self._height))
+            if lines:
+                self._pages.append("\n".join(lines))
+            if len(lines) < self._height:
+                self._complete = True
+                if not self._pages:
+                    # an empty table
+                    self._pages.append("")
+        self._npages = len(self._pages)
+
     def display(self, show_footer=True):
         """
         Pretty-print the page.
         """
         pos = self._pos
+        # read a page ahead, to know if this is the last page
+        self._read_pages(pos + 2)
         text = self._pages[pos]
         if show_footer:
             page = _DISPLAY.format(text=text,
                                    pageno=pos + 1,
-                                   pagemax=self._npages)
+                                   pagemax=self._npages if self._complete else "?")
         else:
             page = text
         # check to make sure our session is still valid
@@ -241,6 +305,7 @@ class EvMore(object):
         """
         Display the bottom page.
         """
+        self._read_pages()
         self._pos = self._npages - 1
         self.display()
 
@@ -254,6 +319,7 @@ class EvMore(object):
             self.page_quit()
         else:
             self._pos += 1
+            self._read_pages(self._pos + 2)
             if self.exit_on_lastpage and self._pos >= (self._npages - 1):
                 self.display(show_footer=False)
                 self.page_quit(quiet=True)
@@ -120,12 +120,15 @@ from future.utils import listitems
 
 from django.conf import settings
 from textwrap import TextWrapper
-from copy import deepcopy, copy
-from evennia.utils.utils import to_unicode, m_len
+from copy import copy
+from evennia.utils.utils import to_unicode, m_len, LRUCache
 from evennia.utils.ansi import ANSIString
 
 _DEFAULT_WIDTH = settings.CLIENT_DEFAULT_WIDTH
 
+# cell borders, which are mostly the same for all cells of a table
+_BORDER_CACHE = LRUCache(500)
+
 
 def _to_ansi(obj):
     """
@@ -443,6 +446,9 @@ class EvCell(object):
         self.trim_horizontal = 0
         self.trim_vertical = 0
 
+        # (data, width, lines) of the last wrapping of the data
+        self._wrapped = None
+
         # width/height is given without left/right or top/bottom padding
         if "width" in kwargs:
             width = kwargs.pop("width")
@@ -511,16 +517,7 @@ class EvCell(object):
 
 
         """
-        width = self.width
-        adjusted_data = []
-        for line in data:
-            if 0 < width < m_len(line):
-                # replace_whitespace=False, expand_tabs=False is a
-                # fix for ANSIString not supporting expand_tabs/translate
-                adjusted_data.extend([ANSIString(part + ANSIString("|n"))
-                                      for part in wrap(line, width=width, drop_whitespace=False)])
-            else:
-                adjusted_data.append(line)
+        adjusted_data = list(self._wrap(data, self.width))
         if self.enforce_size:
             # don't allow too high cells
             excess = len(adjusted_data) - self.height
@@ -539,6 +536,35 @@ class EvCell(object):
 
         return adjusted_data
 
+    def _wrap(self, data, width):
+        """
+        Wrap too-long lines to fit a width. This is the costly part of
+        formatting a cell, so the result is kept for as long as the
+        data and width stay the same.
+
+        Args:
+            data (list): Lines of text to wrap.
+            width (int): The width to wrap to.
+
+        Returns:
+            lines (list): The wrapped lines. This must not be changed.
+
+        """
+        wrapped = self._wrapped
+        if wrapped and wrapped[0] is data and wrapped[1] == width:
+            return wrapped[2]
+        lines = []
+        for line in data:
+            if 0 < width < m_len(line):
+                # replace_whitespace=False, expand_tabs=False is a
+                # fix for ANSIString not supporting expand_tabs/translate
+                lines.extend([ANSIString(part + ANSIString("|n"))
+                              for part in wrap(line, width=width, drop_whitespace=False)])
+            else:
+                lines.append(line)
+        self._wrapped = (data, width, lines)
+        return lines
+
     def _center(self, text, width, pad_char):
         """
         Horizontally center text on line of certain width, using padding.
@@ -663,22 +689,47 @@ class EvCell(object):
 
         """
 
-        left = self.border_left_char * self.border_left + ANSIString('|n')
-        right = ANSIString('|n') + self.border_right_char * self.border_right
+        left, right, top, bottom = self._border_edges()
+        top = [top for _ in range(self.border_top)]
+        bottom = [bottom for _ in range(self.border_bottom)]
+
+        return top + [left + line + right for line in data] + bottom
+
+    def _border_edges(self):
+        """
+        Build the borders of the cell.
+
+        Returns:
+            left, right, top, bottom (tuple): The left and right borders
+                of each line and the top and bottom border lines.
 
+        """
         cwidth = self.width + self.pad_left + self.pad_right + max(0, self.border_left - 1) + max(0, self.border_right - 1)
+        chars = (self.border_left_char, self.border_right_char,
+                 self.border_top_char, self.border_bottom_char,
+                 self.corner_top_left_char, self.corner_top_right_char,
+                 self.corner_bottom_left_char, self.corner_bottom_right_char)
+        # ANSIStrings compare by their clean string, so the key uses the raw one
+        key = tuple((type(char), getattr(char, "_raw_string", char)) for char in chars) + (
+            self.border_left, self.border_right, cwidth)
+        edges = _BORDER_CACHE.get(key)
+        if edges:
+            return edges
 
-        vfill = self.corner_top_left_char if left else ""
-        vfill += cwidth * self.border_top_char
-        vfill += self.corner_top_right_char if right else ""
-        top = [vfill for _ in range(self.border_top)]
+        left = self.border_left_char * self.border_left + ANSIString('|n')
+        right = ANSIString('|n') + self.border_right_char * self.border_right
 
-        vfill = self.corner_bottom_left_char if left else ""
-        vfill += cwidth * self.border_bottom_char
-        vfill += self.corner_bottom_right_char if right else ""
-        bottom = [vfill for _ in range(self.border_bottom)]
+        top = self.corner_top_left_char if left else ""
+        top += cwidth * self.border_top_char
+        top += self.corner_top_right_char if right else ""
 
-        return top + [left + line + right for line in data] + bottom
+        bottom = self.corner_bottom_left_char if left else ""
+        bottom += cwidth * self.border_bottom_char
+        bottom += self.corner_bottom_right_char if right else ""
+
+        edges = (left, right, top, bottom)
+        _BORDER_CACHE.set(key, edges)
+        return edges
 
     def get_min_height(self):
         """
@@ -704,23 +755,31 @@ class EvCell(object):
 
     def get_height(self):
         """
-        Get natural height of cell, including padding.
+        Get natural height of cell, including padding. This only
+        needs to wrap the data, not to format the cell.
 
         Returns:
             natural_height (int): Height of cell.
 
         """
-        return len(self.formatted)  # if self.formatted else 0
+        nlines = max(len(self._fit_width(self.data)), self.height)
+        return (max(0, self.border_top) + max(0, self.pad_top) + nlines +
+                max(0, self.pad_bottom) + max(0, self.border_bottom))
 
     def get_width(self):
         """
-        Get natural width of cell, including padding.
+        Get natural width of cell, including padding. This is found
+        from the cell's settings, without formatting the cell.
 
         Returns:
             natural_width (int): Width of cell.
 
         """
-        return m_len(self.formatted[0])  # if self.formatted else 0
+        left, right, top, _ = self._border_edges()
+        if self.border_top > 0:
+            return m_len(top)
+        return (m_len(left) + max(0, self.pad_left) + self.width +
+                max(0, self.pad_right) + m_len(right))
 
     def replace_data(self, data, **kwargs):
         """
@@ -828,8 +887,9 @@ class EvCell(object):
             if self.height <= 0 < self.raw_height:
                 raise Exception("Cell height too small, no room for data.")
 
-        # reformat (to new sizes, padding, header and borders)
-        self.formatted = self._reformat()
+        # the cell is formatted (to new sizes, padding, header and borders)
+        # only when its lines are needed
+        self.formatted = None
 
     def get(self):
         """
@@ -1245,13 +1305,45 @@ class EvTable(object):
         that all columns have the same number of rows
         and that the table fits within the given width.
         """
+        options = self._balance_widths()
+        cheights = self._balance_heights(options)
+        for iy, cheight in enumerate(cheights):
+            self._balance_row(iy, cheight, options)
+        self.cheight = sum(cheights)
+
+    def _copy_column(self, column):
+        """
+        Copy a column of the table for the working table. Cells are
+        only ever reformatted, never changed in place, so a shallow
+        copy of each cell is enough.
 
+        Args:
+            column (EvColumn): The column to copy.
+
+        Returns:
+            column (EvColumn): The copy.
+
+        """
+        new_column = copy(column)
+        new_column.options = copy(column.options)
+        new_column.column = [copy(cell) for cell in column]
+        return new_column
+
+    def _balance_widths(self):
+        """
+        Make a working copy of the table, with the same number of rows
+        in all columns and the widths of the columns fitted to the
+        table. The widths are found from the settings and data of the
+        cells; no cell is formatted here.
+
+        Returns:
+            options (dict): The options to reformat the cells with.
+
+        """
         # we make all modifications on a working copy of the
         # actual table. This allows us to add columns/rows
         # and re-balance over and over without issue.
-        self.worktable = deepcopy(self.table)
-#        self._borders()
-#        return
+        self.worktable = [self._copy_column(col) for col in self.table]
         options = copy(self.options)
 
         # balance number of rows to make a rectangular table
@@ -1348,6 +1440,26 @@ class EvTable(object):
             except Exception:
                 raise
 
+        self.cwidth = sum(cwidths)
+        return options
+
+    def _balance_heights(self, options):
+        """
+        Find the height of every row, fitting the rows to the table
+        height if it is set. This wraps the data of all cells to the
+        widths of their columns.
+
+        Args:
+            options (dict): The options from `_balance_widths`. If the
+                table height is set, cells are told to crop their text
+                from now on.
+
+        Returns:
+            cheights (list): The height of each row.
+
+        """
+        nrowmax = self.nrows
+
         # equalize heights for each row (we must do this here, since it may have changed to fit new widths)
         cheights = [max(cell.get_height() for cell in (col[iy] for col in self.worktable)) for iy in range(nrowmax)]
 
@@ -1405,34 +1517,63 @@ class EvTable(object):
                 # we must tell cells to crop instead of expanding
             options["enforce_size"] = True
 
-        # reformat table (for vertical align)
-        for ix, col in enumerate(self.worktable):
-            for iy, cell in enumerate(col):
-                try:
-                    col.reformat_cell(iy, height=cheights[iy], **options)
-                except Exception as e:
-                    msg = "ix=%s, iy=%s, height=%s: %s" % (ix, iy, cheights[iy], e.message)
-                    raise Exception("Error in vertical align:\n %s" % msg)
+        return cheights
 
-        # calculate actual table width/height in characters
-        self.cwidth = sum(cwidths)
-        self.cheight = sum(cheights)
+    def _balance_row(self, iy, cheight, options):
+        """
+        Reformat the cells of a row to the row's height (for vertical align).
 
-    def _generate_lines(self):
+        Args:
+            iy (int): The index of the row.
+            cheight (int): The height of the row.
+            options (dict): The options from `_balance_widths`.
+
+        """
+        for ix, col in enumerate(self.worktable):
+            try:
+                col.reformat_cell(iy, height=cheight, **options)
+            except Exception as e:
+                msg = "ix=%s, iy=%s, height=%s: %s" % (ix, iy, cheight, e.message)
+                raise Exception("Error in vertical align:\n %s" % msg)
+
+    def iter_lines(self):
         """
-        Generates lines across all columns
-        (each cell may contain multiple lines)
-        This will also balance the table.
+        Generates lines across all columns (each cell may contain
+        multiple lines). This will also balance the table.
+
+        Column widths are found up front, but unless the table has a
+        set `height` each row is only wrapped and formatted when its
+        lines are reached. A large table can so be sent (like with
+        `EvMore`) without first building all of it.
+
+        Yields:
+            line (ANSIString): The next line of the table.
+
         """
-        self._balance()
+        options = self._balance_widths()
+        # a set table height is spread over all rows, so these must all be measured
+        cheights = self._balance_heights(options) if self.height else None
+        self.cheight = 0
         for iy in range(self.nrows):
-            cell_row = [col[iy] for col in self.worktable]
+            if cheights is None:
+                cheight = max(col[iy].get_height() for col in self.worktable)
+            else:
+                cheight = cheights[iy]
+            self._balance_row(iy, cheight, options)
+            self.cheight += cheight
             # this produces a list of lists, each of equal length
-            cell_data = [cell.get() for cell in cell_row]
+            cell_data = [col[iy].get() for col in self.worktable]
             cell_height = min(len(lines) for lines in cell_data)
             for iline in range(cell_height):
                 yield ANSIString("").join(_to_ansi(celldata[iline] for celldata in cell_data))
 
+    def _generate_lines(self):
+        """
+        Generates lines across all columns. This is the same as
+        `iter_lines`.
+        """
+        return self.iter_lines()
+
     def add_header(self, *args, **kwargs):
         """
         Add header to table. This is a number of texts to be put at
@@ -1622,15 +1763,15 @@ class EvTable(object):
             table_lines (list): The lines of the table, in order.
 
         """
-        return [line for line in self._generate_lines()]
+        return list(self.iter_lines())
 
     def __str__(self):
         """print table (this also balances it)"""
         # h = "12345678901234567890123456789012345678901234567890123456789012345678901234567890"
-        return str(unicode(ANSIString("\n").join([line for line in self._generate_lines()])))
+        return str(unicode(ANSIString("\n").join(list(self.iter_lines()))))
 
     def __unicode__(self):
-        return unicode(ANSIString("\n").join([line for line in self._generate_lines()]))
+        return unicode(ANSIString("\n").join(list(self.iter_lines())))
 
 
 def _test():
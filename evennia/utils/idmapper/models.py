@@ -14,7 +14,13 @@ import os
 import threading
 import gc
 import time
+from itertools import count
 from weakref import WeakValueDictionary
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
 from twisted.internet.reactor import callFromThread
 from django.core.exceptions import ObjectDoesNotExist, FieldError
 from django.db.models.signals import post_save
@@ -26,12 +32,16 @@ from evennia.utils.utils import dbref, get_evennia_pids, to_str
 from .manager import SharedMemoryManager
 
 AUTO_FLUSH_MIN_INTERVAL = 60.0 * 5  # at least 5 mins between cache flushes
+AUTO_EVICT_FRACTION = 0.25  # evict this part of the cache when memory runs low
 
 _GA = object.__getattribute__
 _SA = object.__setattr__
 _DA = object.__delattr__
 _MONITOR_HANDLER = None
 
+# increased on every cache access, to find the least recently used instances
+_ACCESS_COUNTER = count()
+
 # References to db-updated objects are stored here so the
 # main process can be informed to re-cache itself.
 PROC_MODIFIED_COUNT = 0
@@ -85,6 +95,8 @@ class SharedMemoryModelBase(ModelBase):
         if not hasattr(dbmodel, "__instance_cache__"):
             # we store __instance_cache__ only on the dbmodel base
             dbmodel.__instance_cache__ = {}
+            # the last access of each cached instance
+            dbmodel.__instance_access__ = {}
         super(SharedMemoryModelBase, cls)._prepare()
 
     def __new__(cls, name, bases, attrs):
@@ -257,7 +269,11 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         done even when instance caching is disabled.
 
         """
-        return cls.__dbclass__.__instance_cache__.get(id)
+        dbclass = cls.__dbclass__
+        instance = dbclass.__instance_cache__.get(id)
+        if instance is not None:
+            dbclass.__instance_access__[id] = next(_ACCESS_COUNTER)
+        return instance
 
     @classmethod
     def cache_instance(cls, instance, new=False):
@@ -273,7 +289,9 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         """
         pk = instance._get_pk_val()
         if pk is not None:
-            cls.__dbclass__.__instance_cache__[pk] = instance
+            dbclass = cls.__dbclass__
+            dbclass.__instance_cache__[pk] = instance
+            dbclass.__instance_access__[pk] = next(_ACCESS_COUNTER)
             if new:
                 try:
                     # trigger the at_init hook only
@@ -300,6 +318,7 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         try:
             if force or cls.at_idmapper_flush():
                 del cls.__dbclass__.__instance_cache__[key]
+                cls.__dbclass__.__instance_access__.pop(key, None)
             else:
                 cls._dbclass__.__instance_cache__[key].refresh_from_db()
         except KeyError:
@@ -330,8 +349,58 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         else:
             cls.__dbclass__.__instance_cache__ = dict((key, obj) for key, obj in cls.__dbclass__.__instance_cache__.items()
                                                       if not obj.at_idmapper_flush())
+        access = cls.__dbclass__.__instance_access__
+        cls.__dbclass__.__instance_access__ = dict((key, access[key]) for key in cls.__dbclass__.__instance_cache__
+                                                   if key in access)
     #flush_instance_cache = classmethod(flush_instance_cache)
 
+    @classmethod
+    def get_idmapper_pinned(cls):
+        """
+        Get the cached instances that should never be evicted from the
+        cache to save memory, such as those in active use. Override
+        this on the database model to pin instances.
+
+        Returns:
+            pinned (set): The pks of the pinned instances.
+
+        """
+        return set()
+
+    @classmethod
+    def evict_cached_instances(cls, maxsize):
+        """
+        Evict the least recently used instances from the cache until
+        no more than `maxsize` remain. Pinned instances (see
+        `get_idmapper_pinned`) and those whose `at_idmapper_flush`
+        returns False are never evicted, so more may remain.
+
+        Args:
+            maxsize (int): The max number of instances to keep cached.
+
+        Returns:
+            nevicted (int): The number of evicted instances.
+
+        """
+        dbclass = cls.__dbclass__
+        cache = dbclass.__instance_cache__
+        nexcess = len(cache) - maxsize
+        if nexcess <= 0:
+            return 0
+        access = dbclass.__instance_access__
+        pinned = dbclass.get_idmapper_pinned()
+        candidates = sorted((access.get(key, -1), key) for key in list(cache) if key not in pinned)
+        nevicted = 0
+        for _, key in candidates:
+            if nevicted >= nexcess:
+                break
+            instance = cache.get(key)
+            if instance is not None and instance.at_idmapper_flush():
+                del cache[key]
+                access.pop(key, None)
+                nevicted += 1
+        return nevicted
+
     # per-instance methods
 
     def at_idmapper_flush(self):
@@ -356,6 +425,7 @@ class SharedMemoryModel(with_metaclass(SharedMemoryModelBase, Model)):
         if pk:
             if force or self.at_idmapper_flush():
                 self.__class__.__dbclass__.__instance_cache__.pop(pk, None)
+                self.__class__.__dbclass__.__instance_access__.pop(pk, None)
 
     def delete(self, *args, **kwargs):
         """
@@ -448,6 +518,17 @@ class WeakSharedMemoryModel(with_metaclass(WeakSharedMemoryModelBase, SharedMemo
         abstract = True
 
 
+def _class_hierarchy(clslist):
+    """Recursively yield the leaves of a class hierarchy"""
+    for cls in clslist:
+        subclass_list = cls.__subclasses__()
+        if subclass_list:
+            for subcls in _class_hierarchy(subclass_list):
+                yield subcls
+        else:
+            yield cls
+
+
 def flush_cache(**kwargs):
     """
     Flush idmapper cache. When doing so the cache will fire the
@@ -457,17 +538,7 @@ def flush_cache(**kwargs):
     Uses a signal so we make sure to catch cascades.
 
     """
-    def class_hierarchy(clslist):
-        """Recursively yield a class hierarchy"""
-        for cls in clslist:
-            subclass_list = cls.__subclasses__()
-            if subclass_list:
-                for subcls in class_hierarchy(subclass_list):
-                    yield subcls
-            else:
-                yield cls
-
-    for cls in class_hierarchy([SharedMemoryModel]):
+    for cls in _class_hierarchy([SharedMemoryModel]):
         cls.flush_instance_cache()
     # run the python garbage collector
     return gc.collect()
@@ -505,43 +576,103 @@ post_save.connect(update_cached_instance)
 
 
 LAST_FLUSH = None
+# the peak memory use at the last eviction, if only the peak is known
+LAST_PEAK_RMEM = None
 
 
-def conditional_flush(max_rmem, force=False):
+def evict_cache(max_instances=None, ratio=1.0):
     """
-    Flush the cache if the estimated memory usage exceeds `max_rmem`.
+    Evict the least recently used instances from the idmapper cache,
+    separately for each database model. Pinned instances are never
+    evicted.
+
+    Args:
+        max_instances (dict, optional): The max number of instances to
+            keep cached for each model, keyed by model name (like
+            "ObjectDB"). The "default" key is used for models not given.
+            A missing or `None` value means no cap.
+        ratio (float, optional): Also evict until no more than this
+            part of the currently cached instances of each model remain.
 
-    The flusher has a timeout to avoid flushing over and over
-    in particular situations (this means that for some setups
+    Returns:
+        nevicted (int): The number of evicted instances.
+
+    """
+    max_instances = max_instances or {}
+    nevicted = 0
+    for dbclass in set(cls.__dbclass__ for cls in _class_hierarchy([SharedMemoryModel])):
+        maxsize = int(len(dbclass.__instance_cache__) * ratio)
+        cap = max_instances.get(dbclass.__name__, max_instances.get("default"))
+        if cap is not None:
+            maxsize = min(maxsize, cap)
+        nevicted += dbclass.evict_cached_instances(maxsize)
+    return nevicted
+
+
+def _process_memory():
+    """
+    Get the memory used by this process, and if this is the current
+    or the peak memory use.
+
+    Returns:
+        rmem, peak (tuple): The memory in MB (or `None` if it could not
+            be determined) and `True` if this is the peak memory use.
+
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return (int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") /
+                    (1024.0 * 1024.0), False)
+    except (IOError, OSError, ValueError, IndexError, AttributeError):
+        pass
+    if resource:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # this is given in bytes on Mac and kilobytes elsewhere
+        return maxrss / (1024.0 * 1024.0 if os.uname()[0] == "Darwin" else 1024.0), True
+    return None, False
+
+
+def get_process_memory():
+    """
+    Get the memory used by this process.
+
+    Returns:
+        rmem (float or None): The resident memory in MB, or `None` if
+            it could not be determined.
+
+    Notes:
+        If `/proc/self/statm` is not available (on non-Linux systems)
+        this is instead the peak memory usage, as reported by the
+        `resource` module.
+
+    """
+    return _process_memory()[0]
+
+
+def conditional_flush(max_rmem, force=False, max_instances=None):
+    """
+    Evict instances from the cache to keep each model within its cap
+    and, if the memory usage gets close to `max_rmem`, also evict the
+    least recently used part of the cache.
+
+    The memory-based eviction has a timeout to avoid evicting over and
+    over in particular situations (this means that for some setups
     the memory usage will exceed the requirement and a server with
     more memory is probably required for the given game).
 
     Args:
-        max_rmem (int): memory-usage estimation-treshold after which
-            cache is flushed.
-        force (bool, optional): forces a flush, regardless of timeout.
-            Defaults to `False`.
+        max_rmem (int): memory-usage treshold (in MB) after which
+            the cache is reduced.
+        force (bool, optional): forces a memory-based eviction, regardless
+            of timeout. Defaults to `False`.
+        max_instances (dict, optional): Max number of cached instances
+            per model, see `evict_cache`.
 
     """
-    global LAST_FLUSH
-
-    def mem2cachesize(desired_rmem):
-        """
-        Estimate the size of the idmapper cache based on the memory
-        desired. This is used to optionally cap the cache size.
+    global LAST_FLUSH, LAST_PEAK_RMEM
 
-        desired_rmem - memory in MB (minimum 50MB)
-
-        The formula is empirically estimated from usage tests (Linux)
-        and is
-            Ncache = RMEM - 35.0 / 0.0157
-        where RMEM is given in MB and Ncache is the size of the cache
-        for this memory usage. VMEM tends to be about 100MB higher
-        than RMEM for large memory usage.
-        """
-        vmem = max(desired_rmem, 50.0)
-        Ncache = int(abs(float(vmem) - 35.0) / 0.0157)
-        return Ncache
+    if max_instances:
+        evict_cache(max_instances)
 
     if not max_rmem:
         # auto-flush is disabled
@@ -559,20 +690,23 @@ def conditional_flush(max_rmem, force=False):
                         "once in %s min interval. Check memory usage." % (AUTO_FLUSH_MIN_INTERVAL / 60.0))
         return
 
-    if os.name == "nt":
-        # we can't look for mem info in Windows at the moment
+    # check actual memory usage
+    actual_rmem, peak = _process_memory()
+    if actual_rmem is None:
+        return
+
+    if peak and LAST_PEAK_RMEM is not None and actual_rmem <= LAST_PEAK_RMEM:
+        # the peak memory use never goes down, so it tells nothing
+        # about our memory use unless it grew since the last eviction
         return
 
-    # check actual memory usage
-    Ncache_max = mem2cachesize(max_rmem)
-    Ncache, _ = cache_size()
-    actual_rmem = float(os.popen('ps -p %d -o %s | tail -1' % (os.getpid(), "rss")).read()) / 1000.0  # resident memory
-
-    if Ncache >= Ncache_max and actual_rmem > max_rmem * 0.9:
-        # flush cache when number of objects in cache is big enough and our
-        # actual memory use is within 10% of our set max
-        flush_cache()
+    if actual_rmem > max_rmem * 0.9:
+        # evict part of the cache when our actual memory use
+        # is within 10% of our set max
+        evict_cache(max_instances, ratio=1.0 - AUTO_EVICT_FRACTION)
+        gc.collect()
         LAST_FLUSH = now
+        LAST_PEAK_RMEM = actual_rmem if peak else None
 
 
 def cache_size(mb=True):
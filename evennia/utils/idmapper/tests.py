@@ -2,8 +2,10 @@ from __future__ import absolute_import
 from builtins import range
 
 from django.test import TestCase
+from mock import patch
 
-from .models import SharedMemoryModel
+from . import models as idmapper_models
+from .models import SharedMemoryModel, evict_cache, get_process_memory
 from django.db import models
 
 
@@ -75,3 +77,46 @@ class SharedMemorysTest(TestCase):
         pk = article.pk
         article.delete()
         self.assertEquals(pk not in Article.__instance_cache__, True)
+
+
+class TestCacheEviction(TestCase):
+
+    def setUp(self):
+        super(TestCacheEviction, self).setUp()
+        Category.flush_instance_cache(force=True)
+        self.categories = [Category.objects.create(name="Category %d" % (n,)) for n in range(10)]
+
+    def test_lru_eviction(self):
+        # access the first few categories again, making them the most recently used
+        for category in self.categories[:3]:
+            Category.get_cached_instance(category.pk)
+        Category.evict_cached_instances(3)
+        self.assertEqual(set(Category.__instance_cache__),
+                         set(category.pk for category in self.categories[:3]))
+        self.assertEqual(set(Category.__instance_access__), set(Category.__instance_cache__))
+
+    def test_pinned(self):
+        pinned = set([self.categories[-1].pk])
+        with patch.object(Category, "get_idmapper_pinned", classmethod(lambda cls: pinned)):
+            Category.evict_cached_instances(0)
+        self.assertEqual(set(Category.__instance_cache__), pinned)
+
+    def test_evict_cache(self):
+        nevicted = evict_cache({"Category": 4, "default": None})
+        self.assertEqual(nevicted, 6)
+        self.assertEqual(len(Category.__instance_cache__), 4)
+        evict_cache(ratio=0.5)
+        self.assertEqual(len(Category.__instance_cache__), 2)
+
+    def test_process_memory(self):
+        self.assertTrue(get_process_memory() > 0)
+
+    @patch.object(idmapper_models, "LAST_PEAK_RMEM", None)
+    @patch.object(idmapper_models, "LAST_FLUSH", 1)
+    @patch.object(idmapper_models, "_process_memory", lambda: (100.0, True))
+    def test_conditional_flush_peak_memory(self):
+        idmapper_models.conditional_flush(100)
+        self.assertEqual(len(Category.__instance_cache__), 7)
+        # the peak memory use has not grown, so no new eviction
+        idmapper_models.conditional_flush(100, force=True)
+        self.assertEqual(len(Category.__instance_cache__), 7)
@@ -43,6 +43,18 @@ Sessionobject for the object seeing the string. This may be `None` if
 the string is sent to a non-puppetable object. The inlinefunc should
 never raise an exception.
 
+An inlinefunc whose result only depends on its arguments and the
+session can be marked as pure:
+
+```python
+def funcname(*args, **kwargs):
+    # ...
+funcname.pure = True
+```
+
+The result of a pure inlinefunc is remembered for each session, so
+the function is only called again for new arguments.
+
 There are two reserved function names:
 - "nomatch": This is called if the user uses a functionname that is
     not registered. The nomatch function will get the name of the
@@ -58,10 +70,15 @@ Error handling:
    Syntax errors, notably not completely closing all inlinefunc
    blocks, will lead to the entire string remaining unparsed.
 
+Each string is compiled once into an `InlinefuncTemplate` of static
+text and function calls, which is cached and re-used every time the
+same string is parsed.
+
 """
 
 import re
 import fnmatch
+from weakref import WeakKeyDictionary
 from django.conf import settings
 
 from evennia.utils import utils, logger
@@ -100,6 +117,9 @@ def pad(*args, **kwargs):
     return utils.pad(text, width=width, align=align, fillchar=fillchar)
 
 
+pad.pure = True
+
+
 def crop(*args, **kwargs):
     """
     Inlinefunc. Crops ingoing text to given widths.
@@ -128,6 +148,9 @@ def crop(*args, **kwargs):
     return utils.crop(text, width=width, suffix=suffix)
 
 
+crop.pure = True
+
+
 def clr(*args, **kwargs):
     """
     Inlinefunc. Colorizes nested text.
@@ -159,10 +182,16 @@ def clr(*args, **kwargs):
     return text
 
 
+clr.pure = True
+
+
 def null(*args, **kwargs):
     return args[0] if args else ''
 
 
+null.pure = True
+
+
 def nomatch(name, *args, **kwargs):
     """
     Default implementation of nomatch returns the function as-is as a string.
@@ -206,6 +235,8 @@ try:
 except AttributeError:
     _STACK_MAXSIZE = 20
 
+_CACHE_SIZE = settings.INLINEFUNC_CACHE_SIZE
+
 # regex definitions
 
 _RE_STARTTOKEN = re.compile(r"(?<!\\)\$(\w+)\(")  # unescaped $funcname( (start of function call)
@@ -224,8 +255,11 @@ _RE_TOKEN = re.compile(r"""
             \$(?!\w+\()|\'|\"|\\|[^),$\'\"\\\(]+)""",
                        re.UNICODE | re.IGNORECASE | re.VERBOSE | re.DOTALL)
 
-# Cache for function lookups.
-_PARSING_CACHE = utils.LimitedSizeOrderedDict(size_limit=1000)
+# Compiled strings, keyed on the string.
+_TEMPLATE_CACHE = utils.LRUCache(_CACHE_SIZE)
+
+# Results of pure inlinefuncs, for each session.
+_PURE_RESULTS = WeakKeyDictionary()
 
 
 class ParseStack(list):
@@ -279,6 +313,211 @@ class InlinefuncError(RuntimeError):
     pass
 
 
+class InlinefuncCall(object):
+    """
+    A call to an inlinefunc in a compiled string. Each argument is a
+    list of static strings and other calls.
+
+    """
+
+    def __init__(self, funcname, args=None):
+        """
+        Args:
+            funcname (str): The name of the inlinefunc.
+            args (list, optional): The arguments. This is `None` until
+                the end of the call has been parsed.
+
+        """
+        self.funcname = funcname
+        self.args = args
+
+    def __repr__(self):
+        return "<InlinefuncCall {}({})>".format(self.funcname, self.args)
+
+
+class InlinefuncTemplate(object):
+    """
+    A string compiled for inlinefunc parsing, as a list of static
+    strings and `InlinefuncCall`s. Functions are looked up by name when
+    the template is run, so the same template can be used with any set
+    of available functions.
+
+    """
+
+    def __init__(self, nodes, funcnames, complete=True):
+        """
+        Args:
+            nodes (list): Static strings and `InlinefuncCall`s.
+            funcnames (list): The names of all calls, nested ones included.
+            complete (bool, optional): If all calls in the string were
+                closed. If not, the string is not to be parsed.
+
+        """
+        self.nodes = nodes
+        self.funcnames = funcnames
+        self.complete = complete
+
+    def __repr__(self):
+        return "<InlinefuncTemplate {}>".format(self.nodes)
+
+    def execute(self, available_funcs, strip=False, **kwargs):
+        """
+        Run the inlinefuncs of the template.
+
+        Args:
+            available_funcs (dict): The inlinefuncs by name. This must
+                include the `nomatch` function.
+            strip (bool, optional): Whether to strip function calls rather than
+                execute them.
+
+        Kwargs:
+            session (Session): Passed on to the inlinefuncs. If this is
+                the only kwarg, results of pure inlinefuncs are remembered
+                for the session.
+            kwargs (any): All other kwargs are also passed on to the inlinefunc.
+
+        Returns:
+            result (str): The string with the inlinefuncs replaced by their results.
+
+        """
+        if strip:
+            return "".join(node for node in self.nodes if isinstance(node, basestring))
+
+        session = kwargs.get("session")
+        results = None
+        if session is not None and len(kwargs) == 1:
+            results = _PURE_RESULTS.get(session)
+            if results is None:
+                results = _PURE_RESULTS[session] = utils.LRUCache(_CACHE_SIZE)
+
+        def _run(node, depth):
+            if isinstance(node, basestring):
+                return node
+            args = ["".join(_run(part, depth + 1) for part in arg) for arg in node.args]
+            try:
+                func = available_funcs[node.funcname]
+            except KeyError:
+                func = available_funcs["nomatch"]
+                args.insert(0, node.funcname)
+            kwargs["inlinefunc_stack_depth"] = depth
+            if results is not None and getattr(func, "pure", False):
+                key = (func, tuple(args))
+                retval = results.get(key)
+                if retval is None:
+                    retval = utils.to_str(func(*args, **kwargs), force_string=True)
+                    results.set(key, retval)
+                return retval
+            return utils.to_str(func(*args, **kwargs), force_string=True)
+
+        return "".join(_run(node, 0) for node in self.nodes)
+
+
+def _static(string):
+    """
+    Convert static text to the form it is output in.
+
+    """
+    return utils.to_str(string, force_string=True)
+
+
+def compile_inlinefunc(string, stacktrace=False):
+    """
+    Compile a string into a template of static text and inlinefunc
+    calls.
+
+    Args:
+        string (str): The string to compile.
+        stacktrace (bool, optional): If set, print the parsing to log.
+
+    Returns:
+        template (InlinefuncTemplate): The compiled string.
+
+    """
+    stack = ParseStack()
+    funcnames = []
+
+    # process string on stack
+    ncallable = 0
+    nlparens = 0
+
+    if stacktrace:
+        out = "STRING: {} =>".format(string)
+        print(out)
+        logger.log_info(out)
+
+    for match in _RE_TOKEN.finditer(string):
+        gdict = match.groupdict()
+
+        if stacktrace:
+            out = " MATCH: {}".format({key: val for key, val in gdict.items() if val})
+            print(out)
+            logger.log_info(out)
+
+        if gdict["singlequote"]:
+            stack.append(gdict["singlequote"])
+        elif gdict["doublequote"]:
+            stack.append(gdict["doublequote"])
+        elif gdict["leftparens"]:
+            # we have a left-parens inside a callable
+            if ncallable:
+                nlparens += 1
+            stack.append("(")
+        elif gdict["end"]:
+            if nlparens > 0:
+                nlparens -= 1
+                stack.append(")")
+                continue
+            if ncallable <= 0:
+                stack.append(")")
+                continue
+            args = []
+            while stack:
+                operation = stack.pop()
+                if isinstance(operation, InlinefuncCall) and operation.args is None:
+                    # the start of the call. None separates the arguments
+                    operation.args = [[]]
+                    for arg in reversed(args):
+                        if arg is None:
+                            operation.args.append([])
+                        else:
+                            operation.args[-1].append(
+                                _static(arg) if isinstance(arg, basestring) else arg)
+                    stack.append(operation)
+                    ncallable -= 1
+                    break
+                else:
+                    args.append(operation)
+        elif gdict["start"]:
+            funcname = _RE_STARTTOKEN.match(gdict["start"]).group(1)
+            stack.append(InlinefuncCall(funcname))
+            funcnames.append(funcname)
+            ncallable += 1
+        elif gdict["escaped"]:
+            # escaped tokens
+            token = gdict["escaped"].lstrip("\\")
+            stack.append(token)
+        elif gdict["comma"]:
+            if ncallable > 0:
+                # commas outside strings and inside a callable are
+                # used to mark argument separation - we use None
+                # in the stack to indicate such a separation.
+                stack.append(None)
+            else:
+                # no callable active - just a string
+                stack.append(",")
+        else:
+            # the rest
+            stack.append(gdict["rest"])
+
+    if ncallable > 0:
+        # this means not all inlinefuncs were complete
+        return InlinefuncTemplate([], funcnames, complete=False)
+
+    nodes = [_static(node) if isinstance(node, basestring) else node
+             for node in stack if node != ""]
+    return InlinefuncTemplate(nodes, funcnames)
+
+
 def parse_inlinefunc(string, strip=False, available_funcs=None, stacktrace=False, **kwargs):
     """
     Parse the incoming string.
@@ -297,138 +536,40 @@ def parse_inlinefunc(string, strip=False, available_funcs=None, stacktrace=False
 
 
     """
-    global _PARSING_CACHE
-    usecache = False
+    if "$" not in string:
+        # no inlinefuncs possible; most text ends here
+        return string
+
     if not available_funcs:
         available_funcs = _INLINE_FUNCS
-        usecache = True
     else:
         # make sure the default keys are available, but also allow overriding
         tmp = _DEFAULT_FUNCS.copy()
         tmp.update(available_funcs)
         available_funcs = tmp
 
-    if usecache and string in _PARSING_CACHE:
-        # stack is already cached
-        stack = _PARSING_CACHE[string]
-    elif not _RE_STARTTOKEN.search(string):
-        # if there are no unescaped start tokens at all, return immediately.
-        return string
-    else:
-        # no cached stack; build a new stack and continue
-        stack = ParseStack()
-
-        # process string on stack
-        ncallable = 0
-        nlparens = 0
-        nvalid = 0
-
-        if stacktrace:
-            out = "STRING: {} =>".format(string)
-            print(out)
-            logger.log_info(out)
+    template = _TEMPLATE_CACHE.get(string)
+    if template is None:
+        if not _RE_STARTTOKEN.search(string):
+            # if there are no unescaped start tokens at all, return immediately.
+            return string
+        template = compile_inlinefunc(string, stacktrace=stacktrace)
+        _TEMPLATE_CACHE.set(string, template)
 
-        for match in _RE_TOKEN.finditer(string):
-            gdict = match.groupdict()
-
-            if stacktrace:
-                out = " MATCH: {}".format({key: val for key, val in gdict.items() if val})
-                print(out)
-                logger.log_info(out)
-
-            if gdict["singlequote"]:
-                stack.append(gdict["singlequote"])
-            elif gdict["doublequote"]:
-                stack.append(gdict["doublequote"])
-            elif gdict["leftparens"]:
-                # we have a left-parens inside a callable
-                if ncallable:
-                    nlparens += 1
-                stack.append("(")
-            elif gdict["end"]:
-                if nlparens > 0:
-                    nlparens -= 1
-                    stack.append(")")
-                    continue
-                if ncallable <= 0:
-                    stack.append(")")
-                    continue
-                args = []
-                while stack:
-                    operation = stack.pop()
-                    if callable(operation):
-                        if not strip:
-                            stack.append((operation, [arg for arg in reversed(args)]))
-                        ncallable -= 1
-                        break
-                    else:
-                        args.append(operation)
-            elif gdict["start"]:
-                funcname = _RE_STARTTOKEN.match(gdict["start"]).group(1)
-                try:
-                    # try to fetch the matching inlinefunc from storage
-                    stack.append(available_funcs[funcname])
-                    nvalid += 1
-                except KeyError:
-                    stack.append(available_funcs["nomatch"])
-                    stack.append(funcname)
-                    stack.append(None)
-                ncallable += 1
-            elif gdict["escaped"]:
-                # escaped tokens
-                token = gdict["escaped"].lstrip("\\")
-                stack.append(token)
-            elif gdict["comma"]:
-                if ncallable > 0:
-                    # commas outside strings and inside a callable are
-                    # used to mark argument separation - we use None
-                    # in the stack to indicate such a separation.
-                    stack.append(None)
-                else:
-                    # no callable active - just a string
-                    stack.append(",")
-            else:
-                # the rest
-                stack.append(gdict["rest"])
+    if not template.complete:
+        return string
 
-        if ncallable > 0:
-            # this means not all inlinefuncs were complete
-            return string
+    nvalid = sum(1 for funcname in template.funcnames if funcname in available_funcs)
+    if _STACK_MAXSIZE > 0 and _STACK_MAXSIZE < nvalid:
+        # if stack is larger than limit, throw away parsing
+        return string + available_funcs["stackfull"](**kwargs)
 
-        if _STACK_MAXSIZE > 0 and _STACK_MAXSIZE < nvalid:
-            # if stack is larger than limit, throw away parsing
-            return string + available_funcs["stackfull"](*args, **kwargs)
-        elif usecache:
-            # cache the stack - we do this also if we don't check the cache above
-            _PARSING_CACHE[string] = stack
-
-    # run the stack recursively
-    def _run_stack(item, depth=0):
-        retval = item
-        if isinstance(item, tuple):
-            if strip:
-                return ""
-            else:
-                func, arglist = item
-                args = [""]
-                for arg in arglist:
-                    if arg is None:
-                        # an argument-separating comma - start a new arg
-                        args.append("")
-                    else:
-                        # all other args should merge into one string
-                        args[-1] += _run_stack(arg, depth=depth + 1)
-                # execute the inlinefunc at this point or strip it.
-                kwargs["inlinefunc_stack_depth"] = depth
-                retval = "" if strip else func(*args, **kwargs)
-        return utils.to_str(retval, force_string=True)
-    retval = "".join(_run_stack(item) for item in stack)
+    retval = template.execute(available_funcs, strip=strip, **kwargs)
     if stacktrace:
-        out = "STACK: \n{} => {}\n".format(stack, retval)
+        out = "STACK: \n{} => {}\n".format(template, retval)
         print(out)
         logger.log_info(out)
 
-    # execute the stack
     return retval
 
 #
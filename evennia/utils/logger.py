@@ -402,6 +402,68 @@ def log_file(msg, filename="game.log"):
         deferToThread(callback, filehandle, msg).addErrback(errback)
 
 
+_LOG_BUFFERS = {}  # {filename: [lines]} waiting to be written
+_LOG_BUFFER_CALL = None
+_LOG_BUFFER_DELAY = None
+
+
+def _write_log_lines(filehandle, lines):
+    """Write lines to file and flush"""
+    filehandle.write("".join(lines))
+    filehandle.flush()
+
+
+def flush_log_buffers(threaded=True):
+    """
+    Write all lines buffered by `log_file_buffered` to their files.
+
+    Args:
+        threaded (bool, optional): Write in a thread. If False, write
+            directly, such as when the server is shutting down.
+
+    """
+    global _LOG_BUFFERS, _LOG_BUFFER_CALL
+    if _LOG_BUFFER_CALL and _LOG_BUFFER_CALL.active():
+        _LOG_BUFFER_CALL.cancel()
+    _LOG_BUFFER_CALL = None
+    buffers, _LOG_BUFFERS = _LOG_BUFFERS, {}
+    for filename, lines in buffers.items():
+        filehandle = _open_log_file(filename)
+        if not filehandle:
+            continue
+        if threaded:
+            deferToThread(_write_log_lines, filehandle, lines).addErrback(
+                lambda failure: log_trace())
+        else:
+            try:
+                _write_log_lines(filehandle, lines)
+            except Exception:
+                log_trace()
+
+
+def log_file_buffered(msg, filename="game.log"):
+    """
+    Buffered version of `log_file`, for logs written to often. Lines
+    are collected and written together, in one thread, every
+    `settings.LOG_FILE_BUFFER_DELAY` seconds.
+
+    Args:
+        msg (str): String to append to logfile.
+        filename (str, optional): Defaults to 'game.log'. All logs
+            will appear in the logs directory and log entries will start
+            on new lines following datetime info.
+
+    """
+    global _LOG_BUFFER_CALL, _LOG_BUFFER_DELAY
+    if _LOG_BUFFER_DELAY is None:
+        from django.conf import settings
+        _LOG_BUFFER_DELAY = settings.LOG_FILE_BUFFER_DELAY
+    _LOG_BUFFERS.setdefault(filename, []).append("\n%s [-] %s" % (timeformat(), msg.strip()))
+    if not _LOG_BUFFER_CALL:
+        from twisted.internet import reactor
+        _LOG_BUFFER_CALL = reactor.callLater(_LOG_BUFFER_DELAY, flush_log_buffers)
+
+
 def tail_log_file(filename, offset, nlines, callback=None):
     """
     Return the tail of the log file.
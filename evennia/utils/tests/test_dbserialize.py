@@ -0,0 +1,41 @@
+"""
+Tests for the serialization of Attribute data in evennia.utils.dbserialize.
+
+Timings of serializing large nested Attribute values are found in
+`evennia.server.profiling.dbserialize_benchmark`.
+
+"""
+from mock import patch
+
+from evennia.server.profiling.dbserialize_benchmark import nested_data
+from evennia.utils import dbserialize
+from evennia.utils.test_resources import EvenniaTest
+
+
+class TestDbSerialize(EvenniaTest):
+    def test_roundtrip(self):
+        data = nested_data(100, obj=self.obj1)
+        pickled = dbserialize.to_pickle(data)
+        self.assertEqual(pickled["mail"][0][2][0], "__packed_dbobj__")
+        self.assertEqual(dbserialize.from_pickle(pickled), data)
+        self.assertEqual(dbserialize.dbunserialize(dbserialize.dbserialize(data)), data)
+
+    def test_primitive_fast_path(self):
+        data = {"log": ["entry %i" % i for i in range(100)], "stats": {"hp": 1, "name": u"Bob"}}
+        with patch("evennia.utils.dbserialize.pack_dbobj") as mock_pack:
+            pickled = dbserialize.to_pickle(data)
+            self.assertFalse(mock_pack.called)
+        self.assertEqual(pickled, data)
+        # primitive containers are copied, not shared
+        self.assertIsNot(pickled["log"], data["log"])
+        self.assertIsNot(dbserialize.from_pickle(pickled)["stats"], pickled["stats"])
+
+    def test_saver_tree(self):
+        self.obj1.db.test = [[1, 2], {"a": [3]}, (4, [5])]
+        value = self.obj1.db.test
+        self.assertEqual(type(value[0]), dbserialize._SaverList)
+        self.assertIs(value[0]._parent, value)
+        self.assertIs(value[1]["a"]._parent, value[1])
+        self.assertIs(value[2][1]._parent, value)
+        value[2][1].append(6)
+        self.assertEqual(self.obj1.attributes.get("test"), [[1, 2], {"a": [3]}, (4, [5, 6])])
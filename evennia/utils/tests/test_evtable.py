@@ -0,0 +1,69 @@
+"""
+Unit tests for the EvTable table generator and paging tables with EvMore.
+
+"""
+from django.test import TestCase
+from mock import MagicMock, patch
+from evennia.utils import evmore
+from evennia.utils.evtable import EvCell, EvTable
+from evennia.utils.utils import m_len
+
+
+def _table(nrows, **kwargs):
+    table = EvTable("|wName|n", "|wLocation|n", **kwargs)
+    for i in range(nrows):
+        table.add_row("Player%i" % i, "|yRoom #%i|n in the far north of the land" % i)
+    return table
+
+
+class TestEvTable(TestCase):
+    def test_cell_size(self):
+        cell = EvCell("|rSome text that will wrap|n\nin the cell", width=12,
+                      pad_width=1, border_width=1, align="r")
+        for kwargs in ({}, {"width": 9}, {"height": 8, "valign": "b"}, {"border_top": 0}):
+            cell.reformat(**kwargs)
+            lines = cell.get()
+            self.assertEqual(cell.get_width(), m_len(lines[0]))
+            self.assertEqual(cell.get_height(), len(lines))
+
+    def test_iter_lines(self):
+        for kwargs in ({}, {"width": 40}, {"height": 60, "border": "cells"}):
+            table = _table(10, **kwargs)
+            self.assertEqual(u"\n".join(unicode(line) for line in table.iter_lines()),
+                             unicode(table))
+            self.assertEqual(table.get(), list(table.iter_lines()))
+
+    def test_iter_lines_lazy(self):
+        table = _table(20, width=40)
+        lines = table.iter_lines()
+        next(lines)
+        # only the header row has been formatted yet
+        self.assertIsNotNone(table.worktable[0][0].formatted)
+        self.assertIsNone(table.worktable[0][1].formatted)
+        self.assertIsNone(table.worktable[1][-1].formatted)
+        list(lines)
+        self.assertIsNotNone(table.worktable[1][-1].formatted)
+
+    def test_evmore_table(self):
+        caller = MagicMock()
+        session = MagicMock()
+        session.protocol_flags = {"SCREENHEIGHT": {0: 14}, "SCREENWIDTH": {0: 80}}
+        table = _table(30, border=None)
+        more = evmore.EvMore(caller, table, session=session, justify_kwargs=False)
+        self.assertIn("[1/?]", caller.msg.call_args[1]["text"])
+        self.assertFalse(more._complete)
+        more.page_end()
+        self.assertIn("[4/4]", caller.msg.call_args[1]["text"])
+        self.assertEqual(u"\n".join(more._pages), unicode(table))
+
+    def test_evmore_small_table(self):
+        caller = MagicMock()
+        session = MagicMock()
+        session.protocol_flags = {"SCREENHEIGHT": {0: 40}, "SCREENWIDTH": {0: 80}}
+        table = _table(3)
+        text = unicode(table)
+        with patch.object(table, "iter_lines", wraps=table.iter_lines) as mock_iter_lines:
+            evmore.EvMore(caller, table, session=session)
+            # the table is only rendered once
+            self.assertEqual(mock_iter_lines.call_count, 1)
+        caller.msg.assert_called_once_with(text=text, session=session)
@@ -4,7 +4,8 @@ Unit tests for all sorts of inline text-tag parsing, like ANSI, html conversion,
 """
 import re
 from django.test import TestCase
-from evennia.utils.ansi import ANSIString
+from mock import MagicMock
+from evennia.utils.ansi import ANSIString, ANSI_PARSER, parse_ansi
 from evennia.utils.text2html import TextToHTMLparser
 from evennia.utils import inlinefuncs
 
@@ -22,8 +23,8 @@ class ANSIStringTestCase(TestCase):
         """
         Verifies the indexes in an ANSIString match what they should.
         """
-        self.assertEqual(ansi._char_indexes, char)
-        self.assertEqual(ansi._code_indexes, code)
+        self.assertEqual(list(ansi._char_indexes), char)
+        self.assertEqual(list(ansi._code_indexes), code)
 
     def test_instance(self):
         """
@@ -157,6 +158,58 @@ class ANSIStringTestCase(TestCase):
         self.assertEqual(a.rstrip(), ANSIString("   |r   Test of stuff |b with spaces|n"))
         self.assertEqual(b.strip(), b)
 
+    def test_lazy_indexes(self):
+        """
+        Make sure indexes are only found when needed, and kept when adding.
+        """
+        a = ANSIString("|gTest|n")
+        b = ANSIString("|rString")
+        c = a + b
+        self.assertEqual(len(c), 10)
+        self.assertIsNone(c._lazy_char_indexes)
+        self.checker(c[2:6], u'\x1b[1m\x1b[32mst\x1b[0m\x1b[1m\x1b[31mSt', u'stSt')
+        self.assertIsNotNone(c._lazy_char_indexes)
+        self.assertIsNone(a._lazy_char_indexes)
+        self.table_check(a, [9, 10, 11, 12], [0, 1, 2, 3, 4, 5, 6, 7, 8, 13, 14, 15, 16])
+        c = a + a
+        self.assertIsNotNone(c._lazy_char_indexes)
+        self.table_check(c, [9, 10, 11, 12, 26, 27, 28, 29],
+                         [0, 1, 2, 3, 4, 5, 6, 7, 8, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23,
+                          24, 25, 30, 31, 32, 33])
+
+    def test_fill(self):
+        """
+        Make sure padding keeps the clean string in sync.
+        """
+        self.checker(ANSIString("|rTest|n").ljust(6), u'\x1b[1m\x1b[31mTest\x1b[0m  ', u'Test  ')
+        self.checker(ANSIString("ab") * 3, u'ababab', u'ababab')
+        self.table_check(ANSIString("|rab") * 2, [9, 10, 20, 21],
+                         [0, 1, 2, 3, 4, 5, 6, 7, 8, 11, 12, 13, 14, 15, 16, 17, 18, 19])
+
+
+class TestANSIParser(TestCase):
+    markup = "|rRed|n |[r|500 ||r {{ |lclook|ltLook|le"
+
+    def test_tokenize(self):
+        self.assertEqual(ANSI_PARSER._tokenize(self.markup),
+                         ['\x1b[1m\x1b[31mRed\x1b[0m ', ('\x1b[41m', '\x1b[48;5;196m'),
+                          ('\x1b[1m\x1b[31m', '\x1b[38;5;196m'), ' |r { |lclook|ltLook|le'])
+        self.assertEqual(ANSI_PARSER._tokenize("Plain text"), ["Plain text"])
+        self.assertEqual(ANSI_PARSER._tokenize("|n"), ["\x1b[0m"])
+        self.assertIs(ANSI_PARSER.tokenize(self.markup), ANSI_PARSER.tokenize(self.markup))
+
+    def test_render(self):
+        self.assertEqual(parse_ansi(self.markup),
+                         '\x1b[1m\x1b[31mRed\x1b[0m \x1b[41m\x1b[1m\x1b[31m |r { Look')
+        self.assertEqual(parse_ansi(self.markup, xterm256=True),
+                         '\x1b[1m\x1b[31mRed\x1b[0m \x1b[48;5;196m\x1b[38;5;196m |r { Look')
+        self.assertEqual(parse_ansi(self.markup, xterm256=True, mxp=True),
+                         '\x1b[1m\x1b[31mRed\x1b[0m \x1b[48;5;196m\x1b[38;5;196m |r { '
+                         '|lclook|ltLook|le')
+        self.assertEqual(parse_ansi(self.markup, strip_ansi=True), 'Red  |r { Look')
+        self.assertEqual(parse_ansi("|||[r"), "||[r")
+        self.assertEqual(parse_ansi(u"|r\xe5|n"), "\x1b[1m\x1b[31m\xc3\xa5\x1b[0m")
+
 
 class TestTextToHTMLparser(TestCase):
     def setUp(self):
@@ -274,4 +327,31 @@ class TestInlineFuncs(TestCase):
             'this should be $pad("""escaped,""" and """instead,""" cropped $crop(with a long,5) text., 80)'),
             "this should be                    escaped, and instead, cropped with  text.                    ")
 
+    def test_template_cache(self):
+        string = "cached $pad(text, 10) here"
+        self.assertEqual(inlinefuncs.parse_inlinefunc(string), "cached    text    here")
+        template = inlinefuncs._TEMPLATE_CACHE.get(string)
+        self.assertEqual(template.funcnames, ["pad"])
+        self.assertEqual(inlinefuncs.parse_inlinefunc(string, strip=True), "cached  here")
+        self.assertIs(inlinefuncs._TEMPLATE_CACHE.get(string), template)
 
+    def test_nomatch(self):
+        self.assertEqual(inlinefuncs.parse_inlinefunc(
+            "a $unknown(b, c) d", available_funcs={"nomatch": lambda *args, **kwargs: "|".join(args)}),
+            "a unknown|b| c d")
+
+    def test_pure(self):
+        calls = []
+
+        def count(*args, **kwargs):
+            calls.append(args)
+            return "x"
+        count.pure = True
+        session1, session2 = MagicMock(), MagicMock()
+        for session in (session1, session1, session2):
+            self.assertEqual(inlinefuncs.parse_inlinefunc(
+                "$count(1)", available_funcs={"count": count}, session=session), "x")
+        self.assertEqual(len(calls), 2)
+        # not remembered without a session
+        inlinefuncs.parse_inlinefunc("$count(1)", available_funcs={"count": count})
+        self.assertEqual(len(calls), 3)
@@ -186,3 +186,51 @@ class TestTimeformat(TestCase):
         """Test that unknown formats raise exceptions."""
         self.assertRaises(ValueError, utils.time_format, 0, 5)
         self.assertRaises(ValueError, utils.time_format, 0, "u")
+
+
+class TestLRUCache(TestCase):
+    """Test the least-recently-used cache."""
+
+    def test_eviction(self):
+        cache = utils.LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        # b was least recently used
+        self.assertFalse("b" in cache)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(len(cache), 2)
+
+    def test_stats(self):
+        cache = utils.LRUCache(1)
+        cache.set("a", 1)
+        cache.get("a")
+        cache.get("b")
+        cache.set("b", 2)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 1, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+
+class TestPartialMatcher(TestCase):
+    """Test that the PartialMatcher gives the same results as the plain functions."""
+
+    vocabulary = ["Big shiny sword", "big box", "small sword", "look", "@look", "lock", "sword"]
+
+    def test_partial_matching(self):
+        matcher = utils.PartialMatcher(self.vocabulary)
+        for inp in ("bi sw", "sw", "sword big", "lo", "@", "x", "", " "):
+            self.assertEqual(utils.string_partial_matching(matcher, inp),
+                             utils.string_partial_matching(self.vocabulary, inp))
+            self.assertEqual(utils.string_partial_matching(matcher, inp, ret_index=False),
+                             utils.string_partial_matching(self.vocabulary, inp, ret_index=False))
+
+    def test_suggestions(self):
+        matcher = utils.PartialMatcher(self.vocabulary)
+        for string in ("lok", "swrod", "box", "q", ""):
+            for cutoff in (0.6, 0.0):
+                self.assertEqual(
+                    utils.string_suggestions(string, matcher, cutoff=cutoff, maxnum=4),
+                    utils.string_suggestions(string, self.vocabulary, cutoff=cutoff, maxnum=4))
@@ -18,6 +18,7 @@ import math
 import re
 import textwrap
 import random
+from bisect import bisect_left
 from os.path import join as osjoin
 from importlib import import_module
 from inspect import ismodule, trace, getmembers, getmodule, getmro
@@ -1532,7 +1533,8 @@ def string_suggestions(string, vocabulary, cutoff=0.6, maxnum=3):
 
     Args:
         string (str): A string to search for.
-        vocabulary (iterable): A list of available strings.
+        vocabulary (iterable or PartialMatcher): A list of available strings,
+            or a `PartialMatcher` prepared for them.
         cutoff (int, 0-1): Limit the similarity matches (the higher
             the value, the more exact a match is required).
         maxnum (int): Maximum number of suggestions to return.
@@ -1543,6 +1545,8 @@ def string_suggestions(string, vocabulary, cutoff=0.6, maxnum=3):
             Could be empty if there are no matches.
 
     """
+    if isinstance(vocabulary, PartialMatcher):
+        return vocabulary.suggestions(string, cutoff=cutoff, maxnum=maxnum)
     return [tup[1] for tup in sorted([(string_similarity(string, sugg), sugg)
                                       for sugg in vocabulary],
                                      key=lambda tup: tup[0], reverse=True)
@@ -1559,8 +1563,8 @@ def string_partial_matching(alternatives, inp, ret_index=True):
     multiple matches returned if appropriate.
 
     Args:
-        alternatives (list of str): A list of possible strings to
-            match.
+        alternatives (list of str or PartialMatcher): A list of possible
+            strings to match, or a `PartialMatcher` prepared for them.
         inp (str): Search criterion.
         ret_index (bool, optional): Return list of indices (from alternatives
             array) instead of strings.
@@ -1568,6 +1572,8 @@ def string_partial_matching(alternatives, inp, ret_index=True):
         matches (list): String-matches or indices if `ret_index` is `True`.
 
     """
+    if isinstance(alternatives, PartialMatcher):
+        return alternatives.partial_matching(inp, ret_index=ret_index)
     if not alternatives or not inp:
         return []
 
@@ -1599,6 +1605,180 @@ def string_partial_matching(alternatives, inp, ret_index=True):
     return []
 
 
+class PartialMatcher(object):
+    """
+    Pre-processed vocabulary for `string_partial_matching` and
+    `string_suggestions`. Creating it splits and indexes each string
+    once, so repeated matching against the same vocabulary doesn't
+    redo that work every time. The results are the same as when
+    calling the functions with the vocabulary list.
+
+    The matcher can be passed to both functions in place of the list,
+    or its methods can be called directly.
+
+    """
+
+    def __init__(self, vocabulary):
+        """
+        Args:
+            vocabulary (iterable): The strings to match against. Their
+                order is kept, as it decides the order of the results.
+
+        """
+        self.vocabulary = list(vocabulary)
+        self._words = [alt.lower().split() for alt in self.vocabulary]
+        # {word: set of indices of the strings having it}, and the words
+        # sorted for prefix lookups
+        word_index = defaultdict(set)
+        for index, words in enumerate(self._words):
+            for word in words:
+                word_index[word].add(index)
+        self._word_index = dict(word_index)
+        self._sorted_words = sorted(self._word_index)
+        # letter histograms and their squared lengths for string_similarity,
+        # and {letter: indices of the strings having it}
+        self._histograms = []
+        self._sqlengths = []
+        letter_index = defaultdict(set)
+        for index, alt in enumerate(self.vocabulary):
+            histogram = defaultdict(int)
+            for letter in alt:
+                histogram[letter] += 1
+            self._histograms.append(histogram)
+            self._sqlengths.append(sum(count ** 2 for count in histogram.values()))
+            for letter in histogram:
+                letter_index[letter].add(index)
+        self._letter_index = dict(letter_index)
+
+    def __len__(self):
+        return len(self.vocabulary)
+
+    def _prefixed(self, prefix):
+        """
+        Get the indices of strings with a word starting with `prefix`.
+
+        """
+        indices = set()
+        sorted_words = self._sorted_words
+        for ind in range(bisect_left(sorted_words, prefix), len(sorted_words)):
+            word = sorted_words[ind]
+            if not word.startswith(prefix):
+                break
+            indices.update(self._word_index[word])
+        return indices
+
+    def partial_matching(self, inp, ret_index=True):
+        """
+        Partially match a string against the vocabulary. See
+        `string_partial_matching`.
+
+        Args:
+            inp (str): Search criterion.
+            ret_index (bool, optional): Return list of indices (into
+                `self.vocabulary`) instead of strings.
+
+        Returns:
+            matches (list): String-matches or indices if `ret_index` is `True`.
+
+        """
+        if not self.vocabulary or not inp:
+            return []
+        inp_words = inp.lower().split()
+        if not inp_words:
+            return []
+        # only strings having a word starting with each input word can match
+        candidates = None
+        for inp_word in set(inp_words):
+            indices = self._prefixed(inp_word)
+            candidates = indices if candidates is None else candidates & indices
+            if not candidates:
+                return []
+
+        matches = []
+        for altindex in sorted(candidates):
+            alt_words = self._words[altindex]
+            last_index = 0
+            for inp_word in inp_words:
+                # each word must match after the previously matched one
+                for alt_num in range(last_index, len(alt_words)):
+                    if alt_words[alt_num].startswith(inp_word):
+                        last_index = alt_num + 1
+                        break
+                else:
+                    break
+            else:
+                matches.append(altindex)
+        if ret_index:
+            return matches
+        return [self.vocabulary[ind] for ind in matches]
+
+    def similarity(self, string, index):
+        """
+        Get the `string_similarity` between a string and a string in the
+        vocabulary.
+
+        Args:
+            string (str): String to compare.
+            index (int): Index of the vocabulary string to compare with.
+
+        Returns:
+            similarity (float): A value 0...1 rating how similar the two
+                strings are.
+
+        """
+        histogram = defaultdict(int)
+        for letter in string:
+            histogram[letter] += 1
+        return self._similarity(histogram, sum(count ** 2 for count in histogram.values()),
+                                index)
+
+    def _similarity(self, histogram, sqlength, index):
+        """
+        Helper computing `string_similarity` from a prepared histogram.
+
+        """
+        other = self._histograms[index]
+        try:
+            return float(sum(count * other.get(letter, 0)
+                             for letter, count in histogram.items())) / \
+                (math.sqrt(sqlength) * math.sqrt(self._sqlengths[index]))
+        except ZeroDivisionError:
+            return 0
+
+    def suggestions(self, string, cutoff=0.6, maxnum=3):
+        """
+        Get the vocabulary strings most similar to a string. See
+        `string_suggestions`.
+
+        Args:
+            string (str): A string to search for.
+            cutoff (int, 0-1): Limit the similarity matches (the higher
+                the value, the more exact a match is required).
+            maxnum (int): Maximum number of suggestions to return.
+
+        Returns:
+            suggestions (list): Suggestions from the vocabulary with a
+                similarity-rating that higher than or equal to `cutoff`.
+
+        """
+        histogram = defaultdict(int)
+        for letter in string:
+            histogram[letter] += 1
+        sqlength = sum(count ** 2 for count in histogram.values())
+        if cutoff > 0:
+            # strings sharing no letters have a similarity of 0
+            candidates = set()
+            for letter in histogram:
+                candidates.update(self._letter_index.get(letter, ()))
+            candidates = sorted(candidates)
+        else:
+            candidates = range(len(self.vocabulary))
+        rated = [(self._similarity(histogram, sqlength, index), self.vocabulary[index])
+                 for index in candidates]
+        return [tup[1] for tup in sorted(rated, key=lambda tup: tup[0], reverse=True)
+                if tup[0] >= cutoff][:maxnum]
+
+
 def format_table(table, extra_space=1):
     """
     Note: `evennia.utils.evtable` is more powerful than this, but this
@@ -1941,6 +2121,111 @@ class LimitedSizeOrderedDict(OrderedDict):
         self._check_size()
 
 
+class LRUCache(object):
+    """
+    A cache limited to a maximum number of elements. When full, the least
+    recently used element is evicted to make room for a new one. The
+    cache keeps statistics of its hits, misses and evictions, to help
+    with tuning its size.
+
+    """
+
+    def __init__(self, size_limit=None):
+        """
+        Least-recently-used cache.
+
+        Args:
+            size_limit (int, optional): The maximum number of elements to
+                keep in the cache. If `None`, the cache is unbounded.
+
+        """
+        self.size_limit = size_limit
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def get(self, key, default=None):
+        """
+        Get an element from the cache, marking it as recently used.
+
+        Args:
+            key (hashable): The key to look up.
+            default (any, optional): Returned if `key` is not in the cache.
+
+        Returns:
+            value (any): The cached value or `default`.
+
+        """
+        cache = self._cache
+        try:
+            value = cache.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        cache[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        """
+        Store an element in the cache, evicting the least recently
+        used elements if the cache is full.
+
+        Args:
+            key (hashable): The key to store.
+            value (any): The value to store.
+
+        """
+        cache = self._cache
+        cache.pop(key, None)
+        cache[key] = value
+        if self.size_limit is not None:
+            while len(cache) > self.size_limit:
+                cache.popitem(last=False)
+                self.evictions += 1
+
+    def remove(self, key):
+        """
+        Remove an element from the cache, if it exists.
+
+        Args:
+            key (hashable): The key to remove.
+
+        """
+        self._cache.pop(key, None)
+
+    def clear(self):
+        """
+        Empty the cache. This does not reset the statistics.
+
+        """
+        self._cache.clear()
+
+    def stats(self):
+        """
+        Get the cache statistics.
+
+        Returns:
+            stats (dict): A dict with keys `size`, `size_limit`, `hits`,
+                `misses`, `evictions` and `hit_ratio`.
+
+        """
+        nlookups = self.hits + self.misses
+        return {"size": len(self._cache),
+                "size_limit": self.size_limit,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / float(nlookups) if nlookups else 0.0}
+
+
 def get_game_dir_path():
     """
     This is called by settings_default in order to determine the path